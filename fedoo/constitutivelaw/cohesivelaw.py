@@ -74,13 +74,16 @@ class CohesiveLaw(Spring):
         assembly.sv["TangentMatrix"] = self.get_K(assembly)
 
     def get_tangent_matrix(self, assembly):
-        Umd = 1 - assembly.sv["DamageVariable"]
-        UmdI = 1 - assembly.sv["DamageVariableOpening"]
-
         axis = self.parameters["axis"]
+        d = assembly.sv["DamageVariable"]
 
-        Kt = Umd * self.parameters["KII"]
-        Kn = UmdI * self.parameters["KI"]
+        if not np.any(d):
+            # no damaged point: keep the constant initial rigidity
+            Kt = self.parameters["KII"]
+            Kn = self.parameters["KI"]
+        else:
+            Kt = (1 - d) * self.parameters["KII"]
+            Kn = (1 - assembly.sv["DamageVariableOpening"]) * self.parameters["KI"]
         Kdiag = [Kt if i != axis else Kn for i in range(3)]
         return [[Kdiag[0], 0, 0], [0, Kdiag[1], 0], [0, 0, Kdiag[2]]]
 
@@ -133,12 +136,6 @@ class CohesiveLaw(Spring):
             ].copy()
 
     def _update_damage(self, assembly, delta):
-        alpha = 2  # for the power low
-        if assembly.sv["DamageVariable"] is 0:
-            assembly.sv["DamageVariable"] = 0 * delta[0]
-        if assembly.sv["DamageVariableOpening"] is 0:
-            assembly.sv["DamageVariableOpening"] = 0 * delta[0]
-
         delta_n = delta[self.parameters["axis"]]
         delta_t = [d for i, d in enumerate(delta) if i != self.parameters["axis"]]
         if len(delta_t) == 1:
@@ -150,9 +147,6 @@ class CohesiveLaw(Spring):
         delta_0_I = (
             self.parameters["SImax"] / self.parameters["KI"]
         )  # critical relative displacement (begining of the damage)
-        delta_m_I = (
-            2 * self.parameters["GIc"] / self.parameters["SImax"]
-        )  # maximal relative displacement (total failure)
 
         # mode II
         SIImax = self.parameters["SIImax"]
@@ -161,19 +155,56 @@ class CohesiveLaw(Spring):
                 self.parameters["GIIc"] / self.parameters["GIc"]
             )  # value by default used mainly to treat mode I dominant problems
         delta_0_II = SIImax / self.parameters["KII"]
-        delta_m_II = 2 * self.parameters["GIIc"] / SIImax
 
-        t0 = 0.0 * delta_n
-        tm = 0.0 * delta_n
-        dta = 0.0 * delta_n
+        traction = delta_n > 0  # test if traction loading (opening mode)
+        dta = np.where(
+            traction, np.sqrt(delta_t**2 + delta_n**2), delta_t
+        )  # Actual relative displacement in mixed mode
 
-        test = delta_n > 0  # test if traction loading (opening mode)
-        ind_traction = np.nonzero(test)[
-            0
-        ]  # indice of value where delta_n > 0 ie traction loading
-        ind_compr = np.nonzero(test - 1)[0]
+        # Active set: the thresholds are only computed in the process zone.
+        # The mixed mode critical relative displacement is always between
+        # delta_0_I and delta_0_II, so d = 0 below the lowest of them (intact
+        # points), and the broken points (irreversible damage = 1) stay broken.
+        d_irr = assembly.sv["DamageVariableIrreversible"]
+        active = dta > min(delta_0_I, delta_0_II)
+        if d_irr is not 0:
+            active &= d_irr < 1
+        ind = np.nonzero(active)[0]
+
+        d = assembly.get_sv_buffer("DamageVariable", dta.shape)
+        d[...] = d_irr
+        if len(ind) > 0:
+            d[ind] = np.maximum(
+                d[ind],
+                self._get_damage(delta_n[ind], delta_t[ind], dta[ind], SIImax),
+            )
+        assembly.sv["DamageVariable"] = d
+
+        # for opening the damage in considered to 0 when the relative
+        # displacement is negative (conctact)
+        d_open = assembly.get_sv_buffer("DamageVariableOpening", dta.shape)
+        np.multiply(traction, d, out=d_open)
+        assembly.sv["DamageVariableOpening"] = d_open
+
+        # verification : the damage variable should be between 0 and 1
+        if len(ind) > 0 and (d[ind].min() < 0 or d[ind].max() > 1):
+            print("Warning : the value of damage variable is incorrect")
+
+    def _get_damage(self, delta_n, delta_t, dta, SIImax):
+        # damage of points in the process zone (without irreversibility)
+        alpha = 2  # for the power low
+        delta_0_I = self.parameters["SImax"] / self.parameters["KI"]
+        delta_0_II = SIImax / self.parameters["KII"]
+        delta_m_II = 2 * self.parameters["GIIc"] / SIImax
+
+        t0 = np.full_like(
+            dta, delta_0_II
+        )  # Critical relative displacement in mixed mode (only mode II)
+        tm = np.full_like(
+            dta, delta_m_II
+        )  # Maximal relative displacement in mixed mode (only mode II)
 
-        #        beta = 0*delta_n
+        ind_traction = np.nonzero(delta_n > 0)[0]
         beta = (
             delta_t[ind_traction] / delta_n[ind_traction]
         )  # le rapport de mixité de mode
@@ -181,10 +212,6 @@ class CohesiveLaw(Spring):
         t0[ind_traction] = (delta_0_II * delta_0_I) * (
             np.sqrt((1 + (beta**2)) / ((delta_0_II**2) + ((beta * delta_0_I) ** 2)))
         )  # Critical relative displacement in mixed mode
-        t0[ind_compr] = (
-            delta_0_II  # Critical relative displacement in mixed mode (only mode II)
-        )
-
         tm[ind_traction] = (2 * ((1 + beta) ** 2) / t0[ind_traction]) * (
             (
                 ((self.parameters["KI"] / self.parameters["GIc"]) ** alpha)
@@ -195,16 +222,6 @@ class CohesiveLaw(Spring):
             )
             ** (-1 / alpha)
         )  # Maximal relative displacement in mixed mode (power low criterion)
-        tm[ind_compr] = (
-            delta_m_II  # Maximal relative displacement in mixed mode (power low criterion)
-        )
-
-        dta[ind_traction] = np.sqrt(
-            delta_t[ind_traction] ** 2 + delta_n[ind_traction] ** 2
-        )  # Actual relative displacement in mixed mode
-        dta[ind_compr] = delta_t[
-            ind_compr
-        ]  # Actual relative displacement in mixed mode
 
         # ---------------------------------------------------------------------------------------------------------------
         # La variable d'endommagement "d"
@@ -215,26 +232,7 @@ class CohesiveLaw(Spring):
         ]  # indices where dta>t0 and dta<tm ie d should be between 0 and 1
 
         d[test] = (tm[test] / (tm[test] - t0[test])) * (1 - (t0[test] / dta[test]))
-
-        if assembly.sv["DamageVariableIrreversible"] is 0:
-            assembly.sv["DamageVariable"] = (
-                d  # I don't know why assembly.sv['DamageVariable'] = d end up in bads values
-            )
-        else:
-            assembly.sv["DamageVariable"] = np.max(
-                [assembly.sv["DamageVariableIrreversible"], d], axis=0
-            )
-
-        assembly.sv["DamageVariableOpening"] = (
-            (delta_n > 0) * assembly.sv["DamageVariable"]
-        )  # for opening the damage in considered to 0 when the relative displacement is negative (conctact)
-
-        # verification : the damage variable should be between 0 and 1
-        if (
-            assembly.sv["DamageVariable"].min() < 0
-            or assembly.sv["DamageVariable"].max() > 1
-        ):
-            print("Warning : the value of damage variable is incorrect")
+        return d
 
     def reset(self):
         pass
@@ -44,6 +44,7 @@ class CompositeUD(ElasticAnisotropic):
             "nu_m": nu_m,
             "angle": angle,
         }
+        self.__local_H = None
 
     def get_engineering_constants(self):
         """
@@ -109,6 +110,19 @@ class CompositeUD(ElasticAnisotropic):
         if dimension is None:
             dimension = assembly.space.get_dimension()
 
+        if self.__local_H is None:
+            # the material parameters are constant: the tangent matrix in the
+            # material coordinates is computed only once. The change of basis
+            # is cached by local2global_H.
+            self.__local_H = self.__compute_local_H()
+
+        H = self.local2global_H(self.__local_H)
+        if dimension == "2Dstress":
+            return self.get_H_plane_stress(H)
+        else:
+            return H
+
+    def __compute_local_H(self):
         Vf = self.__parameters["Vf"]
         # carac composites (cf Berthelot)
         # Vf taux de fibres
@@ -210,8 +224,4 @@ class CompositeUD(ElasticAnisotropic):
             if len(H.shape) == 3:
                 H = np.rollaxis(H, 0, 3)
 
-        H = self.local2global_H(H)
-        if dimension == "2Dstress":
-            return self.get_H_plane_stress(H)
-        else:
-            return H
+        return H
@@ -1,10 +1,11 @@
 # derive de ConstitutiveLaw
 # compatible with the simcoon strain and stress notation
 
-from fedoo.core.mechanical3d import Mechanical3D
+from fedoo.core.mechanical3d import Mechanical3D, _is_unchanged
 from fedoo.util.voigt_tensors import StressTensorList, StrainTensorList
 
 import numpy as np
+from weakref import WeakKeyDictionary
 
 
 class ElasticAnisotropic(Mechanical3D):
@@ -22,6 +23,8 @@ class ElasticAnisotropic(Mechanical3D):
         The name of the constitutive law
     """
 
+    _saved_H = None  # for each assembly: copy of the last H components and compact H
+
     def __init__(self, H, name=""):
         Mechanical3D.__init__(self, name)  # heritage
 
@@ -45,14 +48,61 @@ class ElasticAnisotropic(Mechanical3D):
         else:
             total_strain = assembly.sv["Strain"]
 
-        assembly.sv["Stress"] = StressTensorList(
-            [
-                sum(
-                    [total_strain[j] * assembly.convert_data(H[i][j]) for j in range(6)]
-                )
+        if isinstance(total_strain, StrainTensorList):
+            total_strain = total_strain.asarray()
+        else:
+            total_strain = np.asarray(total_strain)
+
+        # stress = H.strain computed in a single operation
+        H = self._get_compact_H(assembly, H)
+        # preallocated array that is not used by sv_start
+        stress = assembly.get_sv_buffer("Stress", total_strain.shape)
+        if H.ndim == 2:  # uniform tangent matrix
+            np.matmul(H, total_strain, out=stress)
+        else:  # tangent matrix defined at gauss points
+            np.einsum("ij...,j...->i...", H, total_strain, out=stress)
+
+        assembly.sv["Stress"] = StressTensorList(stress)
+
+    def _get_compact_H(self, assembly, H):
+        # Return H as a float array of shape (6,6) if H is uniform or
+        # (6,6,n_gp) if H is defined at gauss points.
+        if (
+            isinstance(H, np.ndarray)
+            and H.dtype != object
+            and (H.ndim == 2 or H.shape[-1] == assembly.n_gauss_points)
+        ):
+            return H
+
+        # The conversion of each component is kept in cache for each
+        # assembly while the values of the components don't change.
+        if self._saved_H is None:
+            self._saved_H = WeakKeyDictionary()
+        values = [[H[i][j] for j in range(6)] for i in range(6)]
+        saved = self._saved_H.get(assembly)
+        if (
+            saved is not None
+            and saved[0] == assembly.n_gauss_points
+            and all(
+                _is_unchanged(saved[1][i][j], values[i][j])
                 for i in range(6)
-            ]
-        )  # H[i][j] are converted to gauss point excepted if scalar
+                for j in range(6)
+            )
+        ):
+            return saved[2]
+
+        if all([np.isscalar(v) for row in values for v in row]):
+            compact = np.array(values, dtype=float)
+        else:
+            compact = np.empty((6, 6, assembly.n_gauss_points))
+            for i in range(6):
+                for j in range(6):
+                    # H[i][j] are converted to gauss point excepted if scalar
+                    compact[i, j] = assembly.convert_data(values[i][j])
+
+        values = [[np.array(v) for v in row] for row in values]  # copy
+        self._saved_H[assembly] = (assembly.n_gauss_points, values, compact)
+        return compact
 
     def get_stress_from_strain(self, assembly, strain_tensor):
         H = self.get_tangent_matrix(assembly)
@@ -3,36 +3,182 @@
 
 from fedoo.core.mechanical3d import Mechanical3D
 from fedoo.core.assembly import Assembly
-from copy import deepcopy
+
 # from fedoo.util.voigt_tensors import StressTensorList, StrainTensorList
 
 
 import numpy as np
 
 
+class _GaussPointPartition:
+    # Permutation of the gauss points of an assembly so that the gauss points
+    # of each phase are contiguous. The state variables read or written by
+    # the constitutive law of each phase are stored in permuted arrays
+    # (fortran order, gauss point last) so that each phase gets a contiguous
+    # view. The written fields are copied back in the assembly sv at the end
+    # of each step (see flush), in the preallocated buffers of the assembly.
+    def __init__(self, assembly, list_elset):
+        mesh = assembly.mesh
+        self.store = assembly._sv_store
+        self.n_gauss_points = assembly.n_gauss_points
+        gp_start = np.arange(0, self.n_gauss_points, mesh.n_elements)
+
+        list_gp = []
+        for elset in list_elset:
+            if isinstance(elset, str):
+                elset = mesh.element_sets[elset]
+            # gauss point id = elm id + gp * n_elements
+            list_gp.append((np.asarray(elset) + np.c_[gp_start]).reshape(-1))
+
+        self.bounds = np.cumsum([0] + [len(gp) for gp in list_gp])
+        self.perm = np.concatenate(list_gp)
+        # if each gauss point belong to one phase, the inverse permutation
+        # is used to write back the data
+        if len(self.perm) == self.n_gauss_points and len(np.unique(self.perm)) == len(
+            self.perm
+        ):
+            self.inv_perm = np.empty_like(self.perm)
+            self.inv_perm[self.perm] = np.arange(len(self.perm))
+        else:
+            self.inv_perm = None
+
+        self.read_data = {}  # permuted fields (read only) with the sv value
+        self.write_data = {}  # permuted fields modified by the phases
+        self.sv_dict = {}  # dict (sv or sv_start) associated to each key
+
+    def get(self, sv, k, phase):
+        key = (id(sv), k)
+        if key in self.write_data:
+            field_class, arr, written = self.write_data[key]
+            if written[phase]:
+                return self._to_field(field_class, arr[..., self._slice(phase)])
+            if k not in sv:  # new field not yet defined for this phase
+                return self._to_field(
+                    field_class, np.zeros_like(arr[..., self._slice(phase)])
+                )
+
+        value = sv[k]
+        if key not in self.read_data or self.read_data[key][0] is not value:
+            # the permuted field is kept while the sv value is the same object
+            arr = self._to_array(value)
+            if arr is None or arr.shape[-1] != self.n_gauss_points:
+                # not gauss point values
+                self.read_data[key] = (value, None, value)
+            else:
+                permuted = np.empty(arr.shape[:-1] + (len(self.perm),), order="F")
+                permuted[...] = arr[..., self.perm]
+                self.read_data[key] = (value, value.__class__, permuted)
+
+        field_class, arr = self.read_data[key][1:]
+        if field_class is None:
+            return arr
+        return self._to_field(field_class, arr[..., self._slice(phase)])
+
+    def set(self, sv, k, phase, value):
+        key = (id(sv), k)
+        arr = self._to_array(value)
+        if key not in self.write_data:
+            shape = list(arr.shape)
+            # treat the special case where TangentMatrix is a 6x6 matrix
+            # (each component are scalar for homogeneous materials)
+            if k == "TangentMatrix" and len(shape) == 2:
+                shape.append(len(self.perm))
+            else:
+                shape[-1] = len(self.perm)
+            written = np.zeros(len(self.bounds) - 1, dtype=bool)
+            permuted = np.empty(shape, order="F")
+            self.write_data[key] = (value.__class__, permuted, written)
+            self.sv_dict[id(sv)] = sv
+
+        field_class, permuted, written = self.write_data[key]
+        permuted = permuted[..., self._slice(phase)]
+        if arr.ndim == permuted.ndim - 1:  # scalar values are given
+            arr = arr[..., np.newaxis]
+        permuted[...] = arr
+        written[phase] = True
+
+    def flush(self):
+        # write the modified fields in the assembly sv.
+        # The sv arrays may be shared with sv_start (shallow copy for
+        # performance reason), so the fields are written in the buffers of the
+        # state variable store (or in new arrays for other dict).
+        for (sv_id, k), (field_class, permuted, written) in self.write_data.items():
+            sv = self.sv_dict[sv_id]
+            old = None
+            if k in sv and (self.inv_perm is None or not (written.all())):
+                old = self._to_array(sv[k])
+            if old is not None and old.shape[-1] != self.n_gauss_points:
+                old = None  # not gauss point values
+
+            # values of the phases that didn't write the field
+            for phase in np.where(~written)[0]:
+                if old is None:
+                    permuted[..., self._slice(phase)] = 0
+                else:
+                    gp = self.perm[self._slice(phase)]
+                    permuted[..., self._slice(phase)] = old[..., gp]
+
+            shape = permuted.shape[:-1] + (self.n_gauss_points,)
+            if sv is self.store.current:
+                arr = self.store.get_buffer(k, shape, permuted.dtype)
+            else:
+                arr = np.empty(shape, permuted.dtype, order="F")
+
+            if self.inv_perm is not None:
+                np.take(permuted, self.inv_perm, axis=-1, out=arr, mode="clip")
+            else:
+                if old is None:
+                    arr[...] = 0
+                elif old is not arr:
+                    arr[...] = old
+                arr[..., self.perm] = permuted
+            sv[k] = arr if field_class is np.ndarray else field_class(arr)
+
+        self.write_data.clear()
+        self.sv_dict.clear()
+        # the buffers may be modified in place before the next step
+        for key, (value, field_class, arr) in list(self.read_data.items()):
+            if self.store.is_buffer(value):
+                del self.read_data[key]
+
+    def _slice(self, phase):
+        return slice(self.bounds[phase], self.bounds[phase + 1])
+
+    @staticmethod
+    def _to_array(value):
+        if isinstance(value, np.ndarray):
+            return value
+        if np.isscalar(value):
+            return None
+        try:
+            return value.asarray()  # StressTensorList or StrainTensorList
+        except AttributeError:
+            return np.asarray(value)
+
+    @staticmethod
+    def _to_field(field_class, arr):
+        if field_class is np.ndarray:
+            return arr
+        return field_class(arr)
+
+
 class _SubAssembly(Assembly):
-    # Assembly with new definition of sv and sv_start that allow maping the global assembly id to the sub_assembly
-    def __init__(self, assembly, elset, copied_fields):
+    # Assembly with new definition of sv and sv_start that allow maping the
+    # global assembly gauss points to the sub_assembly
+    def __init__(self, assembly, elset, partition, phase):
         self.assembly = assembly
         self.elset = elset
-        self.copied_fields = copied_fields
+        self.partition = partition
+        self.phase = phase
+        if isinstance(elset, str):
+            elset = assembly.mesh.element_sets[elset]
         super().__init__(
             assembly.weakform, assembly.mesh.extract_elements(elset), assembly.elm_type
         )
 
     @property
     def sv(self):
-        if isinstance(self.elset, str):
-            return _SubSV(
-                self.assembly,
-                self.assembly.sv,
-                self.assembly.mesh.element_sets[self.elset],
-                self.copied_fields,
-            )
-        else:
-            return _SubSV(
-                self.assembly, self.assembly.sv, self.elset, self.copied_fields
-            )
+        return _SubSV(self.partition, self.assembly.sv, self.phase)
 
     @sv.setter
     def sv(self, value):
@@ -40,15 +186,7 @@ class _SubAssembly(Assembly):
 
     @property
     def sv_start(self):
-        if isinstance(self.elset, str):
-            return _SubSV(
-                self.assembly,
-                self.assembly.sv_start,
-                self.assembly.mesh.element_sets[self.elset],
-                set(),
-            )
-        else:
-            return _SubSV(self.assembly, self.assembly.sv_start, self.elset, set())
+        return _SubSV(self.partition, self.assembly.sv_start, self.phase)
 
     @sv_start.setter
     def sv_start(self, value):
@@ -56,94 +194,23 @@ class _SubAssembly(Assembly):
 
 
 class _SubSV:
-    # class just here to map the good id for elset in the global state variable
-    def __init__(self, assembly, sv, elset, copied_fields):
+    # class just here to map the gauss points of a phase in the global state
+    # variable. Assume sv values are defined on gauss points.
+    def __init__(self, partition, sv, phase):
+        self.partition = partition
         self.sv = sv
-        self.elset = elset
-        self.assembly = assembly
-        self.copied_fields = copied_fields
+        self.phase = phase
 
     def __contains__(self, item):
-        return item in self.sv
+        return item in self.sv or (id(self.sv), item) in self.partition.write_data
 
     def __getitem__(self, k):
-        # assume sv values are defined on gauss points.
-        # perhaps it may be usefull to allow other definitions
-        if self.sv[k] is 0:
+        if (id(self.sv), k) not in self.partition.write_data and self.sv[k] is 0:
             return 0
-        elset = (
-            np.array(self.elset)
-            + np.c_[
-                np.arange(
-                    0, self.assembly.n_gauss_points, self.assembly.mesh.n_elements
-                )
-            ]
-        ).reshape(-1)
-
-        if isinstance(self.sv[k], list):
-            try:
-                return self.sv[k].__class__(self.sv[k].asarray()[..., elset])
-            except:
-                return self.sv[k].__class__(np.array(self.sv[k])[..., elset])
-        else:  # shoud be array
-            return self.sv[k][..., elset]  # gp id should be the last axis
-
-    def __setitem__(self, k, v):  # todefine properly
-        # assume sv values are defined on gauss points.
-        # perhaps it may be usefull to allow other definitions
-
-        if k in self.sv:  # or k in self.copied_fields:
-            if k not in self.copied_fields:
-                self.sv[k] = deepcopy(self.sv[k])
-                self.copied_fields.add(k)
-            if self.sv[k] is 0:
-                del self.sv[k]
-                self.__setitem__(k, v)
-
-            elset = (
-                np.array(self.elset)
-                + np.c_[
-                    np.arange(
-                        0, self.assembly.n_gauss_points, self.assembly.mesh.n_elements
-                    )
-                ]
-            ).reshape(-1)
-
-            if isinstance(
-                self.sv[k], list
-            ):  # assume it is a ListStressTensor or a ListStrainTensor object
-                self.sv[k].array[..., elset] = v
-            else:
-                try:
-                    self.sv[k][..., elset] = v
-                except:
-                    # try if scalar values are given
-                    self.sv[k][..., elset] = v[..., np.newaxis]
-        else:
-            if isinstance(v, np.ndarray):
-                isarray = True
-                arr = v
-            else:  # maybe a List for instance TensorStressList object or a list of list
-                isarray = False
-                try:
-                    arr = v.asarray()
-                except:
-                    arr = np.array(v)
-
-            shape = list(arr.shape)
-            # treat the special case where TangentMatrix is a 6x6 matrix (each component are scalar for homogeneous materials)
-            if k == "TangentMatrix" and len(shape) == 2:
-                shape.append(self.assembly.n_gauss_points)
-            else:
-                shape[-1] = self.assembly.n_gauss_points
-
-            if isarray:
-                self.sv[k] = np.zeros(shape)
-            else:
-                self.sv[k] = v.__class__(np.zeros(shape))
+        return self.partition.get(self.sv, k, self.phase)
 
-            self.copied_fields.add(k)
-            self.__setitem__(k, v)
+    def __setitem__(self, k, v):
+        self.partition.set(self.sv, k, self.phase, v)
 
 
 class Heterogeneous(Mechanical3D):
@@ -225,33 +292,31 @@ class Heterogeneous(Mechanical3D):
         self.list_elset = tup_elset
 
     def initialize(self, assembly, pb):
-        # self.list_mesh = [assembly.mesh.extract_elements(elset) for elset in self.list_elset]
-        self._copied_fields = set()  # set of field that have already been copied
-        # assembly.sv field need to be copied and can't be just modified because
-        # it will also modified assembly.sv_start (shallow copy for performance reason)
-        # copied_fields is a set that keep in memory the field that have already been copied.
+        # the gauss points of each phase are permuted once to be contiguous
+        self._partition = _GaussPointPartition(assembly, self.list_elset)
         self.list_assembly = [
-            _SubAssembly(assembly, elset, self._copied_fields)
-            for elset in self.list_elset
+            _SubAssembly(assembly, elset, self._partition, i)
+            for i, elset in enumerate(self.list_elset)
         ]
 
         for i, cl in enumerate(self.list_cl):
             cl.initialize(self.list_assembly[i], pb)
+        self._partition.flush()
 
     def update(self, assembly, pb):
-        self._copied_fields.clear()  # to force a new copy of each modified fields
         for i, cl in enumerate(self.list_cl):
             cl.update(self.list_assembly[i], pb)
+        self._partition.flush()
 
     def set_start(self, assembly, pb):
-        self._copied_fields.clear()  # to force a new copy of each modified fields
         for i, cl in enumerate(self.list_cl):
             cl.set_start(self.list_assembly[i], pb)
+        self._partition.flush()
 
     def to_start(self, assembly, pb):
-        self._copied_fields.clear()  # to force a new copy of each modified fields
         for i, cl in enumerate(self.list_cl):
             cl.to_start(self.list_assembly[i], pb)
+        self._partition.flush()
 
     # def get_tangent_matrix(self, assembly, dimension=None): #Tangent Matrix in lobal coordinate system (no change of basis)
 
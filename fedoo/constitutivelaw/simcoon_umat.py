@@ -11,9 +11,181 @@ try:
 except ImportError:
     USE_SIMCOON = False
 
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+
 import numpy as np
 
 
+def _get_arg_names(func):
+    # names of the arguments of a compiled function, read in the signature
+    # given by the first line of its docstring (pybind11 convention).
+    # Return None if the signature can't be read.
+    doc = (getattr(func, "__doc__", None) or "").lstrip()
+    match = re.match(r"\w+\((.*)\)\s*->", doc.split("\n")[0])
+    if match is None:
+        return None
+    return re.findall(r"(?:^|,\s*)(\w+)\s*[:=]", match.group(1))
+
+
+class _UmatDriver:
+    """Call the simcoon umat function on batches of gauss points.
+
+    The signature of sim.umat depends on the simcoon version. It is detected
+    once when the driver is created:
+
+    * 'F': the deformation gradients F0 and F1 are required after Detot
+      (simcoon >= 2.0). They are given empty (no stress measure conversion,
+      as with older versions) and the number of threads is forwarded.
+    * 'temp': legacy signature with an optional temperature.
+    * 'legacy': legacy signature without temperature.
+
+    If the umat function doesn't have its own thread pool, the gauss points
+    can be splitted in chunks run on a python thread pool, which is only
+    efficient if the extension releases the GIL. The results of the chunks
+    are then written in output arrays that may be given by the caller
+    (generally the buffers of the assembly state variables) so that the same
+    arrays are reused at each iteration. Without chunks, the arrays
+    allocated by the umat function are returned as is: simcoon has no output
+    argument, so copying them in buffers would only add a copy.
+
+    The number of calls and the time spent in the umat function (in
+    seconds) are stored in the attribute ``timing``.
+    """
+
+    min_chunk_size = 1000  # min number of gauss points per thread
+
+    def __init__(self, umat_func):
+        self.umat_func = umat_func
+        names = _get_arg_names(umat_func)
+        if names is None or "F0" not in names:
+            if names is not None and "temp" not in names:
+                self.api = "legacy"
+            else:
+                self.api = "temp"
+            self._native_threads = False
+        else:
+            self.api = "F"
+            self._native_threads = "n_threads" in names
+        self._pool = None
+        self._n_workers = 0  # number of threads of _pool
+        self.timing = {"n_calls": 0, "total": 0.0, "last": 0.0}
+
+    def __call__(
+        self,
+        umat_name,
+        etot,
+        Detot,
+        sigma,
+        DR,
+        props,
+        statev,
+        time_start,
+        dtime,
+        Wm,
+        temp=None,
+        out=None,
+        n_threads=None,
+    ):
+        """Run the umat and return the tuple (sigma, statev, Wm, Lt).
+
+        All the arrays have the gauss points as last axis (props may have a
+        single column shared by all the gauss points). If out is given, it
+        should be a tuple of 4 arrays with the shapes of the results in which
+        the results of the chunks are written and returned. out is ignored if
+        the gauss points are not splitted in chunks (see get_n_chunks).
+        """
+        args = (etot, Detot, sigma, DR, props, statev, Wm, temp)
+        n_points = np.shape(etot)[-1]
+        n_chunks = self.get_n_chunks(n_points, n_threads)
+
+        tic = time.perf_counter()
+        if n_chunks <= 1:
+            res = self._call(umat_name, args, time_start, dtime, n_threads)
+        else:
+            if out is None:
+                out = self._call(
+                    umat_name, _get_chunk(args, slice(0, 1)), time_start, dtime, 1
+                )
+                out = tuple(
+                    np.empty(res_i.shape[:-1] + (n_points,), order="F") for res_i in out
+                )
+            if self._pool is None or self._n_workers != n_chunks:
+                if self._pool is not None:
+                    self._pool.shutdown()
+                self._pool = ThreadPoolExecutor(n_chunks)
+                self._n_workers = n_chunks
+            bounds = np.linspace(0, n_points, n_chunks + 1).astype(int)
+            chunks = [slice(bounds[i], bounds[i + 1]) for i in range(n_chunks)]
+
+            def run(chunk):
+                res = self._call(
+                    umat_name, _get_chunk(args, chunk), time_start, dtime, 1
+                )
+                for res_i, out_i in zip(res, out):
+                    out_i[..., chunk] = res_i
+
+            list(self._pool.map(run, chunks))
+            res = out
+
+        self.timing["last"] = time.perf_counter() - tic
+        self.timing["total"] += self.timing["last"]
+        self.timing["n_calls"] += 1
+        return res
+
+    def get_n_chunks(self, n_points, n_threads=None):
+        """Number of chunks of gauss points run on the python thread pool."""
+        if n_threads is None or n_threads <= 1 or self._native_threads:
+            return 1
+        return max(1, min(n_threads, n_points // self.min_chunk_size))
+
+    def shutdown(self):
+        """Shut down the python thread pool (if any)."""
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+            self._n_workers = 0
+
+    def _call(self, umat_name, args, time_start, dtime, n_threads):
+        etot, Detot, sigma, DR, props, statev, Wm, temp = args
+        if self.api == "F":
+            no_F = np.empty((3, 3, 0), order="F")
+            kwargs = {"temp": temp}
+            if self._native_threads and n_threads is not None:
+                kwargs["n_threads"] = n_threads
+            return self.umat_func(
+                umat_name,
+                etot,
+                Detot,
+                no_F,
+                no_F,
+                sigma,
+                DR,
+                props,
+                statev,
+                time_start,
+                dtime,
+                Wm,
+                **kwargs,
+            )
+        args = (umat_name, etot, Detot, sigma, DR, props, statev, time_start, dtime, Wm)
+        if self.api == "temp":
+            return self.umat_func(*args, temp)
+        return self.umat_func(*args)
+
+
+def _get_chunk(args, chunk):
+    # restrict the gauss point arrays to a chunk (last axis)
+    res = []
+    for arg in args:
+        if arg is None or np.ndim(arg) == 0 or np.shape(arg)[-1] == 1:
+            res.append(arg)  # value shared by all the gauss points
+        else:
+            res.append(np.asfortranarray(arg[..., chunk]))
+    return tuple(res)
+
+
 class Simcoon(Mechanical3D):
     # """
     # Linear full Anistropic constitutive law defined from the rigidity matrix H.
@@ -52,6 +224,10 @@ class Simcoon(Mechanical3D):
 
         self.use_elastic_lt = True  # option to use the elastic tangeant matrix (in principle = initial tangent matrix) at the begining of each time step
 
+        # number of threads used by the umat (None for the simcoon default)
+        self.n_threads = None
+        self._umat = _UmatDriver(sim.umat)
+
         if umat_name == "ELISO":
             self.n_statev = 1
             self.props_label = {"E": 0, "nu": 1, "alpha": 2}
@@ -265,22 +441,24 @@ class Simcoon(Mechanical3D):
 
             # Launch the UMAT to compute the elastic matrix in "TangentMatrix"
             if self.props.shape[1] == 1:
-                zeros_6 = np.zeros(6)
-                (sigma, statev, wm, assembly.sv["TangentMatrix"]) = sim.umat(
+                # same elastic matrix for all gauss points
+                zeros_6 = np.zeros((6, 1), order="F")
+                Lt = self._umat(
                     self.umat_name,
                     zeros_6,
                     zeros_6,
                     zeros_6,
-                    np.eye(3, order="F"),
-                    self.props[:, 0],
-                    np.zeros(self.n_statev),
+                    DR[..., :1],
+                    self.props,
+                    np.zeros((self.n_statev, 1), order="F"),
                     0,
                     0,
-                    np.zeros(4),
-                )
+                    np.zeros((4, 1), order="F"),
+                )[3]
+                assembly.sv["TangentMatrix"] = Lt[..., 0]
             else:
                 zeros_6 = np.zeros((6, assembly.n_gauss_points), order="F")
-                (sigma, statev, wm, assembly.sv["TangentMatrix"]) = sim.umat(
+                assembly.sv["TangentMatrix"] = self._umat(
                     self.umat_name,
                     zeros_6,
                     zeros_6,
@@ -291,7 +469,8 @@ class Simcoon(Mechanical3D):
                     0,
                     0,
                     assembly.sv["Wm"],
-                )
+                    n_threads=self.n_threads,
+                )[3]
 
             if self.use_elastic_lt:
                 assembly.sv["ElasticMatrix"] = assembly.sv["TangentMatrix"]
@@ -313,43 +492,39 @@ class Simcoon(Mechanical3D):
         else:
             temp = None
 
-        try:
-            (
-                stress,
-                assembly.sv["Statev"],
-                assembly.sv["Wm"],
-                assembly.sv["TangentMatrix"],
-            ) = sim.umat(
-                self.umat_name,
-                assembly.sv_start["Strain"].array,
-                de.array,
-                assembly.sv_start["Stress"].array,
-                assembly.sv["DR"],
-                self.props,
-                assembly.sv_start["Statev"],
-                pb.time,
-                pb.dtime,
-                assembly.sv_start["Wm"],
-                temp,
-            )
-        except:  # for compatibility with old version of simcoon
-            (
-                stress,
-                assembly.sv["Statev"],
-                assembly.sv["Wm"],
-                assembly.sv["TangentMatrix"],
-            ) = sim.umat(
-                self.umat_name,
-                assembly.sv_start["Strain"].array,
-                de.array,
-                assembly.sv_start["Stress"].array,
-                assembly.sv["DR"],
-                self.props,
-                assembly.sv_start["Statev"],
-                pb.time,
-                pb.dtime,
-                assembly.sv_start["Wm"],
+        # if the gauss points are splitted in chunks, the results are written
+        # in preallocated buffers (see Assembly.get_sv_buffer) reused at each
+        # iteration. Otherwise, the arrays allocated by simcoon are used.
+        n_gp = assembly.n_gauss_points
+        if self._umat.get_n_chunks(n_gp, self.n_threads) > 1:
+            out = (
+                assembly.get_sv_buffer("Stress", (6, n_gp)),
+                assembly.get_sv_buffer("Statev", assembly.sv_start["Statev"].shape),
+                assembly.get_sv_buffer("Wm", (4, n_gp)),
+                assembly.get_sv_buffer("TangentMatrix", (6, 6, n_gp)),
             )
+        else:
+            out = None
+        (
+            stress,
+            assembly.sv["Statev"],
+            assembly.sv["Wm"],
+            assembly.sv["TangentMatrix"],
+        ) = self._umat(
+            self.umat_name,
+            assembly.sv_start["Strain"].array,
+            de.array,
+            assembly.sv_start["Stress"].array,
+            assembly.sv["DR"],
+            self.props,
+            assembly.sv_start["Statev"],
+            pb.time,
+            pb.dtime,
+            assembly.sv_start["Wm"],
+            temp,
+            out=out,
+            n_threads=self.n_threads,
+        )
 
         # work only in global local frame
 
@@ -367,6 +542,15 @@ class Simcoon(Mechanical3D):
         # to check the symetriy of the tangentmatrix :
         # print(np.abs(assembly.sv['TangentMatrix'] - assembly.sv['TangentMatrix'].transpose((1,0,2))).max())
 
+    @property
+    def umat_timing(self):
+        """dict with the number of umat calls and the time spent in the umat.
+
+        The keys are 'n_calls', 'total' (total time in seconds) and 'last'
+        (time of the last call in seconds).
+        """
+        return self._umat.timing
+
     def set_start(self, assembly, pb):
         if self.use_elastic_lt:
             assembly.sv["TangentMatrix"] = assembly.sv["ElasticMatrix"]
@@ -375,7 +559,26 @@ class Simcoon(Mechanical3D):
         if dimension is None:
             dimension = assembly.space.get_dimension()
 
-        H = self.local2global_H(assembly.sv["TangentMatrix"])
+        H = assembly.sv["TangentMatrix"]
+        H_el = assembly.sv.get("ElasticMatrix")
+        if (
+            self.local_frame is not None
+            and H_el is not None
+            and H is not H_el
+            and np.ndim(H) == 3
+        ):
+            # only rotate the correction of the elastic matrix where it is not
+            # 0 (ie at plastic gauss points). The rotated elastic matrix is
+            # kept in cache.
+            H_el_gp = np.broadcast_to(
+                H_el if np.ndim(H_el) == 3 else H_el[..., None], H.shape
+            )
+            index = np.nonzero((H != H_el_gp).any(axis=(0, 1)))[0]
+            dH = H[..., index] - H_el_gp[..., index]
+            H = np.array(np.broadcast_to(self.local2global_H(H_el), H.shape))
+            H[..., index] += self.local2global_H(dH, index)
+        else:
+            H = self.local2global_H(H)
         if dimension == "2Dstress":
             return self.get_H_plane_stress(H)
         else:
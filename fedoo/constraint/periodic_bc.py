@@ -3,6 +3,7 @@ import numpy as np
 from fedoo.core.boundary_conditions import BCBase, MPC, ListBC
 from fedoo.core.base import ProblemBase
 from fedoo.core.mesh import MeshBase
+from scipy.spatial import cKDTree
 
 USE_SIMCOON = True
 
@@ -45,11 +46,97 @@ if USE_SIMCOON:
     #         pb.bc.mpc(list_var, eq[2::3], eq[0::3].astype(int))
 
 
+def _pair_periodic_nodes(crd, slave, master, axes, tol=1e-8, pairing_tol=None):
+    """Reorder the slave nodes to match the master nodes of the opposite face.
+
+    The nodes are first matched by hashing their in-plane coordinates
+    quantized with the tolerance tol. The remaining nodes (if any) are
+    paired with their nearest partner using a KD-tree, if the in-plane
+    distance is lower than pairing_tol.
+
+    Parameters
+    ----------
+    crd : np.ndarray
+        Node coordinates of the mesh.
+    slave, master : np.ndarray[int]
+        Indices of the nodes of the two opposite sets.
+    axes : list of int
+        In-plane axes used to compare the node positions.
+    tol : float
+        Tolerance used for the quantization of the coordinates.
+    pairing_tol : float, optional
+        Maximal distance for the nearest partner fallback.
+        If None, pairing_tol = tol.
+
+    Returns
+    -------
+    np.ndarray[int]
+        The slave nodes reordered so that slave[i] is paired with master[i].
+    """
+    if pairing_tol is None:
+        pairing_tol = tol
+    if len(slave) != len(master):
+        raise ValueError(
+            "Periodic BC: the number of nodes on opposite faces differ "
+            f"({len(master)} and {len(slave)} nodes). The mesh is not periodic."
+        )
+    if len(axes) == 0 or len(master) == 0:
+        return slave
+
+    crd_master = crd[master][:, axes]
+    crd_slave = crd[slave][:, axes]
+
+    origin = crd_master.min(axis=0)
+    keys = np.floor((np.vstack((crd_master, crd_slave)) - origin) / tol + 0.5).astype(
+        np.int64
+    )
+    inverse = np.unique(keys, axis=0, return_inverse=True)[1].ravel()
+
+    slave_id = np.full(inverse.max() + 1, -1)
+    slave_id[inverse[len(master) :]] = np.arange(len(slave))
+    matched = slave_id[inverse[: len(master)]]
+
+    unmatched = np.nonzero(matched == -1)[0]
+    if len(unmatched) > 0:
+        # nearest partner fallback for nodes close to the quantization
+        # boundaries or slightly non-conforming meshes
+        free_slave = np.setdiff1d(np.arange(len(slave)), matched)
+        dist, ind = cKDTree(crd_slave[free_slave]).query(crd_master[unmatched])
+        ind = free_slave[ind]
+        # a slave node can't be the partner of several master nodes
+        ok = (dist <= pairing_tol) & (np.bincount(ind, minlength=len(slave))[ind] == 1)
+        matched[unmatched[ok]] = ind[ok]
+
+        if not (ok.all()):
+            report = "\n".join(
+                f"  node {nd} -> nearest node {nd_slave} at distance {d:.3e}"
+                for nd, nd_slave, d in zip(
+                    master[unmatched[~ok]][:10],
+                    slave[ind[~ok]][:10],
+                    dist[~ok][:10],
+                )
+            )
+            raise ValueError(
+                f"Periodic BC: {np.count_nonzero(~ok)} nodes have no periodic "
+                f"partner on the opposite face (pairing_tol = {pairing_tol}):\n"
+                + report
+            )
+
+    return slave[matched]
+
+
 class PeriodicBC(BCBase):
     """Class defining periodic boundary conditions"""
 
     def __init__(
-        self, node_cd, var_cd, dim=None, tol=1e-8, meshperio=True, name="Periodicity"
+        self,
+        node_cd,
+        var_cd,
+        dim=None,
+        tol=1e-8,
+        meshperio=True,
+        name="Periodicity",
+        pairing_tol=None,
     ):
         """
         Create a perdiodic boundary condition object using several multi-points constraints.
@@ -80,6 +167,12 @@ class PeriodicBC(BCBase):
             Tolerance for the periodic nodes detection. The default is 1e-8.
         name : str, optional
             Name of the created boundary condition. The default is "Periodicity".
+        pairing_tol : float, optional
+            Maximal in-plane distance between two nodes of opposite faces
+            to be considered as a periodic pair. Nodes that can't be matched
+            by their coordinates up to tol are paired with their nearest
+            partner if the distance is lower than pairing_tol, which allows
+            slightly non-conforming meshes. If None (default), pairing_tol = tol.
 
 
         Notes
@@ -165,6 +258,7 @@ class PeriodicBC(BCBase):
         self.var_cd = var_cd
         self.dim = dim  # dimension of periodicity (1, 2 or 3)
         self.tol = tol
+        self.pairing_tol = tol if pairing_tol is None else pairing_tol
         self.bc_type = "PeriodicBC"
         BCBase.__init__(self, name)
 
@@ -215,168 +309,77 @@ class PeriodicBC(BCBase):
         # =========== Create set of nodes ==========================
         # ==========================================================
 
-        xmax = np.max(crd[:, 0])
-        xmin = np.min(crd[:, 0])
-        ymax = np.max(crd[:, 1])
-        ymin = np.min(crd[:, 1])
-        if self.dim == 3:
-            zmax = np.max(crd[:, 2])
-            zmin = np.min(crd[:, 2])
+        crd_min = crd[:, : self.dim].min(axis=0)
+        crd_max = crd[:, : self.dim].max(axis=0)
 
-        left = np.where(np.abs(crd[:, 0] - xmin) < tol)[0]
-        right = np.where(np.abs(crd[:, 0] - xmax) < tol)[0]
+        # boolean masks of nodes on the min and max faces for each periodic
+        # direction, and number of faces each node belongs to
+        # (1 -> face node, 2 -> edge node, 3 -> corner node)
+        at_min = np.abs(crd[:, : self.dim] - crd_min) < tol
+        at_max = np.abs(crd[:, : self.dim] - crd_max) < tol
+        n_faces = np.count_nonzero(at_min | at_max, axis=1)
 
-        if self.dim > 1:
-            bottom = np.where(np.abs(crd[:, 1] - ymin) < tol)[0]
-            top = np.where(np.abs(crd[:, 1] - ymax) < tol)[0]
-
-            # extract edges/corners from the intersection of faces
-            left_bottom = np.intersect1d(left, bottom, assume_unique=True)
-            left_top = np.intersect1d(left, top, assume_unique=True)
-            right_bottom = np.intersect1d(right, bottom, assume_unique=True)
-            right_top = np.intersect1d(right, top, assume_unique=True)
-
-            if self.dim > 2:  # or dim == 3
-                back = np.where(np.abs(crd[:, 2] - zmin) < tol)[0]
-                front = np.where(np.abs(crd[:, 2] - zmax) < tol)[0]
+        def _get_set(*masks):
+            mask = np.logical_and.reduce(masks) & (n_faces == len(masks))
+            return np.nonzero(mask)[0]
 
-                # extract edges/corners from the intersection of faces
-                bottom_back = np.intersect1d(bottom, back, assume_unique=True)
-                bottom_front = np.intersect1d(bottom, front, assume_unique=True)
-                top_back = np.intersect1d(top, back, assume_unique=True)
-                top_front = np.intersect1d(top, front, assume_unique=True)
+        left = _get_set(at_min[:, 0])
+        right = _get_set(at_max[:, 0])
 
-                left_back = np.intersect1d(left, back, assume_unique=True)
-                left_front = np.intersect1d(left, front, assume_unique=True)
-                right_back = np.intersect1d(right, back, assume_unique=True)
-                right_front = np.intersect1d(right, front, assume_unique=True)
-
-                # extract corners from the intersection of edges
-                left_bottom_back = np.intersect1d(
-                    left_bottom, bottom_back, assume_unique=True
-                )
-                left_bottom_front = np.intersect1d(
-                    left_bottom, bottom_front, assume_unique=True
-                )
-                left_top_back = np.intersect1d(left_top, top_back, assume_unique=True)
-                left_top_front = np.intersect1d(left_top, top_front, assume_unique=True)
-                right_bottom_back = np.intersect1d(
-                    right_bottom, bottom_back, assume_unique=True
-                )
-                right_bottom_front = np.intersect1d(
-                    right_bottom, bottom_front, assume_unique=True
-                )
-                right_top_back = np.intersect1d(right_top, top_back, assume_unique=True)
-                right_top_front = np.intersect1d(
-                    right_top, top_front, assume_unique=True
-                )
-
-                # Remove nodes that beloing to several sets
-                all_corners = np.hstack(
-                    (
-                        left_bottom_back,
-                        left_bottom_front,
-                        left_top_back,
-                        left_top_front,
-                        right_bottom_back,
-                        right_bottom_front,
-                        right_top_back,
-                        right_top_front,
-                    )
-                )
-
-                left_bottom = np.setdiff1d(left_bottom, all_corners, assume_unique=True)
-                left_top = np.setdiff1d(left_top, all_corners, assume_unique=True)
-                right_bottom = np.setdiff1d(
-                    right_bottom, all_corners, assume_unique=True
-                )
-                right_top = np.setdiff1d(right_top, all_corners, assume_unique=True)
-
-                bottom_back = np.setdiff1d(bottom_back, all_corners, assume_unique=True)
-                bottom_front = np.setdiff1d(
-                    bottom_front, all_corners, assume_unique=True
-                )
-                top_back = np.setdiff1d(top_back, all_corners, assume_unique=True)
-                top_front = np.setdiff1d(top_front, all_corners, assume_unique=True)
-
-                left_back = np.setdiff1d(left_back, all_corners, assume_unique=True)
-                left_front = np.setdiff1d(left_front, all_corners, assume_unique=True)
-                right_back = np.setdiff1d(right_back, all_corners, assume_unique=True)
-                right_front = np.setdiff1d(right_front, all_corners, assume_unique=True)
-
-                all_edges = np.hstack(
-                    (
-                        left_bottom,
-                        left_top,
-                        right_bottom,
-                        right_top,
-                        bottom_back,
-                        bottom_front,
-                        top_back,
-                        top_front,
-                        left_back,
-                        left_front,
-                        right_back,
-                        right_front,
-                        all_corners,
-                    )
-                )
-
-            else:  # dim = 2
-                all_edges = np.hstack((left_bottom, left_top, right_bottom, right_top))
+        if self.dim > 1:
+            bottom = _get_set(at_min[:, 1])
+            top = _get_set(at_max[:, 1])
 
-            left = np.setdiff1d(left, all_edges, assume_unique=True)
-            right = np.setdiff1d(right, all_edges, assume_unique=True)
-            bottom = np.setdiff1d(bottom, all_edges, assume_unique=True)
-            top = np.setdiff1d(top, all_edges, assume_unique=True)
+            left_bottom = _get_set(at_min[:, 0], at_min[:, 1])
+            left_top = _get_set(at_min[:, 0], at_max[:, 1])
+            right_bottom = _get_set(at_max[:, 0], at_min[:, 1])
+            right_top = _get_set(at_max[:, 0], at_max[:, 1])
 
-            if mesh.ndim > 2:  # if there is a z coordinate
-                # sort edges (required to assign the good pair of nodes)
-                left_bottom = left_bottom[np.argsort(crd[left_bottom, 2])]
-                left_top = left_top[np.argsort(crd[left_top, 2])]
-                right_bottom = right_bottom[np.argsort(crd[right_bottom, 2])]
-                right_top = right_top[np.argsort(crd[right_top, 2])]
+            if self.dim > 2:  # or dim == 3
+                back = _get_set(at_min[:, 2])
+                front = _get_set(at_max[:, 2])
+
+                bottom_back = _get_set(at_min[:, 1], at_min[:, 2])
+                bottom_front = _get_set(at_min[:, 1], at_max[:, 2])
+                top_back = _get_set(at_max[:, 1], at_min[:, 2])
+                top_front = _get_set(at_max[:, 1], at_max[:, 2])
+
+                left_back = _get_set(at_min[:, 0], at_min[:, 2])
+                left_front = _get_set(at_min[:, 0], at_max[:, 2])
+                right_back = _get_set(at_max[:, 0], at_min[:, 2])
+                right_front = _get_set(at_max[:, 0], at_max[:, 2])
+
+                left_bottom_back = _get_set(at_min[:, 0], at_min[:, 1], at_min[:, 2])
+                left_bottom_front = _get_set(at_min[:, 0], at_min[:, 1], at_max[:, 2])
+                left_top_back = _get_set(at_min[:, 0], at_max[:, 1], at_min[:, 2])
+                left_top_front = _get_set(at_min[:, 0], at_max[:, 1], at_max[:, 2])
+                right_bottom_back = _get_set(at_max[:, 0], at_min[:, 1], at_min[:, 2])
+                right_bottom_front = _get_set(at_max[:, 0], at_min[:, 1], at_max[:, 2])
+                right_top_back = _get_set(at_max[:, 0], at_max[:, 1], at_min[:, 2])
+                right_top_front = _get_set(at_max[:, 0], at_max[:, 1], at_max[:, 2])
+
+        # reorder the slave sets so that slave[i] is the periodic partner
+        # of master[i] (required to assign the good pair of nodes)
+        def _pair(slave, master, normal_axes):
+            in_plane_axes = [i for i in range(mesh.ndim) if i not in normal_axes]
+            return _pair_periodic_nodes(
+                crd, slave, master, in_plane_axes, tol, self.pairing_tol
+            )
 
-            if self.dim > 2:
-                back = np.setdiff1d(back, all_edges, assume_unique=True)
-                front = np.setdiff1d(front, all_edges, assume_unique=True)
-
-                bottom_back = bottom_back[np.argsort(crd[bottom_back, 0])]
-                bottom_front = bottom_front[np.argsort(crd[bottom_front, 0])]
-                top_back = top_back[np.argsort(crd[top_back, 0])]
-                top_front = top_front[np.argsort(crd[top_front, 0])]
-
-                left_back = left_back[np.argsort(crd[left_back, 1])]
-                left_front = left_front[np.argsort(crd[left_front, 1])]
-                right_back = right_back[np.argsort(crd[right_back, 1])]
-                right_front = right_front[np.argsort(crd[right_front, 1])]
-
-        # sort adjacent faces to ensure node correspondance
-        if mesh.ndim == 2:
-            left = left[np.argsort(crd[left, 1])]
-            right = right[np.argsort(crd[right, 1])]
-            if self.dim > 1:
-                bottom = bottom[np.argsort(crd[bottom, 0])]
-                top = top[np.argsort(crd[top, 0])]
-
-        elif mesh.ndim > 2:
-            decimal_round = int(-np.log10(tol) - 1)
-            left = left[np.lexsort((crd[left, 1], crd[left, 2].round(decimal_round)))]
-            right = right[
-                np.lexsort((crd[right, 1], crd[right, 2].round(decimal_round)))
-            ]
-            if self.dim > 1:
-                bottom = bottom[
-                    np.lexsort((crd[bottom, 0], crd[bottom, 2].round(decimal_round)))
-                ]
-                top = top[np.lexsort((crd[top, 0], crd[top, 2].round(decimal_round)))]
-            if self.dim > 2:
-                back = back[
-                    np.lexsort((crd[back, 0], crd[back, 1].round(decimal_round)))
-                ]
-                front = front[
-                    np.lexsort((crd[front, 0], crd[front, 1].round(decimal_round)))
-                ]
+        right = _pair(right, left, [0])
+        if self.dim > 1:
+            top = _pair(top, bottom, [1])
+            left_top = _pair(left_top, left_bottom, [0, 1])
+            right_bottom = _pair(right_bottom, left_bottom, [0, 1])
+            right_top = _pair(right_top, left_bottom, [0, 1])
+        if self.dim > 2:
+            front = _pair(front, back, [2])
+            bottom_front = _pair(bottom_front, bottom_back, [1, 2])
+            top_back = _pair(top_back, bottom_back, [1, 2])
+            top_front = _pair(top_front, bottom_back, [1, 2])
+            left_front = _pair(left_front, left_back, [0, 2])
+            right_back = _pair(right_back, left_back, [0, 2])
+            right_front = _pair(right_front, left_back, [0, 2])
 
         # ==========================================================
         # =========== build periodic boudary conditions ============
@@ -386,11 +389,11 @@ class PeriodicBC(BCBase):
             problem.space.list_variables()
         )  # list of variable id defined in the active modeling space
 
-        dx = xmax - xmin
+        dx = crd_max[0] - crd_min[0]
         if self.dim > 1:
-            dy = ymax - ymin
+            dy = crd_max[1] - crd_min[1]
         if self.dim > 2:
-            dz = zmax - zmin
+            dz = crd_max[2] - crd_min[2]
 
         sc = self.shear_coef
 
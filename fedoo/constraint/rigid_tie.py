@@ -7,7 +7,7 @@ Created on Thu Jan 23 15:27:43 2020
 
 # from fedoo.core.base   import ProblemBase
 import numpy as np
-from fedoo.core.boundary_conditions import BCBase, MPC, ListBC
+from fedoo.core.boundary_conditions import BCBase, _MPCBlock
 from fedoo.core.base import ProblemBase
 from fedoo.core.mesh import MeshBase
 
@@ -45,6 +45,12 @@ class RigidTie(BCBase):
         The len of the list should be the same as node_cd (ie 6).
     name : str, optional
         Name of the created boundary condition. The default is "Rigid Tie".
+    rotation_tol : float, optional
+        If the rigid rotation angles (in radian) have changed less than
+        rotation_tol since the last generation of the constraint, the
+        linearized multi-point constraints are kept unchanged, which avoids
+        rebuilding the elimination matrix. The default is 0, ie the
+        constraints are updated at each iteration.
 
 
     Definition of rotations
@@ -87,15 +93,17 @@ class RigidTie(BCBase):
         rigid_tie = fd.constraint.RigidTie(right_face, node_cd, var_cd)
     """
 
-    def __init__(self, list_nodes, node_cd, var_cd, name="Rigid Tie"):
+    def __init__(self, list_nodes, node_cd, var_cd, name="Rigid Tie", rotation_tol=0.0):
         self.list_nodes = list_nodes
         self.node_cd = node_cd
         self.var_cd = var_cd
+        self.rotation_tol = rotation_tol
         self.bc_type = "RigidTie"
         BCBase.__init__(self, name)
         self._keep_at_end = True
 
         self._update_during_inc = 1
+        self._saved_mpc = None  # (angles, mpc block) from the last generate
 
     def __repr__(self):
         list_str = ["Rigid Tie:"]
@@ -105,192 +113,138 @@ class RigidTie(BCBase):
         return "\n".join(list_str)
 
     def initialize(self, problem):
-        pass
+        self._saved_mpc = None
         # for i,var in enumerate(self.var_cd):
         #     if isinstance(var, str):
         #         self.var_cd[i] = problem.space.variable_rank(var)
 
     def generate(self, problem, t_fact=1, t_fact_old=None):
         mesh = problem.mesh
-        var_cd = self.var_cd
+        n_nodes = mesh.n_nodes
         node_cd = self.node_cd  # node_cd[0] -> node defining center of rotation
-        list_nodes = self.list_nodes
+        list_nodes = np.asarray(self.list_nodes, dtype=int)
 
-        # rot_center = node_cd[0]
-        res = ListBC()
+        dof_cd = np.array(
+            [problem.space.variable_rank(var) for var in self.var_cd]
+        ) * n_nodes + np.asarray(node_cd)
 
-        dof_cd = [
-            problem.space.variable_rank(var_cd[i]) * mesh.n_nodes + node_cd[i]
-            for i in range(len(var_cd))
-        ]
+        # dof of the slave nodes with shape (3, n_slave_nodes)
+        dof_slave = (
+            np.c_[
+                [
+                    problem.space.variable_rank(var)
+                    for var in ["DispX", "DispY", "DispZ"]
+                ]
+            ]
+            * n_nodes
+            + list_nodes
+        )
 
         # dof_ref  = [problem._Xbc[dof] if dof in problem.dof_blocked else problem._X[dof] for dof in dof_cd]
-        # dof_ref  = [problem.get_dof_solution()[dof] + problem._Xbc[dof] if dof in problem.dof_blocked else problem.get_dof_solution()[dof] for dof in dof_cd]
         if problem.get_dof_solution() is 0:
-            dof_ref = np.array([problem._Xbc[dof] for dof in dof_cd])
+            dof_ref = problem._Xbc[dof_cd]
         else:
-            dof_ref = np.array(
-                [problem.get_dof_solution()[dof] + problem._Xbc[dof] for dof in dof_cd]
-            )
+            dof_ref = problem.get_dof_solution()[dof_cd] + problem._Xbc[dof_cd]
 
         disp_ref = dof_ref[:3]  # reference displacement
         angles = dof_ref[3:]  # rotation angle
 
-        sin = np.sin(angles)
-        cos = np.cos(angles)
-
         R = Rotation.from_euler("XYZ", angles).as_matrix()
-        # #or
-        # R2 = np.array([[cos[1]*cos[2], -cos[1]*sin[2], sin[1]],
-        #           [cos[0]*sin[2] + cos[2]*sin[0]*sin[1], cos[0]*cos[2]-sin[0]*sin[1]*sin[2], -cos[1]*sin[0]],
-        #           [sin[0]*sin[2] - cos[0]*cos[2]*sin[1], cos[2]*sin[0]+cos[0]*sin[1]*sin[2], cos[0]*cos[1]]] )
 
         # approche globale :
         # crd = mesh.nodes + problem.get_disp()
         # Uini = (crd - crd[0]) @ R.T + disp_ref #node disp at the begining of the iteration
 
         # Correct displacement of slave nodes to be consistent with the master nodes
+        crd = mesh.nodes[list_nodes] - mesh.nodes[node_cd[0]]
         new_disp = (
-            (mesh.nodes[list_nodes] - mesh.nodes[node_cd[0]]) @ R.T
-            + mesh.nodes[node_cd[0]]
-            + disp_ref
-            - mesh.nodes[list_nodes]
+            crd @ R.T + mesh.nodes[node_cd[0]] + disp_ref - mesh.nodes[list_nodes]
         )
 
         if problem._dU is not 0:
             if problem._U is not 0:
-                problem._dU.reshape(3, -1)[:, list_nodes] = (
-                    new_disp.T - problem._U.reshape(3, -1)[:, list_nodes]
-                )
+                problem._dU[dof_slave] = new_disp.T - problem._U[dof_slave]
             else:
-                problem._dU.reshape(3, -1)[:, list_nodes] = new_disp.T
-
-        # approche incrémentale:
+                problem._dU[dof_slave] = new_disp.T
 
-        dR_drx = np.array(
-            [
-                [0, 0, 0],
-                [
-                    -sin[0] * sin[2] + cos[2] * cos[0] * sin[1],
-                    -sin[0] * cos[2] - cos[0] * sin[1] * sin[2],
-                    -cos[1] * cos[0],
-                ],
-                [
-                    cos[0] * sin[2] + sin[0] * cos[2] * sin[1],
-                    cos[2] * cos[0] - sin[0] * sin[1] * sin[2],
-                    -sin[0] * cos[1],
-                ],
-            ]
-        )
+        if self._saved_mpc is not None and np.all(
+            np.abs(angles - self._saved_mpc[0]) <= self.rotation_tol
+        ):
+            # the linearized constraint is kept from the previous iteration
+            return [self._saved_mpc[1]]
 
-        dR_dry = np.array(
+        # approche incrémentale:
+        # derivative of the rotation matrix with respect to the 3 angles
+        # dR_dr[i] = dR/d(angles[i]) with shape = (3, 3, 3)
+        sin = np.sin(angles)
+        cos = np.cos(angles)
+        dR_dr = np.array(
             [
-                [-sin[1] * cos[2], +sin[1] * sin[2], cos[1]],
                 [
-                    cos[2] * sin[0] * cos[1],
-                    -sin[0] * cos[1] * sin[2],
-                    sin[1] * sin[0],
+                    [0, 0, 0],
+                    [
+                        -sin[0] * sin[2] + cos[2] * cos[0] * sin[1],
+                        -sin[0] * cos[2] - cos[0] * sin[1] * sin[2],
+                        -cos[1] * cos[0],
+                    ],
+                    [
+                        cos[0] * sin[2] + sin[0] * cos[2] * sin[1],
+                        cos[2] * cos[0] - sin[0] * sin[1] * sin[2],
+                        -sin[0] * cos[1],
+                    ],
                 ],
                 [
-                    -cos[0] * cos[2] * cos[1],
-                    cos[0] * cos[1] * sin[2],
-                    -cos[0] * sin[1],
+                    [-sin[1] * cos[2], +sin[1] * sin[2], cos[1]],
+                    [
+                        cos[2] * sin[0] * cos[1],
+                        -sin[0] * cos[1] * sin[2],
+                        sin[1] * sin[0],
+                    ],
+                    [
+                        -cos[0] * cos[2] * cos[1],
+                        cos[0] * cos[1] * sin[2],
+                        -cos[0] * sin[1],
+                    ],
                 ],
-            ]
-        )
-
-        dR_drz = np.array(
-            [
-                [-cos[1] * sin[2], -cos[1] * cos[2], 0],
                 [
-                    cos[0] * cos[2] - sin[2] * sin[0] * sin[1],
-                    -cos[0] * sin[2] - sin[0] * sin[1] * cos[2],
-                    0,
-                ],
-                [
-                    sin[0] * cos[2] + cos[0] * sin[2] * sin[1],
-                    -sin[2] * sin[0] + cos[0] * sin[1] * cos[2],
-                    0,
+                    [-cos[1] * sin[2], -cos[1] * cos[2], 0],
+                    [
+                        cos[0] * cos[2] - sin[2] * sin[0] * sin[1],
+                        -cos[0] * sin[2] - sin[0] * sin[1] * cos[2],
+                        0,
+                    ],
+                    [
+                        sin[0] * cos[2] + cos[0] * sin[2] * sin[1],
+                        -sin[2] * sin[0] + cos[0] * sin[1] * cos[2],
+                        0,
+                    ],
                 ],
             ]
         )
 
-        crd = mesh.nodes[list_nodes] - mesh.nodes[node_cd[0]]
-        du_drx = crd @ dR_drx.T
-        du_dry = crd @ dR_dry.T
-        du_drz = (
-            crd @ dR_drz.T
-        )  # shape = (nnodes, nvar) with nvar = 3 in 3d (ux, uy, uz)
+        # du_dr[i,j,k] = d(u_j)/d(angles[i]) for the kth slave node
+        du_dr = dR_dr @ crd.T
 
         #### MPC ####
 
         # dU - dU_ref - du_drx*drx_ref - du_dry*dry_ref - du_drz*drz_ref = 0
         # with shapes: dU, du_drx, ... -> (nnodes, nvar) - dU_ref -> (nvar), drx_ref, ... -> scalar
         # dU are associated to eliminated dof and should be different than ref dof
-        # or
-        # dUx - dUx_ref - du_drx[:,0]*drx_ref - du_dry[:,0]*dry_ref - du_drz[:,0]*drz_ref = 0
-        # dUy - dUy_ref - du_drx[1]*drx_ref - du_dry[1]*dry_ref - du_drz[1]*drz_ref = 0
-        # dUz - dUz_ref - du_drx[2]*drx_ref - du_dry[2]*dry_ref - du_drz[2]*drz_ref = 0
-        res.append(
-            MPC(
-                [
-                    list_nodes,
-                    np.full_like(list_nodes, node_cd[0]),
-                    np.full_like(list_nodes, node_cd[3]),
-                    np.full_like(list_nodes, node_cd[4]),
-                    np.full_like(list_nodes, node_cd[5]),
-                ],
-                ["DispX", var_cd[0], var_cd[3], var_cd[4], var_cd[5]],
-                [
-                    np.full_like(list_nodes, 1.0),
-                    np.full_like(list_nodes, -1.0),
-                    -du_drx[:, 0],
-                    -du_dry[:, 0],
-                    -du_drz[:, 0],
-                ],
-            )
-        )
-        res.append(
-            MPC(
-                [
-                    list_nodes,
-                    np.full_like(list_nodes, node_cd[1]),
-                    np.full_like(list_nodes, node_cd[3]),
-                    np.full_like(list_nodes, node_cd[4]),
-                    np.full_like(list_nodes, node_cd[5]),
-                ],
-                ["DispY", var_cd[1], var_cd[3], var_cd[4], var_cd[5]],
-                [
-                    np.full_like(list_nodes, 1.0),
-                    np.full_like(list_nodes, -1.0),
-                    -du_drx[:, 1],
-                    -du_dry[:, 1],
-                    -du_drz[:, 1],
-                ],
-            )
-        )
-        res.append(
-            MPC(
-                [
-                    list_nodes,
-                    np.full_like(list_nodes, node_cd[2]),
-                    np.full_like(list_nodes, node_cd[3]),
-                    np.full_like(list_nodes, node_cd[4]),
-                    np.full_like(list_nodes, node_cd[5]),
-                ],
-                ["DispZ", var_cd[2], var_cd[3], var_cd[4], var_cd[5]],
-                [
-                    np.full_like(list_nodes, 1.0),
-                    np.full_like(list_nodes, -1.0),
-                    -du_drx[:, 2],
-                    -du_dry[:, 2],
-                    -du_drz[:, 2],
-                ],
-            )
-        )
+        # All the mpc are defined in a single block where the slave dof
+        # are sorted by variable (DispX, DispY, DispZ) and then by node
+        n_slave = len(list_nodes)
+        dof_index = np.empty((5, 3 * n_slave), dtype=int)
+        dof_index[0] = dof_slave.ravel()
+        dof_index[1] = np.repeat(dof_cd[:3], n_slave)
+        dof_index[2:] = dof_cd[3:].reshape(-1, 1)
 
-        res.initialize(problem)
-        return res.generate(problem, t_fact, t_fact_old)
+        factors = np.empty((4, 3 * n_slave))
+        factors[0] = 1.0
+        factors[1:] = du_dr.reshape(3, -1)
+
+        mpc = _MPCBlock(dof_index, factors)
+        self._saved_mpc = (angles, mpc)
+        return [mpc]
 
 
 # not tested class
@@ -334,20 +288,14 @@ class RigidTie2D(BCBase):
         node_cd = self.node_cd  # node_cd[0] -> node defining center of rotation
         list_nodes = self.list_nodes
 
-        # rot_center = node_cd[0]
-        res = ListBC()
-
-        dof_cd = [
-            problem.space.variable_rank(var_cd[i]) * mesh.n_nodes + node_cd[i]
-            for i in range(len(var_cd))
-        ]
+        dof_cd = np.array(
+            [problem.space.variable_rank(var) for var in var_cd]
+        ) * mesh.n_nodes + np.asarray(node_cd)
 
         if problem.get_dof_solution() is 0:
-            dof_ref = np.array([problem._Xbc[dof] for dof in dof_cd])
+            dof_ref = problem._Xbc[dof_cd]
         else:
-            dof_ref = np.array(
-                [problem.get_dof_solution()[dof] + problem._Xbc[dof] for dof in dof_cd]
-            )
+            dof_ref = problem.get_dof_solution()[dof_cd] + problem._Xbc[dof_cd]
 
         disp_ref = dof_ref[:2]  # reference displacement
         angles = dof_ref[2]  # rotation Z angle
@@ -389,40 +337,19 @@ class RigidTie2D(BCBase):
         # dU - dU_ref - du_drx*drx_ref - du_dry*dry_ref - du_drz*drz_ref = 0
         # with shapes: dU, du_drx, ... -> (nnodes, nvar) - dU_ref -> (nvar), drx_ref, ... -> scalar
         # dU are associated to eliminated dof and should be different than ref dof
-        # or
-        # dUx - dUx_ref - du_drx[:,0]*drx_ref - du_dry[:,0]*dry_ref - du_drz[:,0]*drz_ref = 0
-        # dUy - dUy_ref - du_drx[1]*drx_ref - du_dry[1]*dry_ref - du_drz[1]*drz_ref = 0
-        # dUz - dUz_ref - du_drx[2]*drx_ref - du_dry[2]*dry_ref - du_drz[2]*drz_ref = 0
-        res.append(
-            MPC(
-                [
-                    list_nodes,
-                    np.full_like(list_nodes, node_cd[0]),
-                    np.full_like(list_nodes, node_cd[2]),
-                ],
-                ["DispX", var_cd[0], var_cd[2]],
-                [
-                    np.full_like(list_nodes, 1.0),
-                    np.full_like(list_nodes, -1.0),
-                    -du_drz[:, 0],
-                ],
-            )
-        )
-        res.append(
-            MPC(
-                [
-                    list_nodes,
-                    np.full_like(list_nodes, node_cd[1]),
-                    np.full_like(list_nodes, node_cd[2]),
-                ],
-                ["DispY", var_cd[1], var_cd[2]],
-                [
-                    np.full_like(list_nodes, 1.0),
-                    np.full_like(list_nodes, -1.0),
-                    -du_drz[:, 1],
-                ],
-            )
-        )
-
-        res.initialize(problem)
-        return res.generate(problem, t_fact, t_fact_old)
+        list_nodes = np.asarray(list_nodes, dtype=int)
+        n_slave = len(list_nodes)
+        dof_index = np.empty((3, 2 * n_slave), dtype=int)
+        dof_index[0] = (
+            np.c_[[problem.space.variable_rank(var) for var in ["DispX", "DispY"]]]
+            * mesh.n_nodes
+            + list_nodes
+        ).ravel()
+        dof_index[1] = np.repeat(dof_cd[:2], n_slave)
+        dof_index[2] = dof_cd[2]
+
+        factors = np.empty((2, 2 * n_slave))
+        factors[0] = 1.0
+        factors[1] = du_drz.T.ravel()
+
+        return [_MPCBlock(dof_index, factors)]
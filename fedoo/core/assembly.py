@@ -10,7 +10,9 @@ from fedoo.core._sparsematrix import (
 )  # required for 'old' _assembly_method
 from fedoo.core.assembly_sum import AssemblySum
 from fedoo.core.base import AssemblyBase
+from fedoo.core.diffop import DiffOp, _CoefProduct
 from fedoo.core.mesh import Mesh
+from fedoo.core.state_variables import StateVariableStore
 from fedoo.core.weakform import WeakFormBase, _AssemblyOptions
 from fedoo.lib_elements.element_list import (
     get_default_n_gp,
@@ -110,10 +112,13 @@ class Assembly(AssemblyBase):
         self.__factorize_op = (
             True  # option for debug purpose (should be set to True for performance)
         )
+        self._use_bdb_kernel = True  # use the B^T.D.B kernel if available
+        self._saved_bdb_structure = None  # sparse structure used by the B^T.D.B kernel
+        self._saved_assembly_plans = {}  # assembly plan for each weak equation
+        self._coef_buffer = None  # preallocated gauss point coefficients
 
-        self.sv = {}
-        """ Dictionary of state variables associated to the current problem."""
-        self.sv_start = {}
+        # current (sv) and start (sv_start) state variables
+        self._sv_store = StateVariableStore()
         self.sv_type = {}  # type of values (between 'Node', 'Element' and 'GaussPoint'. default = 'GaussPoint' if field not present in sv_type)
 
         self._pb = None
@@ -146,6 +151,13 @@ class Assembly(AssemblyBase):
             self.compute_elementary_operators()
 
         nvar = self.space.nvar
+
+        if _assembly_method == "new" and self._use_bdb_kernel:
+            bdb_data = self._get_bdb_data()
+            if bdb_data is not None:
+                self._assemble_bdb(bdb_data, compute)
+                return
+
         wf = self.weakform.get_weak_equation(self, self._pb)
 
         mat_gaussian_quadrature = self._get_gaussian_quadrature_mat()
@@ -155,7 +167,6 @@ class Assembly(AssemblyBase):
         )  # for element requiring many variable such as beam with disp and rot dof
 
         if _assembly_method == "new":
-            intRef, sorted_indices = wf.sort()
             # sl contains list of slice object that contains the dimension for each variable
             # size of VV and sl must be redefined for case with change of basis
             VV = 0
@@ -169,6 +180,7 @@ class Assembly(AssemblyBase):
             sl = [slice(i * n_bloc_cols, (i + 1) * n_bloc_cols) for i in range(nvar)]
 
             if n_elm_gp == 0:  # if finite difference elements, don't use BlocSparse
+                intRef, sorted_indices = wf.sort()
                 blocks = [[None for i in range(nvar)] for j in range(nvar)]
                 self._saved_bloc_structure = (
                     0  # don't save block structure for finite difference mesh
@@ -189,7 +201,7 @@ class Assembly(AssemblyBase):
                     if (
                         ii > 0 and intRef[ii] == intRef[ii - 1]
                     ):  # if same operator as previous with different coef, add the two coef
-                        coef_PG += wf.coef[ii]
+                        coef_PG = coef_PG + wf.coef[ii]
                     else:
                         coef_PG = wf.coef[
                             ii
@@ -252,167 +264,11 @@ class Assembly(AssemblyBase):
                     self._saved_bloc_structure,
                     assume_sym=self.assume_sym,
                 )
-                listMatvir = listCoef_PG = None
-
-                sum_coef = (
-                    False  # bool that indicate if operator are the same and can be sum
+                plan = self._get_assembly_plan(wf, compute)
+                VV = self._run_assembly_plan(
+                    plan, wf, MM, mat_gaussian_quadrature, n_bloc_cols * nvar, sl
                 )
 
-                if hasattr(self.weakform, "_list_mat_lumping"):
-                    change_mat_lumping = (
-                        True  # use different mat_lumping option for each operator
-                    )
-                else:
-                    change_mat_lumping = False
-                    mat_lumping = self.mat_lumping
-
-                for ii in range(len(wf.op)):
-                    if compute == "matrix" and wf.op[ii] is 1:
-                        continue
-                    if compute == "vector" and wf.op[ii] is not 1:
-                        continue
-
-                    if (
-                        wf.op[ii] is not 1
-                        and self.assume_sym
-                        and wf.op[ii].u < wf.op_vir[ii].u
-                    ):
-                        continue
-
-                    if change_mat_lumping:
-                        mat_lumping = self.weakform._list_mat_lumping[
-                            sorted_indices[ii]
-                        ]
-
-                    if np.isscalar(wf.coef[ii]) or len(wf.coef[ii]) == 1:
-                        # if n_elm_gp == 0, coef_PG = nodal values (finite diffirences)
-                        coef_PG = wf.coef[ii]
-                    else:
-                        coef_PG = self.mesh.data_to_gausspoint(wf.coef[ii][:], n_elm_gp)
-
-                    # if ii > 0 and intRef[ii] == intRef[ii-1]: #if same operator as previous with different coef, add the two coef
-                    if sum_coef:  # if same operator as previous with different coef, add the two coef
-                        coef_PG_sum += coef_PG
-                        sum_coef = False
-                    else:
-                        coef_PG_sum = coef_PG
-
-                    if (
-                        ii < len(wf.op) - 1 and intRef[ii] == intRef[ii + 1]
-                    ):  # if operator similar to the next, continue
-                        if (
-                            not (change_mat_lumping)
-                            or mat_lumping
-                            == self.weakform._list_mat_lumping[sorted_indices[ii + 1]]
-                        ):
-                            sum_coef = True
-                            continue
-
-                    coef_PG = (
-                        coef_PG_sum * mat_gaussian_quadrature.data
-                    )  # mat_gaussian_quadrature.data is the diagonal of mat_gaussian_quadrature
-                    #                Matvir = (RowBlocMatrix(self._get_elementary_operator(wf.op_vir[ii]), nvar, var_vir, coef_vir) * mat_change_of_basis).T
-                    # check how it appens with change of variable and rotation dof
-
-                    Matvir = self._get_elementary_operator(wf.op_vir[ii])
-
-                    if (
-                        listMatvir is not None
-                    ):  # factorization of real operator (sum of virtual operators)
-                        listMatvir = [
-                            listMatvir[j] + [Matvir[j]] for j in range(len(Matvir))
-                        ]
-                        listCoef_PG = listCoef_PG + [coef_PG]
-
-                    if (
-                        ii < len(wf.op) - 1
-                        and wf.op[ii] != 1
-                        and wf.op[ii + 1] != 1
-                        and self.__factorize_op == True
-                    ):
-                        # if it possible, factorization of op to increase assembly performance (sum of several op_vir)
-                        factWithNextOp = [
-                            wf.op[ii].u,
-                            wf.op[ii].x,
-                            wf.op[ii].ordre,
-                            wf.op_vir[ii].u,
-                        ] == [
-                            wf.op[ii + 1].u,
-                            wf.op[ii + 1].x,
-                            wf.op[ii + 1].ordre,
-                            wf.op_vir[ii + 1].u,
-                        ]  # True if factorization is possible with next op
-                        if factWithNextOp:
-                            if listMatvir is None:
-                                listMatvir = [
-                                    [Matvir[j]] for j in range(len(Matvir))
-                                ]  # initialization of listMatvir and listCoef_PG
-                                listCoef_PG = [coef_PG]
-                            continue  # si factorization possible -> go to next op, all the factorizable operators will treat together
-                    else:
-                        factWithNextOp = False
-
-                    coef_vir = [1]
-                    var_vir = [
-                        wf.op_vir[ii].u
-                    ]  # list in case there is an angular variable
-                    if var_vir[0] in associatedVariables:
-                        var_vir.extend(associatedVariables[var_vir[0]][0])
-                        coef_vir.extend(associatedVariables[var_vir[0]][1])
-
-                    if wf.op[ii] == 1:  # only virtual operator -> compute a vector
-                        if VV is 0:
-                            VV = np.zeros((n_bloc_cols * nvar))
-                        for i in range(len(Matvir)):
-                            try:
-                                VV[sl[var_vir[i]]] = VV[sl[var_vir[i]]] - coef_vir[
-                                    i
-                                ] * Matvir[i].T * (
-                                    coef_PG
-                                )  # this line may be optimized
-                            except:
-                                pass
-
-                    else:  # virtual and real operators -> compute a matrix
-                        coef = [1]
-                        var = [wf.op[ii].u]  # list in case there is an angular variable
-                        if var[0] in associatedVariables:
-                            var.extend(associatedVariables[var[0]][0])
-                            coef.extend(associatedVariables[var[0]][1])
-
-                        #                    Mat    =  RowBlocMatrix(self._get_elementary_operator(wf.op[ii]), nvar, var, coef)         * mat_change_of_basis
-                        Mat = self._get_elementary_operator(wf.op[ii])
-
-                        # Possibility to increase performance for multivariable case
-                        # the structure should be the same for derivative dof, so the blocs could be computed altogether
-                        if listMatvir is None:
-                            for i in range(len(Mat)):
-                                for j in range(len(Matvir)):
-                                    MM.addToBlocATB(
-                                        Matvir[j],
-                                        Mat[i],
-                                        (coef[i] * coef_vir[j]) * coef_PG,
-                                        var_vir[j],
-                                        var[i],
-                                        mat_lumping,
-                                    )
-                        else:
-                            for i in range(len(Mat)):
-                                for j in range(len(Matvir)):
-                                    MM.addToBlocATB(
-                                        listMatvir[j],
-                                        Mat[i],
-                                        [
-                                            (coef[i] * coef_vir[j]) * coef_PG
-                                            for coef_PG in listCoef_PG
-                                        ],
-                                        var_vir[j],
-                                        var[i],
-                                        mat_lumping,
-                                    )
-                            listMatvir = None
-                            listCoef_PG = None
-
             if compute != "vector":
                 if mat_change_of_basis is 1:
                     self.global_matrix = MM.tocsr()  # format csr
@@ -496,7 +352,7 @@ class Assembly(AssemblyBase):
                 if (
                     ii > 0 and intRef[ii] == intRef[ii - 1]
                 ):  # if same operator as previous with different coef, add the two coef
-                    coef_PG_sum += coef_PG
+                    coef_PG_sum = coef_PG_sum + coef_PG
                 else:
                     coef_PG_sum = coef_PG
 
@@ -663,6 +519,359 @@ class Assembly(AssemblyBase):
 
         # print('temps : ', print(compute), ' - ', time.time()- t0)
 
+    def _get_bdb_data(self):
+        # Return the data required by the B^T.D.B kernel (see _assemble_bdb)
+        # or None if the generic weak equation should be assembled.
+        if not hasattr(self.weakform, "get_bdb_data") or self.mat_lumping:
+            return None
+        if (
+            self.n_elm_gp == 0
+            or hasattr(get_element(self.elm_type), "get_elm_type")
+            or len(self._get_associated_variables()) > 0
+            or self.get_change_of_basis_mat() is not 1
+        ):
+            return None
+
+        key = (self.mesh, self.elm_type, self.n_elm_gp)
+        if key not in Assembly._saved_elementary_operators:
+            self.compute_elementary_operators()
+        if "derivative_pg" not in Assembly._saved_elementary_operators[key]:
+            return None
+
+        return self.weakform.get_bdb_data(self, self._pb)
+
+    def _assemble_bdb(self, bdb_data, compute="all"):
+        # Assemble the global matrix sum(B^T.D.B.w) and vector -sum(B^T.S0.w)
+        # with batched element computations, where:
+        # - B is the strain operator (list of 6 DiffOp given by the weakform)
+        # - D is the tangent matrix (6x6 array, or 6x6 list of gauss point values)
+        # - S0 is the initial stress (list of 6 values or 0)
+        # - w are the gaussian quadrature weights multiplied by a factor
+        # Give the same result as the generic assembly of the weak equation
+        # sum(eps[i].virtual * (D[i][j] * eps[j] + S0[i])) * factor.
+        eps, H, initial_stress, factor = bdb_data
+        mesh = self.mesh
+        n_elements = mesh.n_elements
+        n_elm_gp = self.n_elm_gp
+        n_elm_nodes = mesh.n_elm_nodes
+        nvar = self.space.nvar
+
+        def to_elm_gp(values):
+            # gauss point values -> array of shape (n_elements, n_elm_gp)
+            if np.isscalar(values) or np.size(values) == 1:
+                return np.asarray(values).item()
+            values = mesh.data_to_gausspoint(np.asarray(values), n_elm_gp)
+            return values.reshape(n_elm_gp, n_elements).T
+
+        data = Assembly._saved_elementary_operators[(mesh, self.elm_type, n_elm_gp)]
+        shape = (n_elements, n_elm_gp, n_elm_nodes)
+        crd_rank = [
+            self.space.coordinate_rank(crdname)
+            for crdname in mesh.crd_name
+            if crdname in self.space.list_coordinates()
+        ]
+
+        # Only the non zero strain components are kept.
+        list_eps = [i for i in range(6) if not (eps[i] == 0)]
+        n_eps = len(list_eps)
+
+        # terms of the strain operator: (strain component, variable, coef,
+        # values of the shape function or its derivative at gauss points)
+        terms = []
+        for k, i in enumerate(list_eps):
+            for op, coef in zip(eps[i].op, eps[i].coef):
+                if op.ordre == 0:
+                    values = data["shape_function_pg"].reshape(
+                        -1, n_elm_gp, n_elm_nodes
+                    )
+                else:
+                    values = data["derivative_pg"][..., crd_rank.index(op.x), :]
+                terms.append((k, op.u, to_elm_gp(coef), np.broadcast_to(values, shape)))
+
+        weight = to_elm_gp(self._get_gaussian_quadrature_mat().data * factor)
+
+        compute_matrix = compute != "vector"
+        if compute_matrix:
+            D_values = [[to_elm_gp(H[i][j]) for j in list_eps] for i in list_eps]
+            elm_mat = np.empty((n_elements, nvar * n_elm_nodes, nvar * n_elm_nodes))
+
+        list_stress = []
+        if compute != "matrix" and initial_stress is not 0:
+            list_stress = [
+                (k, to_elm_gp(initial_stress[i]))
+                for k, i in enumerate(list_eps)
+                if not (np.isscalar(initial_stress[i]) and initial_stress[i] == 0)
+            ]
+            elm_vec = np.empty((n_elements, nvar * n_elm_nodes))
+
+        # the elements are treated by chunks to limit the memory usage
+        chunk_size = max(1, 2**18 // (n_elm_gp * n_eps * nvar * n_elm_nodes))
+        for start in range(0, n_elements, chunk_size):
+            sl = slice(start, start + chunk_size)
+            n = min(chunk_size, n_elements - start)
+            w = weight[sl, :, None]
+
+            B = np.zeros((n, n_elm_gp, n_eps, nvar, n_elm_nodes))
+            for k, u, coef, values in terms:
+                if np.isscalar(coef):
+                    B[:, :, k, u] += coef * values[sl]
+                else:
+                    B[:, :, k, u] += coef[sl, :, None] * values[sl]
+            B = B.reshape(n, n_elm_gp, n_eps, nvar * n_elm_nodes)
+
+            if compute_matrix:
+                D = np.empty((n, n_elm_gp, n_eps, n_eps))
+                for k in range(n_eps):
+                    for l in range(n_eps):
+                        if np.isscalar(D_values[k][l]):
+                            D[:, :, k, l] = D_values[k][l]
+                        else:
+                            D[:, :, k, l] = D_values[k][l][sl]
+                DB = (D * w[..., None]) @ B
+                # element matrices: sum over the gauss points of B^T.D.B.w
+                elm_mat[sl] = np.matmul(
+                    B.transpose(0, 3, 1, 2).reshape(n, -1, n_elm_gp * n_eps),
+                    DB.reshape(n, n_elm_gp * n_eps, -1),
+                )
+
+            if len(list_stress) > 0:
+                S0 = np.zeros((n, n_elm_gp, n_eps))
+                for k, values in list_stress:
+                    S0[:, :, k] = values if np.isscalar(values) else values[sl]
+                elm_vec[sl] = np.einsum("egka,egk->ea", B, S0 * w)
+
+        # dof associated to each element with the same numbering as the
+        # generic assembly (dof = var * n_nodes + node)
+        elm_dof = (
+            np.arange(nvar).reshape(1, -1, 1) * mesh.n_nodes
+            + mesh.elements[:, None, :n_elm_nodes]
+        ).reshape(n_elements, -1)
+
+        if compute_matrix:
+            self.global_matrix = self._bdb_to_csr(elm_dof, elm_mat)
+
+        if compute != "matrix":
+            if len(list_stress) == 0:
+                self.global_vector = 0
+            else:
+                self.global_vector = -np.bincount(
+                    elm_dof.ravel(), elm_vec.ravel(), minlength=nvar * mesh.n_nodes
+                )
+
+    def _bdb_to_csr(self, elm_dof, elm_mat):
+        # Assemble the element matrices in a global csr matrix.
+        # The csr structure is computed once and saved
+        n_dof = self.space.nvar * self.mesh.n_nodes
+        if (
+            self._saved_bdb_structure is None
+            or len(self._saved_bdb_structure[0]) != elm_mat.size
+        ):
+            n_elm_dof = elm_dof.shape[1]
+            row = np.repeat(elm_dof, n_elm_dof, axis=1).ravel()
+            col = np.tile(elm_dof, n_elm_dof).ravel()
+            ind, inverse = np.unique(row * n_dof + col, return_inverse=True)
+            indptr = np.zeros(n_dof + 1, dtype=int)
+            np.cumsum(np.bincount(ind // n_dof, minlength=n_dof), out=indptr[1:])
+            self._saved_bdb_structure = (inverse.ravel(), ind % n_dof, indptr)
+
+        inverse, indices, indptr = self._saved_bdb_structure
+        values = np.bincount(inverse, elm_mat.ravel(), minlength=len(indices))
+        return sparse.csr_matrix((values, indices, indptr), shape=(n_dof, n_dof))
+
+    def _get_assembly_plan(self, wf, compute):
+        # The assembly plan only depends on the structure of the weak equation
+        # (the derivative operators of each term), not on the coefficient
+        # values. It is built once and reused while the structure is unchanged.
+        def op_key(op):
+            return None if op == 1 else (op.u, op.x, op.ordre)
+
+        def to_key(value):  # list are not hashable
+            return tuple(value) if isinstance(value, list) else value
+
+        list_mat_lumping = getattr(self.weakform, "_list_mat_lumping", None)
+
+        key = (
+            compute,
+            self.assume_sym,
+            to_key(self.mat_lumping),
+            to_key(list_mat_lumping),
+            tuple([op_key(op) for op in wf.op]),
+            tuple([op_key(op) for op in wf.op_vir]),
+        )
+        plan = self._saved_assembly_plans.get(key)
+        if plan is None:
+            if len(self._saved_assembly_plans) > 10:
+                # weak equation whose structure changes at each iteration
+                self._saved_assembly_plans.clear()
+            plan = self._build_assembly_plan(wf, compute, list_mat_lumping)
+            self._saved_assembly_plans[key] = plan
+        return plan
+
+    def _build_assembly_plan(self, wf, compute, list_mat_lumping):
+        # Return the list of the block operations required to assemble wf.
+        # Each operation is a tuple (op, groups, var_vir, coef_vir, var, coef,
+        # mat_lumping) with:
+        # - op: the real operator (1 for a vector operation)
+        # - groups: list of (terms, op_vir) where terms are the indices of the
+        #   terms of wf whose coef are summed. If several groups are given,
+        #   the real operator is factorized (sum of several op_vir).
+        # - var, coef, var_vir, coef_vir: the variables associated to op and
+        #   op_vir (several variables for element with rotation dof)
+        associatedVariables = self._get_associated_variables()
+
+        # sort a copy of wf: the plan refers to the unsorted term indices
+        wf = DiffOp(wf.op, wf.op_vir, wf.coef)
+        intRef, sorted_indices = wf.sort()
+        n_op = len(wf.op)
+
+        plan = []
+        terms = []
+        groups = []
+        mat_lumping = self.mat_lumping
+        for ii in range(n_op):
+            op = wf.op[ii]
+            op_vir = wf.op_vir[ii]
+            if compute == "matrix" and op == 1:
+                continue
+            if compute == "vector" and op != 1:
+                continue
+            if op != 1 and self.assume_sym and op.u < op_vir.u:
+                continue
+
+            if list_mat_lumping is not None:
+                mat_lumping = list_mat_lumping[sorted_indices[ii]]
+
+            terms.append(sorted_indices[ii])
+            if ii < n_op - 1 and intRef[ii] == intRef[ii + 1]:
+                # same operator as the next with different coef -> sum the coef
+                if (
+                    list_mat_lumping is None
+                    or mat_lumping == list_mat_lumping[sorted_indices[ii + 1]]
+                ):
+                    continue
+
+            groups.append((terms, op_vir))
+            terms = []
+
+            if (
+                ii < n_op - 1
+                and op != 1
+                and wf.op[ii + 1] != 1
+                and self.__factorize_op == True
+            ):
+                # if it possible, factorization of op to increase assembly
+                # performance (sum of several op_vir)
+                if [op.u, op.x, op.ordre, op_vir.u] == [
+                    wf.op[ii + 1].u,
+                    wf.op[ii + 1].x,
+                    wf.op[ii + 1].ordre,
+                    wf.op_vir[ii + 1].u,
+                ]:
+                    continue
+
+            coef_vir = [1]
+            var_vir = [op_vir.u]  # list in case there is an angular variable
+            if var_vir[0] in associatedVariables:
+                var_vir.extend(associatedVariables[var_vir[0]][0])
+                coef_vir.extend(associatedVariables[var_vir[0]][1])
+
+            if op == 1:  # only virtual operator -> compute a vector
+                plan.append((op, groups, var_vir, coef_vir, None, None, False))
+            else:  # virtual and real operators -> compute a matrix
+                coef = [1]
+                var = [op.u]  # list in case there is an angular variable
+                if var[0] in associatedVariables:
+                    var.extend(associatedVariables[var[0]][0])
+                    coef.extend(associatedVariables[var[0]][1])
+                plan.append((op, groups, var_vir, coef_vir, var, coef, mat_lumping))
+            groups = []
+
+        return plan
+
+    def _run_assembly_plan(self, plan, wf, MM, mat_gaussian_quadrature, n_dof, sl):
+        # Assemble the weak equation wf in the BlocSparse matrix MM using
+        # the assembly plan. Return the global vector (0 if not computed)
+        n_elm_gp = self.n_elm_gp
+        # mat_gaussian_quadrature.data is the diagonal of mat_gaussian_quadrature
+        weight = mat_gaussian_quadrature.data
+        VV = 0
+
+        # preallocated arrays for the coef values at gauss points
+        # (the last one is used as a temporary array)
+        n_buffer = max([len(step[1]) for step in plan], default=0) + 1
+        if (
+            self._coef_buffer is None
+            or self._coef_buffer.shape[0] < n_buffer
+            or self._coef_buffer.shape[1] != len(weight)
+        ):
+            self._coef_buffer = np.empty((n_buffer, len(weight)))
+        temp = self._coef_buffer[-1]
+        products = {}  # product of arrays shared by several lazy coef
+
+        for op, groups, var_vir, coef_vir, var, coef, mat_lumping in plan:
+            list_coef_PG = []
+            list_Matvir = []
+            for k, (terms, op_vir) in enumerate(groups):
+                coef_PG = self._coef_buffer[k]
+                for n, ii in enumerate(terms):
+                    value = wf.coef[ii]
+                    if isinstance(value, _CoefProduct) and len(value) in [1, len(temp)]:
+                        # lazy product of gauss point values: evaluated in buffer
+                        value = value.evaluate(
+                            out=coef_PG if n == 0 else temp, cache=products
+                        )
+                        if n == 0:
+                            continue
+                    elif not (np.isscalar(value) or len(value) == 1):
+                        value = self.mesh.data_to_gausspoint(value[:], n_elm_gp)
+                    if n == 0:
+                        coef_PG[:] = value
+                    else:
+                        coef_PG += value
+                coef_PG *= weight
+                list_coef_PG.append(coef_PG)
+                list_Matvir.append(self._get_elementary_operator(op_vir))
+
+            if op == 1:  # only virtual operator -> compute a vector
+                Matvir = list_Matvir[0]
+                coef_PG = list_coef_PG[0]
+                if VV is 0:
+                    VV = np.zeros(n_dof)
+                for i in range(len(Matvir)):
+                    try:
+                        VV[sl[var_vir[i]]] = (
+                            VV[sl[var_vir[i]]] - coef_vir[i] * Matvir[i].T * coef_PG
+                        )  # this line may be optimized
+                    except:
+                        pass
+
+            else:  # virtual and real operators -> compute a matrix
+                Mat = self._get_elementary_operator(op)
+                for i in range(len(Mat)):
+                    for j in range(len(list_Matvir[0])):
+                        c = coef[i] * coef_vir[j]
+                        if len(groups) == 1:
+                            MM.addToBlocATB(
+                                list_Matvir[0][j],
+                                Mat[i],
+                                c * list_coef_PG[0],
+                                var_vir[j],
+                                var[i],
+                                mat_lumping,
+                            )
+                        else:
+                            # factorization of real operator (sum of virtual operators)
+                            MM.addToBlocATB(
+                                [Matvir[j] for Matvir in list_Matvir],
+                                Mat[i],
+                                [c * coef_PG for coef_PG in list_coef_PG],
+                                var_vir[j],
+                                var[i],
+                                mat_lumping,
+                            )
+
+        return VV
+
     def get_change_of_basis_mat(self):
         ### change of basis treatment for beam or plate elements
         ### Compute the change of basis matrix for vector defined in self.space.list_vectors()
@@ -792,9 +1001,8 @@ class Assembly(AssemblyBase):
         self.weakform.initialize(self, pb)
 
         self._pb = pb  # set the associated problem
-        self.sv_start = dict(
-            self.sv
-        )  # initialization in case sv in modified by weakform.initialize
+        # initialization in case sv in modified by weakform.initialize
+        self._sv_store.commit()
 
     def set_start(self, pb):
         """
@@ -808,9 +1016,8 @@ class Assembly(AssemblyBase):
                 self, pb
             )  # should update GetH() method to return elastic rigidity matrix for prediction
 
-        self.sv_start = dict(
-            self.sv
-        )  # create a new dict with alias inside (not deep copy)
+        # sv_start values are aliases of the sv values (not deep copy)
+        self._sv_store.commit()
 
         self.current.assemble_global_mat("all")
         # no need to compute vector if the previous iteration has converged and (dt hasn't changed or dt isn't used in the weakform)
@@ -839,7 +1046,7 @@ class Assembly(AssemblyBase):
             self.weakform.constitutivelaw.to_start(self, pb)
 
         # replace statev with the start values
-        self.sv = self.current.sv = dict(self.sv_start)
+        self._sv_store.rollback()
 
         self.current.assemble_global_mat("all")
 
@@ -857,8 +1064,7 @@ class Assembly(AssemblyBase):
         self.current = self
 
         # remove all state variables
-        self.sv = {}
-        self.sv_start = {}
+        self._sv_store.clear()
         self.sv_type = {}
 
     @staticmethod
@@ -1017,6 +1223,12 @@ class Assembly(AssemblyBase):
                     i + 1
                 ]  # as index and indptr should be the same, perhaps it will be more memory efficient to only store the data field
 
+            if NbDoFperNode == 1 and n_interpol_nodes == n_elm_nodes:
+                # dense values at gauss points used by the B^T.D.B kernel
+                data["shape_function_pg"] = elmRef.ShapeFunctionPG
+                if nb_dir_deriv > 0:
+                    data["derivative_pg"] = derivativePG
+
             Assembly._saved_elementary_operators[(mesh, elm_type.name, n_elm_gp)] = data
 
     def _get_elementary_operator(self, deriv, n_elm_gp=None):
@@ -1628,11 +1840,48 @@ class Assembly(AssemblyBase):
         """
         return self.mesh.n_elements * self.n_elm_gp
 
+    @property
+    def sv(self):
+        """Dictionary of state variables associated to the current problem."""
+        return self._sv_store.current
+
+    @sv.setter
+    def sv(self, value):
+        self._sv_store.current = value
+
+    @property
+    def sv_start(self):
+        """Dictionary of state variables at the beginning of the time increment."""
+        return self._sv_store.start
+
+    @sv_start.setter
+    def sv_start(self, value):
+        self._sv_store.start = value
+
     @property
     def state_variables(self):
         """Alias for the sv dict containing the state variables."""
         return self.sv
 
+    def get_sv_buffer(self, name, shape, dtype=float):
+        """Return a preallocated array to write the new value of a state variable.
+
+        The returned array doesn't share memory with the value in sv_start,
+        so that it can be modified in place and set in sv without allocating
+        a new array at each iteration. See
+        :py:meth:`fedoo.core.state_variables.StateVariableStore.get_buffer`.
+
+        Parameters
+        ----------
+        name : str
+            Name of the state variable.
+        shape : tuple of int
+            Shape of the array (generally with the gauss points as last axis).
+        dtype : data-type, default = float
+            dtype of the array.
+        """
+        return self._sv_store.get_buffer(name, shape, dtype)
+
     @staticmethod
     def sum(*listAssembly, name="", **kargs):
         """
@@ -1,3 +1,5 @@
+import hashlib
+
 import numpy as np
 from scipy import sparse
 from numbers import Number
@@ -669,5 +671,162 @@ class MPC(BCBase):
         return [self]
 
 
+class _MPCBlock:
+    """Elementary block of mpc directly defined by dof arrays.
+
+    Used by the constraints that generate many mpc at once (see RigidTie).
+    The mpc are defined such as:
+    X[dof_index[0,i]] = sum_j factors[j,i] * X[dof_index[j+1,i]] + value
+
+    Parameters
+    ----------
+    dof_index : array of int with shape (1 + n_master, n_mpc)
+        Slave dof (first line) and master dof of each mpc.
+    factors : array with shape (n_master, n_mpc)
+        Factors associated to the master dof.
+    value : scalar or array with shape (n_mpc,)
+        Constant value of the mpc.
+    """
+
+    bc_type = "MPC"
+
+    def __init__(self, dof_index, factors, value=0):
+        self._dof_index = dof_index
+        self._factors = factors
+        self._current_value = value
+
+
+class _ConstraintStore:
+    """Columnar store of the elementary boundary conditions of a problem.
+
+    The elementary bc (Dirichlet, Neumann and MPC) generated by a ListBC
+    are appended in bulk (one block of arrays per bc). The prescribed values
+    are written in the Xbc and F vectors as soon as the bc are appended
+    (some bc like RigidTie read the values already prescribed in Xbc),
+    while the mpc blocks are concatenated only once by the finalize method.
+
+    Available attributes:
+
+      * Xbc: prescribed values (Dirichlet dof and mpc slave dof).
+      * F: values of the Neumann bc.
+      * blocked_mask: boolean mask of the dof blocked by Dirichlet bc.
+      * slave_mask: boolean mask of all the eliminated dof (Dirichlet and
+        mpc slave dof). Only available after finalize.
+      * mpc_slave: slave (eliminated) dof of each mpc.
+      * mpc_indptr, mpc_master, mpc_factors: master dof and associated
+        factors of the mpc, using a CSR layout (the master dof of the ith mpc
+        are mpc_master[mpc_indptr[i]:mpc_indptr[i+1]]). Only available
+        after finalize.
+    """
+
+    def __init__(self, n_dof):
+        self.n_dof = n_dof
+        self.Xbc = np.zeros(n_dof)
+        self.F = np.zeros(n_dof)
+        self.blocked_mask = np.zeros(n_dof, dtype=bool)
+        self._mpc = []  # (slave, master, factors) with master.shape = (n_mpc, n_master)
+
+    def append(self, bc):
+        """Append an elementary bc (with bc_type in 'Dirichlet', 'Neumann' or 'MPC')."""
+        if bc.bc_type == "Dirichlet":
+            self.add_dirichlet(bc._dof_index, bc._current_value)
+        elif bc.bc_type == "Neumann":
+            self.add_neumann(bc._dof_index, bc._current_value)
+        elif bc.bc_type == "MPC":
+            # only factors for non eliminated (master) dof
+            self.add_mpc(
+                bc._dof_index[0],
+                bc._dof_index[1:].T,
+                np.asarray(bc._factors).T,
+                bc._current_value,
+            )
+
+    def add_dirichlet(self, dof, value=0):
+        self.Xbc[dof] = value
+        self.blocked_mask[dof] = True
+
+    def add_neumann(self, dof, value=0):
+        self.F[dof] = value
+
+    def add_mpc(self, slave, master, factors, value=0):
+        """Append a block of mpc sharing the same number of master dof.
+
+        Parameters
+        ----------
+        slave : array of int with shape (n_mpc,)
+            Eliminated dof of each mpc.
+        master : array of int with shape (n_mpc, n_master)
+            Master dof of each mpc.
+        factors : array with shape (n_mpc, n_master) or broadcastable
+            Factors of the master dof, such as:
+            X[slave[i]] = sum_j factors[i,j] * X[master[i,j]] + value[i]
+        value : scalar or array with shape (n_mpc,)
+            Constant value of the mpc.
+        """
+        slave = np.asarray(slave, dtype=int).ravel()
+        master = np.asarray(master, dtype=int).reshape(len(slave), -1)
+        factors = np.broadcast_to(factors, master.shape)
+        self._mpc.append((slave, master, factors))
+        self.Xbc[slave] = value
+
+    def finalize(self):
+        """Concatenate the mpc blocks and build the eliminated dof mask."""
+        if len(self._mpc) > 0:
+            self.mpc_slave = np.concatenate([b[0] for b in self._mpc])
+            counts = np.concatenate(
+                [np.full(len(b[0]), b[1].shape[1]) for b in self._mpc]
+            )
+            self.mpc_master = np.concatenate([b[1].ravel() for b in self._mpc])
+            self.mpc_factors = np.concatenate([b[2].ravel() for b in self._mpc])
+        else:
+            self.mpc_slave = np.empty(0, dtype=int)
+            counts = np.empty(0, dtype=int)
+            self.mpc_master = np.empty(0, dtype=int)
+            self.mpc_factors = np.empty(0)
+
+        self.mpc_indptr = np.zeros(len(counts) + 1, dtype=int)
+        np.cumsum(counts, out=self.mpc_indptr[1:])
+
+        self.slave_mask = self.blocked_mask.copy()
+        self.slave_mask[self.mpc_slave] = True
+
+    @property
+    def n_mpc(self):
+        return len(self.mpc_slave)
+
+    def get_dof_key(self):
+        """Key (n_dof, sha1) of the eliminated dof (Dirichlet and mpc slaves)."""
+        return (
+            self.n_dof,
+            _sha1(np.packbits(self.blocked_mask), self.mpc_slave),
+        )
+
+    def get_mpc_key(self):
+        """Key (n_dof, sha1) of the mpc slave dof, master dof and factors."""
+        return (
+            self.n_dof,
+            _sha1(self.mpc_slave, self.mpc_indptr, self.mpc_master, self.mpc_factors),
+        )
+
+    def get_mpc_matrix(self):
+        """Return the sparse matrix M such as X[mpc_slave] = M @ X + Xbc."""
+        row = np.repeat(self.mpc_slave, np.diff(self.mpc_indptr))
+        return sparse.coo_matrix(
+            (self.mpc_factors, (row, self.mpc_master)),
+            shape=(self.n_dof, self.n_dof),
+        )
+
+
+def _sha1(*arrays):
+    # digest of the array values (the length of each array is included so
+    # that different splits of the same bytes give different digests)
+    h = hashlib.sha1()
+    for array in arrays:
+        array = np.ascontiguousarray(array)
+        h.update(np.int64(array.size).tobytes())
+        h.update(array.tobytes())
+    return h.digest()
+
+
 if __name__ == "__main__":
     pass
@@ -4,8 +4,10 @@ from __future__ import annotations
 
 import numpy as np
 import os
+from concurrent.futures import ThreadPoolExecutor
 from zipfile import ZipFile, Path
 from fedoo.core.mesh import Mesh
+from fedoo.core.frame_store import FrameStore, StoredFrame
 from fedoo.util.voigt_tensors import StressTensorList
 
 try:
@@ -499,7 +501,7 @@ class DataSet:
         File type is inferred from the extension of the filename.
 
         The available file types are:
-            * 'fdz': A zipped archive containing the mesh using the 'vtk' format named '_mesh_.vtk',
+            * 'fdz': A zipped archive containing the mesh arrays in a npz file named '_mesh_.npz',
               and data from several iterations named 'iter_x.npz' where x is the iteration number
               (x=0 for the 1st iteration).
             * 'vtk': The vtk format contains the mesh and the data in a single files. The gauss
@@ -508,6 +510,9 @@ class DataSet:
               iteration. In case of multiple saved iterations, a directory is created and
               one vtk file is saved per iteration. The mesh is included in every file
               which is not memory efficient.
+            * 'fdm': A directory containing the mesh arrays and one uncompressed binary
+              file per field that can be memory-mapped
+              (see :py:class:`fedoo.core.frame_store.FrameStore`).
             * 'msh': Format associated to gmsh. Have the same drawback as the vtk format for
               time depend results and missing gauss points data. The vtk format should be prefered.
             * 'npz': Save data in a numpy file npz which doesn't include the mesh. The mesh
@@ -550,6 +555,8 @@ class DataSet:
             self.to_fdz(
                 filename, save_mesh=True, compressed=compressed
             )  # create a new file and add the mesh
+        elif ext == ".fdm":
+            _create_frame_store(filename, self.mesh).append(self.to_dict())
 
     def save_mesh(self, filename: str):
         """Save the mesh using a vtk file. The extension of filename is ignored and modified to '.vtk'."""
@@ -596,6 +603,9 @@ class DataSet:
             # used to load one iteration in fdz file
             data = np.load(data.open("rb"))
             self.load_dict(data)
+        elif isinstance(data, StoredFrame):
+            # used to load one iteration in fdm file (memmap arrays)
+            self.load_dict(data.to_dict())
         elif isinstance(data, str):
             # load from a file
             filename = data
@@ -615,10 +625,7 @@ class DataSet:
                     file = ZipFile(filename, "r")
                     if f"iter_{iteration}.npz" in file.namelist():
                         data = np.load(file.open(f"iter_{iteration}.npz"))
-                        # pyvista cant read file object. So copy to disk read and remove.
-                        file.extract("_mesh_.vtk")
-                        self.mesh = Mesh.read("_mesh_.vtk")
-                        os.remove("_mesh_.vtk")
+                        self.mesh = _read_fdz_mesh(file)
                     else:
                         raise NameError(
                             f"Specified iteration not found in the fdz {filename}."
@@ -643,9 +650,15 @@ class DataSet:
     def load_dict(self, data: dict) -> None:
         """Load data from a dict generated with the to_dict method.
         The old data are erased."""
-        self.node_data = {k[:-3]: v for k, v in data.items() if k[-2:] == "nd"}
-        self.element_data = {k[:-3]: v for k, v in data.items() if k[-2:] == "el"}
-        self.gausspoint_data = {k[:-3]: v for k, v in data.items() if k[-2:] == "gp"}
+        self.node_data = {
+            k[:-3]: _decode_field(data, k) for k in data.keys() if k[-2:] == "nd"
+        }
+        self.element_data = {
+            k[:-3]: _decode_field(data, k) for k in data.keys() if k[-2:] == "el"
+        }
+        self.gausspoint_data = {
+            k[:-3]: _decode_field(data, k) for k in data.keys() if k[-2:] == "gp"
+        }
         self.scalar_data = {k[:-3]: v.item() for k, v in data.items() if k[-2:] == "sc"}
         # self.scalar_data = {k[:-3]:v for k,v in data.items() if k[-2:] == 'sc'}
 
@@ -746,16 +759,20 @@ class DataSet:
             If True, the Gauss Point data are interpolated as Node data.
             If False, the Gauss Point data are ignored (vtk file don't have Gauss Point Data)
         """
-        if USE_PYVISTA:
-            binary = True
-            ext = os.path.splitext(filename)[1]
-            if ext == "":
-                filename = filename + ".vtk"
+        ext = os.path.splitext(filename)[1]
+        if ext == "":
+            filename = filename + ".vtk"
+            ext = ".vtk"
+        if USE_PYVISTA and ext.lower() not in [".vtk", ".vtu"]:
             self.to_pyvista(gp_data_to_node).save(filename, binary)
+        elif ext.lower() == ".vtu":
+            from fedoo.util.mesh_writer import write_vtu
+
+            write_vtu(self, filename, gp_data_to_node)
         else:
             from fedoo.util.mesh_writer import write_vtk
 
-            write_vtk(self, filename, gp_data_to_node)
+            write_vtk(self, filename, gp_data_to_node, binary)
 
     def to_pyvista(self, gp_data_to_node: bool = True):
         if self.mesh is not None:
@@ -778,7 +795,7 @@ class DataSet:
         else:
             raise TypeError("Mesh should be defined befort converted to pyvista object")
 
-    def to_msh(self, filename: str) -> None:
+    def to_msh(self, filename: str, binary: bool = True) -> None:
         """Write a msh (gmsh format) file with the mesh and associated data
         (gausspoint data not included).
 
@@ -786,10 +803,12 @@ class DataSet:
         ----------
         filename : str
             Name of the file including the path.
+        binary : bool, default = True
+            If True, write as binary. Otherwise, write as ASCII.
         """
         from fedoo.util.mesh_writer import write_msh
 
-        write_msh(self, filename)
+        write_msh(self, filename, binary=binary)
 
     def to_dict(self) -> dict:
         """Return a dict with all the node, element and gausspoint data."""
@@ -818,21 +837,13 @@ class DataSet:
         name, ext = os.path.splitext(filename)
         if ext == "":
             filename = filename + ".fdz"
-        if compressed:
-            self.savez_compressed("_mesh_", save_mesh)
-        else:
-            self.savez("_mesh_", save_mesh)
-        if save_mesh:
-            file = ZipFile(filename, "w")
-        else:
-            file = ZipFile(filename, "a")
 
-        file.write("_mesh_.npz", "iter_" + str(iteration) + ".npz")
-        os.remove("_mesh_.npz")
-        if save_mesh:
-            file.write("_mesh_.vtk")
-            os.remove("_mesh_.vtk")
-        file.close()
+        with ZipFile(filename, "w" if save_mesh else "a") as file:
+            _write_fdz_frame(
+                file, "iter_" + str(iteration) + ".npz", self.to_dict(), compressed
+            )
+            if save_mesh:
+                _write_fdz_mesh(file, self.mesh)
 
     def savez(self, filename: str, save_mesh: bool = False) -> None:
         """Write a npz file using the numpy savez function.
@@ -902,14 +913,14 @@ class MultiFrameDataSet(DataSet):
 
         If filename has no extension, the format is given in the parameter file_format
         (default = 'fdz').
-        If format is not 'fdz', the data files are saved using the given filename and format
+        If format is not 'fdz' or 'fdm', the data files are saved using the given filename and format
         simply adding the iteration number to the file name. The mesh is also saved in vtk format in the same directory.
         """
         dirname = os.path.dirname(filename)
         extension = os.path.splitext(filename)[1]
         if extension == "":
             file_format = file_format.lower()
-            if file_format != "fdz":
+            if file_format not in ["fdz", "fdm"]:
                 dirname = filename + "/"
                 filename = dirname + os.path.basename(filename)
         else:
@@ -922,11 +933,17 @@ class MultiFrameDataSet(DataSet):
         if dirname and not (os.path.isdir(dirname)):
             os.mkdir(dirname)
         if file_format == "fdz":
-            self.load(0)
-            self.to_fdz(filename, True, 0, compressed)
-            for i in range(1, len(self.list_data)):
+            with ZipFile(filename + ".fdz", "w") as file:
+                _write_fdz_mesh(file, self.mesh)
+                for i in range(len(self.list_data)):
+                    self.load(i)
+                    data = _add_frame_lim(self.to_dict(), self.mesh.n_physical_nodes)
+                    _write_fdz_frame(file, "iter_" + str(i) + ".npz", data, compressed)
+        elif file_format == "fdm":
+            store = _create_frame_store(filename + ".fdm", self.mesh)
+            for i in range(len(self.list_data)):
                 self.load(i)
-                self.to_fdz(filename, False, i, compressed)
+                store.append(_add_frame_lim(self.to_dict(), self.mesh.n_physical_nodes))
         else:
             for i in range(len(self.list_data)):
                 self.load(i)
@@ -1309,6 +1326,7 @@ class MultiFrameDataSet(DataSet):
     def get_history(self, list_fields, list_indices=None, **kargs):
         data_type = kargs.pop("data_type", None)
         component = kargs.pop("component", 0)
+        n_threads = kargs.pop("n_threads", None)
 
         if isinstance(list_fields, str):
             list_fields = [list_fields]
@@ -1317,18 +1335,144 @@ class MultiFrameDataSet(DataSet):
             if list_indices is None:
                 list_indices = [None for field in list_fields]
 
-        history = [[] for field in list_fields]
-        for it in range(self.n_iter):
-            self.load(it)
+        history = [None for field in list_fields]
+
+        # if the data are memory-mapped, read only the required slices
+        store = self._get_frame_store()
+        if store is not None:
             for i, field in enumerate(list_fields):
-                data = self.get_data(field, component, data_type)
-                if list_indices[i] is None or np.isscalar(data):
-                    history[i].append(data)
-                else:
-                    history[i].append(data[list_indices[i]])
+                history[i] = self._get_stored_history(
+                    store, field, list_indices[i], component, data_type
+                )
+
+        list_to_load = [i for i, hist in enumerate(history) if hist is None]
+        if len(list_to_load) > 0:
+
+            def extract_values(frame):
+                values = []
+                for i in list_to_load:
+                    data = frame.get_data(list_fields[i], component, data_type)
+                    if list_indices[i] is None or np.isscalar(data):
+                        values.append(data)
+                    else:
+                        values.append(data[list_indices[i]])
+                return values
+
+            frame_values = self.scan_frames(extract_values, n_threads)
+            for j, i in enumerate(list_to_load):
+                history[i] = [values[j] for values in frame_values]
 
         return tuple(np.array(field_hist) for field_hist in history)
 
+    def scan_frames(self, func, n_threads=None):
+        """Apply a function to all the frames using a pool of threads.
+
+        Each frame is loaded in a new DataSet object (sharing the same mesh),
+        so the frame currently loaded in the MultiFrameDataSet is not
+        modified.
+
+        Parameters
+        ----------
+        func : callable
+            Function called for each frame with the DataSet of the frame as
+            argument.
+        n_threads : int, optional
+            Number of threads. If None, the ThreadPoolExecutor default
+            value is used.
+
+        Returns
+        -------
+        list
+            The list of the values returned by func for each frame.
+        """
+
+        def load_frame(iteration):
+            frame = DataSet(self.mesh)
+            frame.load(self.list_data[iteration])
+            return func(frame)
+
+        return self._map_frames(load_frame, n_threads)
+
+    def _map_frames(self, func, n_threads=None):
+        # apply func(iteration) to all the frames using a pool of threads
+        if self.n_iter < 2 or n_threads == 1:
+            return [func(it) for it in range(self.n_iter)]
+        with ThreadPoolExecutor(n_threads) as executor:
+            return list(executor.map(func, range(self.n_iter)))
+
+    def _open_frame(self, iteration):
+        # Return a lazy mapping (NpzFile or dict of memmap) with the arrays of
+        # a frame using the to_dict keys, or None if the frame can't be read
+        # without loading it entirely.
+        data = self.list_data[iteration]
+        if isinstance(data, StoredFrame):
+            return data.to_dict()
+        elif isinstance(data, Path):
+            return np.load(data.open("rb"))
+        elif isinstance(data, str) and os.path.splitext(data)[1].lower() == ".npz":
+            return np.load(data)
+        return None
+
+    def _get_frame_store(self):
+        # return the FrameStore if all the frames are stored in the same
+        # FrameStore with the right order, else return None
+        if len(self.list_data) == 0 or not (isinstance(self.list_data[0], StoredFrame)):
+            return None
+        store = self.list_data[0].store
+        if store.n_frames < len(self.list_data):
+            store.refresh()
+        for i, frame in enumerate(self.list_data):
+            if (
+                not (isinstance(frame, StoredFrame))
+                or frame.store is not store
+                or frame.iteration != i
+            ):
+                return None
+        return store
+
+    def _get_stored_history(self, store, field, indices, component, data_type):
+        # return the history of a field directly extracted from the memmap
+        # arrays. Return None if the field needs to be converted.
+        suffix = {"Node": "nd", "Element": "el", "GaussPoint": "gp", "Scalar": "sc"}
+        if data_type is None:
+            list_keys = [field + "_" + suf for suf in ["nd", "el", "gp", "sc"]]
+        else:
+            list_keys = [field + "_" + suffix[data_type]]
+
+        for key in list_keys:
+            if key in store.fields:
+                break
+        else:
+            return None
+
+        if key + "_qstep" in store.fields:  # quantized data need to be decoded
+            return None
+
+        data = store.get_field(key)[: self.n_iter]
+        if key[-2:] == "sc":  # scalar data, as returned by load_dict
+            return np.array(data).reshape(-1)
+        if component is not None and data.ndim > 2:
+            if isinstance(component, str):
+                component = {
+                    "X": 0,
+                    "Y": 1,
+                    "Z": 2,
+                    "XX": 0,
+                    "YY": 1,
+                    "ZZ": 2,
+                    "XY": 3,
+                    "XZ": 4,
+                    "YZ": 5,
+                }.get(component)
+                if component is None:  # 'vm' or 'norm' need to be computed
+                    return None
+            data = data[:, component]
+
+        if indices is not None and data.ndim > 1:
+            data = data[:, indices]
+
+        return np.array(data)
+
     def plot_history(
         self,
         field: str,
@@ -1343,35 +1487,95 @@ class MultiFrameDataSet(DataSet):
         else:
             raise NameError("Matplotlib should be installed to plot the data history")
 
-    def get_all_frame_lim(self, field, component=0, data_type=None, scale=1):
-        ndim = self.mesh.ndim
-        clim = [np.inf, -np.inf]
+    def get_all_frame_lim(
+        self, field, component=0, data_type=None, scale=1, n_threads=None
+    ):
+        """Get the bounding box of the deformed mesh and the limits of a field
+        over all the frames.
+
+        If the min and max values of the field have been saved with the
+        frames (default for the results saved by a problem), the limits are
+        obtained without reading the field data. Else, the frames are
+        loaded using a pool of threads.
+
+        Parameters
+        ----------
+        field : str
+            The name of the field.
+        component : int | str (default = 0)
+            The data component (see DataSet.get_data).
+        data_type : str in {'Node', 'Element', 'GaussPoint'} - Optional
+            The type of data (see DataSet.get_data).
+        scale : float (default = 1)
+            The scale factor used for the nodes displacement.
+        n_threads : int, optional
+            Number of threads used to read the frames.
+
+        Returns
+        -------
+        Xmin : np.ndarray
+            Minimal coordinates of the deformed mesh.
+        Xmax : np.ndarray
+            Maximal coordinates of the deformed mesh.
+        clim : list
+            [min, max] values of the field.
+        """
         crd = self.mesh.physical_nodes
         n_physical_nodes = self.mesh.n_physical_nodes
 
-        for i in range(0, self.n_iter):
-            self.load(i)
-            data = self.get_data(field, component, data_type)[:n_physical_nodes]
-            clim = [
-                np.min([data.min(), clim[0]]),
-                np.max([data.max(), clim[1]]),
-            ]
-
-            if "Disp" in self.node_data:
-                new_crd = crd + scale * self.node_data["Disp"].T[:n_physical_nodes]
-
-                new_Xmin = new_crd.min(axis=0)
-                new_Xmax = new_crd.max(axis=0)
-                if i == 0:
-                    Xmin = new_Xmin
-                    Xmax = new_Xmax
-                else:
-                    Xmin = [np.min([Xmin[i], new_Xmin[i]]) for i in range(ndim)]
-                    Xmax = [np.max([Xmax[i], new_Xmax[i]]) for i in range(ndim)]
-
-        if "Disp" not in self.node_data:
+        suffix = {"Node": "nd", "Element": "el", "GaussPoint": "gp", "Scalar": "sc"}
+        if data_type is None:
+            list_keys = [field + "_" + suf for suf in ["nd", "el", "gp", "sc"]]
+        else:
+            list_keys = [field + "_" + suffix[data_type]]
+
+        def frame_lim(iteration):
+            data_lim = None
+            disp = None
+            frame = self._open_frame(iteration)
+            if frame is not None:
+                for key in list_keys:
+                    if key in frame:
+                        if key + "_min" in frame:
+                            data_lim = _get_component_lim(
+                                frame[key + "_min"], frame[key + "_max"], component
+                            )
+                        break
+                if "Disp_nd" in frame:
+                    disp = _decode_field(frame, "Disp_nd")
+                if hasattr(frame, "close"):
+                    frame.close()
+
+            if data_lim is None:
+                # load the whole frame
+                frame = DataSet(self.mesh)
+                frame.load(self.list_data[iteration])
+                data, current_data_type = frame.get_data(
+                    field, component, data_type, True
+                )
+                if current_data_type == "Node":
+                    data = data[:n_physical_nodes]
+                data_lim = [data.min(), data.max()]
+                disp = frame.node_data.get("Disp")
+
+            if disp is None:
+                return data_lim, None, None
+            new_crd = crd + scale * disp.T[:n_physical_nodes]
+            return data_lim, new_crd.min(axis=0), new_crd.max(axis=0)
+
+        all_lim = self._map_frames(frame_lim, n_threads)
+
+        clim = [
+            np.min([lim[0][0] for lim in all_lim]),
+            np.max([lim[0][1] for lim in all_lim]),
+        ]
+        list_xmin = [lim[1] for lim in all_lim if lim[1] is not None]
+        if len(list_xmin) == 0:
             Xmin = self.mesh.bounding_box[0]
             Xmax = self.mesh.bounding_box[1]
+        else:
+            Xmin = np.min(list_xmin, axis=0)
+            Xmax = np.max([lim[2] for lim in all_lim if lim[2] is not None], axis=0)
 
         return np.array(Xmin), np.array(Xmax), clim
 
@@ -1387,7 +1591,7 @@ def read_data(filename: str, file_format: str = "fdz"):
     The file format may be specified in the filename extension or using
     the file_format parameter (default = fdz) if the filename has no extension.
 
-    Available file format are 'fdz', 'vtk' and 'npz'.
+    Available file format are 'fdz', 'fdm', 'vtk' and 'npz'.
     For 'npz' a vtk mesh with the same base name is also searched.
     """
     extension = os.path.splitext(filename)[1]
@@ -1397,6 +1601,8 @@ def read_data(filename: str, file_format: str = "fdz"):
 
     if file_format == "fdz":
         return read_fdz(filename)
+    if file_format == "fdm":
+        return read_fdm(filename)
 
     dirname = os.path.dirname(filename)
     if extension == "":
@@ -1442,13 +1648,9 @@ def read_fdz(filename: str):
         filename += ".fdz"
 
     assert os.path.isfile(filename), "File not found"
-    file = ZipFile(filename, "r")
-    # pyvista cant read file object. So copy to disk read and remove.
-    file.extract("_mesh_.vtk")
-    mesh = Mesh.read("_mesh_.vtk")
-    os.remove("_mesh_.vtk")
-    list_iter = file.namelist()
-    file.close()
+    with ZipFile(filename, "r") as file:
+        mesh = _read_fdz_mesh(file)
+        list_iter = file.namelist()
 
     dataset = MultiFrameDataSet(mesh)
     i = 0
@@ -1459,6 +1661,206 @@ def read_fdz(filename: str):
     return dataset
 
 
+def _add_frame_lim(data: dict, n_physical_nodes: int | None = None) -> dict:
+    """Add the min and max values of the fields in a dict generated by
+    DataSet.to_dict.
+
+    For each array field 'key', the arrays 'key_min' and 'key_max' are added
+    with the min and max values of each component (ie along the last axis).
+    For node data, only the physical nodes are considered.
+    These values are used by MultiFrameDataSet.get_all_frame_lim to avoid
+    reading all the frame data.
+    """
+    lim = {}
+    for key, value in data.items():
+        if key[-2:] not in ["nd", "el", "gp"]:
+            continue
+        value = np.asarray(value)
+        if key[-2:] == "nd" and n_physical_nodes is not None:
+            value = value[..., :n_physical_nodes]
+        if value.size == 0:
+            continue
+        if value.ndim > 1:
+            value = value.reshape(value.shape[0], -1)
+            lim[key + "_min"] = value.min(axis=1)
+            lim[key + "_max"] = value.max(axis=1)
+        else:
+            lim[key + "_min"] = value.min()
+            lim[key + "_max"] = value.max()
+    data.update(lim)
+    return data
+
+
+def _quantize_frame(data: dict, keys) -> dict:
+    """Quantize some fields of a dict generated by DataSet.to_dict.
+
+    Each component (ie each index along the first axis) of the fields in keys
+    is linearly mapped on uint16 values between its min and max values. The
+    arrays 'key_qmin' and 'key_qstep' required to decode the field (see
+    _decode_field) are added to the dict. The maximal error is half a step,
+    ie (max - min) / 131070.
+    """
+    for key in keys:
+        if key not in data:
+            continue
+        value = np.asarray(data[key])
+        if value.size == 0 or not (np.issubdtype(value.dtype, np.floating)):
+            continue
+        flat = value.reshape(value.shape[0], -1) if value.ndim > 1 else value[None]
+        qmin = flat.min(axis=1)
+        qstep = (flat.max(axis=1) - qmin) / 65535
+        qstep[qstep == 0] = 1
+        data[key] = (
+            np.rint((flat - qmin[:, None]) / qstep[:, None])
+            .astype(np.uint16)
+            .reshape(value.shape)
+        )
+        if value.ndim < 2:
+            qmin = qmin[0]
+            qstep = qstep[0]
+        data[key + "_qmin"] = qmin
+        data[key + "_qstep"] = qstep
+    return data
+
+
+def _decode_field(data: dict, key: str) -> np.ndarray:
+    # return the field key of a dict generated by DataSet.to_dict, decoding
+    # the quantized values if required (see _quantize_frame)
+    value = data[key]
+    if key + "_qstep" not in data:
+        return value
+    qmin = np.asarray(data[key + "_qmin"])
+    qstep = np.asarray(data[key + "_qstep"])
+    if qmin.ndim == 0:
+        return value * qstep + qmin
+    shape = value.shape
+    value = np.asarray(value).reshape(shape[0], -1)
+    return (value * qstep[:, None] + qmin[:, None]).reshape(shape)
+
+
+def _get_component_lim(data_min, data_max, component):
+    # return [min, max] of a component from the values given by
+    # _add_frame_lim or None if the component need to be computed.
+    data_min = np.asarray(data_min)
+    data_max = np.asarray(data_max)
+    if data_min.ndim == 0 or component is None:
+        return [data_min.min(), data_max.max()]
+    if isinstance(component, str):
+        component = {
+            "X": 0,
+            "Y": 1,
+            "Z": 2,
+            "XX": 0,
+            "YY": 1,
+            "ZZ": 2,
+            "XY": 3,
+            "XZ": 4,
+            "YZ": 5,
+        }.get(component)
+        if component is None:  # 'vm' or 'norm'
+            return None
+    return [data_min[component], data_max[component]]
+
+
+def _write_fdz_frame(file: ZipFile, iter_name: str, data: dict, compressed=False):
+    """Write a npz frame directly in a member of an opened fdz ZipFile."""
+    with file.open(iter_name, "w", force_zip64=True) as member:
+        if compressed:
+            np.savez_compressed(member, **data)
+        else:
+            np.savez(member, **data)
+
+
+def _mesh_to_dict(mesh: Mesh) -> dict:
+    """Return a dict with the mesh arrays that can be saved with np.savez."""
+    data = {
+        "nodes": mesh.nodes,
+        "elements": mesh.elements,
+        "elm_type": np.array(mesh.elm_type),
+    }
+    if mesh._n_physical_nodes is not None:
+        data["n_physical_nodes"] = np.array(mesh._n_physical_nodes)
+    if mesh.local_frame is not None:
+        data["local_frame"] = mesh.local_frame
+    data.update({"node_set_" + k: np.asarray(v) for k, v in mesh.node_sets.items()})
+    data.update(
+        {"element_set_" + k: np.asarray(v) for k, v in mesh.element_sets.items()}
+    )
+    return data
+
+
+def _mesh_from_dict(data: dict) -> Mesh:
+    """Build a mesh from a dict (or NpzFile) generated by _mesh_to_dict."""
+    mesh = Mesh(data["nodes"], data["elements"], data["elm_type"].item())
+    for k in data.keys():
+        if k.startswith("node_set_"):
+            mesh.node_sets[k[9:]] = data[k]
+        elif k.startswith("element_set_"):
+            mesh.element_sets[k[12:]] = data[k]
+    if "n_physical_nodes" in data:
+        mesh._n_physical_nodes = data["n_physical_nodes"].item()
+    if "local_frame" in data:
+        mesh.local_frame = data["local_frame"]
+    return mesh
+
+
+def _write_fdz_mesh(file: ZipFile, mesh: Mesh):
+    """Write the mesh arrays in the '_mesh_.npz' member of an opened fdz ZipFile."""
+    _write_fdz_frame(file, "_mesh_.npz", _mesh_to_dict(mesh))
+
+
+def _read_fdz_mesh(file: ZipFile) -> Mesh:
+    """Read the mesh from an opened fdz ZipFile without writing any file.
+
+    Old fdz files that contains the mesh as a '_mesh_.vtk' member are also
+    supported (require pyvista).
+    """
+    if "_mesh_.npz" in file.namelist():
+        return _mesh_from_dict(np.load(file.open("_mesh_.npz")))
+
+    # old fdz file with a vtk mesh
+    if not (USE_PYVISTA):
+        raise NameError("Pyvista not installed. Pyvista required to load vtk meshes.")
+    from vtkmodules.vtkIOLegacy import vtkUnstructuredGridReader
+
+    vtk_data = file.read("_mesh_.vtk")
+    reader = vtkUnstructuredGridReader()
+    reader.ReadFromInputStringOn()
+    reader.SetBinaryInputString(vtk_data, len(vtk_data))
+    reader.Update()
+    return Mesh.from_pyvista(pv.wrap(reader.GetOutput()))
+
+
+def _create_frame_store(dirname: str, mesh: Mesh | None = None) -> FrameStore:
+    """Create a new empty FrameStore and save the mesh in it."""
+    store = FrameStore(dirname, "w")
+    if mesh is not None:
+        np.savez(os.path.join(dirname, "_mesh_.npz"), **_mesh_to_dict(mesh))
+    return store
+
+
+def read_fdm(filename: str):
+    """Read a fdm directory (see :py:class:`fedoo.core.frame_store.FrameStore`)
+    unto a MultiFrameDataSet file.
+
+    The data are not loaded in memory but memory-mapped from the disk.
+    """
+    extension = os.path.splitext(filename)[1]
+    if extension == "":
+        filename += ".fdm"
+
+    store = FrameStore(filename, "r")
+    mesh_file = os.path.join(filename, "_mesh_.npz")
+    if os.path.isfile(mesh_file):
+        mesh = _mesh_from_dict(np.load(mesh_file))
+    else:
+        mesh = None
+
+    dataset = MultiFrameDataSet(mesh)
+    dataset.list_data = [StoredFrame(store, i) for i in range(store.n_frames)]
+    return dataset
+
+
 def as_3d_coordinates(crd):
     if crd.shape[1] < 3:
         return np.c_[crd, np.zeros((len(crd), 3 - crd.shape[1]))]
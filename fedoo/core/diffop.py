@@ -32,6 +32,124 @@ class _Derivative:  # derivative operator used in DiffOp
         self.decentrement = decentrement  # décentrement des dériviées pour différences finies uniquement
 
 
+class _CoefProduct:
+    """
+    Lazy product of DiffOp coefficients.
+
+    The product of scalars and arrays (gauss point values in general) is
+    only evaluated when the value is required. This avoids to build a new
+    array for each term and each intermediate product of a weak equation.
+    When a numpy array is required, the product is evaluated automatically
+    (np.asarray(coef) or coef[:]).
+
+    Parameters
+    ----------
+    scalar (Number) : the product of the scalar factors
+    arrays (tuple of np.ndarray) : the array factors
+    """
+
+    __array_priority__ = 100  # to use __rmul__ with ndarray * _CoefProduct
+
+    def __init__(self, scalar, arrays):
+        self.scalar = scalar
+        self.arrays = arrays
+
+    def evaluate(self, out=None, cache=None):
+        """
+        Evaluate the product.
+
+        Parameters
+        ----------
+        out (np.ndarray, optional) : array in which the result is stored
+        cache (dict, optional) : dict used to evaluate only once the product
+            of the same arrays (common to several coefficients)
+        """
+        if len(self.arrays) == 1:
+            prod = self.arrays[0]
+        else:
+            key = tuple([id(a) for a in self.arrays])
+            prod = None if cache is None else cache.get(key)
+            if prod is None:
+                prod = self.arrays[0] * self.arrays[1]
+                for a in self.arrays[2:]:
+                    prod = prod * a
+                if cache is not None:
+                    cache[key] = prod
+
+        if out is not None:
+            return np.multiply(prod, self.scalar, out=out)
+        if self.scalar == 1 and len(self.arrays) > 1 and cache is None:
+            return prod  # prod is already a new array
+        return prod * self.scalar
+
+    @property
+    def shape(self):
+        return np.broadcast_shapes(*[a.shape for a in self.arrays])
+
+    def __len__(self):
+        return self.shape[0]
+
+    def __array__(self, dtype=None, copy=None):
+        return np.asarray(self.evaluate(), dtype=dtype)
+
+    def __getitem__(self, key):
+        return self.evaluate()[key]
+
+    def __mul__(self, A):
+        return _coef_mul(self, A)
+
+    def __rmul__(self, A):
+        return _coef_mul(A, self)
+
+    def __neg__(self):
+        return _CoefProduct(-self.scalar, self.arrays)
+
+    def __add__(self, A):
+        return self.evaluate() + A
+
+    def __radd__(self, A):
+        return A + self.evaluate()
+
+    def __sub__(self, A):
+        return self.evaluate() - A
+
+    def __rsub__(self, A):
+        return A - self.evaluate()
+
+
+def _coef_factors(coef):
+    # return (scalar, arrays) such that coef = scalar * prod(arrays)
+    # or None if coef can't be included in a lazy product
+    if isinstance(coef, _CoefProduct):
+        return coef.scalar, coef.arrays
+    if isinstance(coef, np.ndarray):
+        if coef.ndim == 0:
+            return coef.item(), ()
+        return 1, (coef,)
+    if isinstance(coef, Number):
+        return coef, ()
+    return None  # other types (list, SeparatedArray, ...)
+
+
+def _coef_mul(A, B):
+    # product of DiffOp coefficients. Products involving arrays are lazy.
+    factors_A = _coef_factors(A)
+    factors_B = _coef_factors(B)
+    if factors_A is None or factors_B is None:
+        if isinstance(A, _CoefProduct):
+            A = A.evaluate()
+        if isinstance(B, _CoefProduct):
+            B = B.evaluate()
+        return A * B
+    scalar = factors_A[0] * factors_B[0]
+    arrays = factors_A[1] + factors_B[1]
+    if len(arrays) == 0:
+        return scalar
+    if len(arrays) == 1 and np.isscalar(scalar) and scalar == 1:
+        return arrays[0]
+    return _CoefProduct(scalar, arrays)
+
+
 class DiffOp:
     def __init__(self, u, x=0, ordre=0, decentrement=0, vir=0):
         self.mesh = None
@@ -86,22 +204,24 @@ class DiffOp:
     def __mul__(self, A):
         #        if isinstance(A, SeparatedArray) and A.norm() == 0: return 0
         if isinstance(A, DiffOp):
-            res = DiffOp([], [], [])
+            # the lists are built in a single pass (no intermediate DiffOp)
+            op = []
+            op_vir = []
+            coef = []
             for ii in range(len(A.op)):
                 for jj in range(len(self.op)):
                     if (
                         A.op_vir[ii] == 1 and self.op[jj] == 1
                     ):  # si A contient un opérateur réel et self un virtuel
-                        res += DiffOp(
-                            [A.op[ii]], [self.op_vir[jj]], [A.coef[ii] * self.coef[jj]]
-                        )
+                        op.append(A.op[ii])
+                        op_vir.append(self.op_vir[jj])
                     elif A.op[ii] == 1 and self.op_vir[jj] == 1:  # si c'est l'inverse
-                        res += DiffOp(
-                            [self.op[ii]], [A.op_vir[jj]], [A.coef[ii] * self.coef[jj]]
-                        )
+                        op.append(self.op[jj])
+                        op_vir.append(A.op_vir[ii])
                     else:
                         raise NameError("Impossible operation")
-            return res
+                    coef.append(_coef_mul(A.coef[ii], self.coef[jj]))
+            return DiffOp(op, op_vir, coef)
         else:  # isinstance(A, (Number, SeparatedArray)):
             if np.isscalar(A):
                 if A == 0:
@@ -109,7 +229,7 @@ class DiffOp:
                 if A == 1:
                     return self
 
-            return DiffOp(self.op, self.op_vir, [A * cc for cc in self.coef])
+            return DiffOp(self.op, self.op_vir, [_coef_mul(A, cc) for cc in self.coef])
 
     def __radd__(self, A):
         return self + A
@@ -0,0 +1,162 @@
+"""Uncompressed frame storage that can be memory-mapped."""
+
+from __future__ import annotations
+
+import json
+import os
+
+import numpy as np
+
+
+class FrameStore:
+    """Store the data of several frames with one binary file per field.
+
+    A FrameStore is a directory (generally with the '.fdm' extension)
+    containing:
+
+    * '_index_.json': the number of frames and the dtype and shape of each
+      field,
+    * '<field>.bin': one raw binary file per field in which the frames are
+      written one after another (C order, no compression),
+    * '_mesh_.npz' (optional): the associated mesh arrays.
+
+    As the frames of a field are contiguous and have the same size, each
+    field can be read with np.memmap as an array with a frame axis
+    (shape = (n_frames, \\*frame_shape)). This allows to read only a small
+    part of the data (for instance the history of some nodes) without
+    loading the full frames.
+
+    The field names are the keys given by DataSet.to_dict
+    (for instance 'Disp_nd' or 'Time_sc').
+
+    Parameters
+    ----------
+    dirname : str
+        Name of the directory containing the data.
+    mode : str in {'r', 'w', 'a'}, default = 'r'
+        'r' to read an existing store, 'w' to create a new empty store
+        (existing field files are removed) and 'a' to append frames to an
+        existing store (created if needed).
+    """
+
+    def __init__(self, dirname: str, mode: str = "r"):
+        self.dirname = dirname
+        self.mode = mode
+        self.n_frames = 0
+        self.fields = {}  # dict field -> (dtype, frame shape)
+        self._memmap = {}  # memmap arrays saved for the current n_frames
+
+        index_file = os.path.join(dirname, "_index_.json")
+        if mode == "r" and not (os.path.isfile(index_file)):
+            raise NameError(f"{dirname} is not a valid frame store.")
+
+        if os.path.isfile(index_file):
+            self._read_index()
+            if mode == "w":
+                for field in self.fields:
+                    os.remove(self._get_field_filename(field))
+                self.n_frames = 0
+                self.fields = {}
+                self._write_index()
+        elif mode in ["w", "a"]:
+            if not (os.path.isdir(dirname)):
+                os.makedirs(dirname)
+            self._write_index()
+
+    def _get_field_filename(self, field):
+        return os.path.join(self.dirname, field + ".bin")
+
+    def _read_index(self):
+        with open(os.path.join(self.dirname, "_index_.json"), "r") as file:
+            index = json.load(file)
+        self.n_frames = index["n_frames"]
+        self.fields = {
+            k: (np.dtype(v["dtype"]), tuple(v["shape"]))
+            for k, v in index["fields"].items()
+        }
+        self._memmap = {}
+
+    def _write_index(self):
+        index = {
+            "n_frames": self.n_frames,
+            "fields": {
+                k: {"dtype": v[0].str, "shape": list(v[1])}
+                for k, v in self.fields.items()
+            },
+        }
+        with open(os.path.join(self.dirname, "_index_.json"), "w") as file:
+            json.dump(index, file)
+
+    def append(self, data: dict) -> int:
+        """Append a new frame to the store.
+
+        Parameters
+        ----------
+        data : dict
+            dict containing the field arrays (for instance DataSet.to_dict()).
+            The fields, dtype and shapes should be the same for all the frames.
+
+        Returns
+        -------
+        int
+            The index of the new frame.
+        """
+        if self.mode == "r":
+            raise NameError("Frame store opened in read only mode.")
+
+        data = {k: np.ascontiguousarray(v) for k, v in data.items()}
+        if self.n_frames == 0:
+            self.fields = {k: (v.dtype, v.shape) for k, v in data.items()}
+        elif set(data) != set(self.fields):
+            raise NameError(
+                "All the frames of a frame store should contain the same fields."
+            )
+
+        for field, value in data.items():
+            dtype, shape = self.fields[field]
+            if value.shape != shape:
+                raise NameError(
+                    f"Shape of the field '{field}' changed from {shape} to "
+                    f"{value.shape}. Not allowed in a frame store."
+                )
+            with open(self._get_field_filename(field), "ab") as file:
+                file.write(value.astype(dtype, copy=False).tobytes())
+
+        self.n_frames += 1
+        self._memmap = {}
+        self._write_index()
+        return self.n_frames - 1
+
+    def get_field(self, field: str) -> np.memmap:
+        """Return a read-only memmap of the field with the frame as 1st axis."""
+        if field not in self._memmap:
+            dtype, shape = self.fields[field]
+            self._memmap[field] = np.memmap(
+                self._get_field_filename(field),
+                dtype=dtype,
+                mode="r",
+                shape=(self.n_frames,) + shape,
+            )
+        return self._memmap[field]
+
+    def get_frame(self, iteration: int) -> dict:
+        """Return a dict with the field arrays (memmap views) of one frame."""
+        return {field: self.get_field(field)[iteration] for field in self.fields}
+
+    def refresh(self):
+        """Update the number of frames from the index file (in case another
+        FrameStore object has append new frames)."""
+        self._read_index()
+
+
+class StoredFrame:
+    """Reference to a frame of a FrameStore (used in MultiFrameDataSet.list_data)."""
+
+    def __init__(self, store: FrameStore, iteration: int):
+        self.store = store
+        self.iteration = iteration
+
+    def to_dict(self) -> dict:
+        if self.iteration >= self.store.n_frames:
+            self.store.refresh()
+        return self.store.get_frame(self.iteration)
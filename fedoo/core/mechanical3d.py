@@ -8,6 +8,9 @@ from fedoo.core.base import ConstitutiveLaw
 class Mechanical3D(ConstitutiveLaw):
     """Base class for mechanical constitutive laws."""
 
+    _saved_rotation = None  # local_frame copy and strain rotation matrices
+    _saved_rotated_H = None  # last tangent matrix (copy) and its rotation
+
     # model of constitutive law for InternalForce Weakform
 
     def __init__(self, name=""):
@@ -67,39 +70,89 @@ class Mechanical3D(ConstitutiveLaw):
             for i in range(6)
         ]
 
-    def local2global_H(self, H_global):
-        # Change of basis capability for laws on the form : StressTensor = H * StrainTensor
-        # StressTensor and StrainTensor are column vectors based on the voigt notation
-        if self.local_frame is not None:
-            self.local_frame = self.local_frame
-            # building the matrix to change the basis of the stress and the strain
-            #            theta = np.pi/8
-            #            np.array([[np.cos(theta),np.sin(theta),0], [-np.sin(theta),np.cos(theta),0], [0,0,1]])
-            R_epsilon = np.empty((len(self.local_frame), 6, 6))
-            R_epsilon[:, :3, :3] = self.local_frame**2
-            R_epsilon[:, :3, 3:6] = (
-                self.local_frame[:, :, [0, 2, 1]] * self.local_frame[:, :, [1, 0, 2]]
-            )
-            R_epsilon[:, 3:6, :3] = (
-                2 * self.local_frame[:, [0, 2, 1]] * self.local_frame[:, [1, 0, 2]]
-            )
-            R_epsilon[:, 3:6, 3:6] = (
-                self.local_frame[:, [[0], [2], [1]], [0, 2, 1]]
-                * self.local_frame[:, [[1], [0], [2]], [1, 0, 2]]
-                + self.local_frame[:, [[1], [0], [2]], [0, 2, 1]]
-                * self.local_frame[:, [[0], [2], [1]], [1, 0, 2]]
-            )
-            R_sigma_inv = R_epsilon.transpose(
-                0, 2, 1
-            )  # np.transpose(R_epsilon,[0,2,1])
-
-            if len(H_global.shape) == 3:
-                H_global = np.rollaxis(H_global, 2, 0)
-            H_local = np.matmul(R_sigma_inv, np.matmul(H_global, R_epsilon))
-            if len(H_local.shape) == 3:
-                H_local = np.rollaxis(H_local, 0, 3)
-
-            return H_local
+    def local2global_H(self, H_global, index=None):
+        """Apply the change of basis defined by local_frame to a tangent matrix.
 
-        else:
+        The rotation matrices and the last rotated matrix are kept in cache,
+        so that calling this method again with the same H_global values and
+        the same local_frame values only costs a comparison of the arrays.
+        The cache is keyed on the values, so H_global and local_frame may be
+        buffers modified in place. The returned array should not be modified.
+
+        Parameters
+        ----------
+        H_global : array of shape (6,6) or (6,6,n)
+            Tangent matrix (the stress and strain tensors being column vectors
+            based on the voigt notation).
+        index : array of int, optional
+            If given, H_global only contains the values at the gauss points
+            index (shape = (6,6,len(index))) and only the corresponding local
+            frames are used. This allows nonlinear laws to rotate only the
+            correction of the elastic tangent matrix where it is not 0, the
+            rotated elastic matrix being kept in cache.
+
+        Returns
+        -------
+        The rotated tangent matrix.
+        """
+        if self.local_frame is None:
             return H_global
+
+        R_epsilon = self._get_strain_rotation()  # clear the cache if needed
+
+        saved = self._saved_rotated_H
+        if index is None and saved is not None and _is_unchanged(saved[0], H_global):
+            return saved[1]
+
+        if index is not None and len(R_epsilon) > 1:
+            R_epsilon = R_epsilon[index]
+
+        R_sigma_inv = R_epsilon.transpose(0, 2, 1)
+
+        if len(H_global.shape) == 3:
+            H_local = np.rollaxis(H_global, 2, 0)
+        else:
+            H_local = H_global
+        H_local = np.matmul(R_sigma_inv, np.matmul(H_local, R_epsilon))
+        if len(H_local.shape) == 3:
+            H_local = np.rollaxis(H_local, 0, 3)
+
+        if index is None:
+            self._saved_rotated_H = (np.array(H_global), H_local)
+        return H_local
+
+    def _get_strain_rotation(self):
+        # matrices (n, 6, 6) to change the basis of the strain, rebuilt only
+        # when the local_frame values change
+        local_frame = self.local_frame
+        saved = self._saved_rotation
+        if saved is not None and _is_unchanged(saved[0], local_frame):
+            return saved[1]
+        self._saved_rotated_H = None
+
+        # building the matrix to change the basis of the stress and the strain
+        #            theta = np.pi/8
+        #            np.array([[np.cos(theta),np.sin(theta),0], [-np.sin(theta),np.cos(theta),0], [0,0,1]])
+        R_epsilon = np.empty((len(local_frame), 6, 6))
+        R_epsilon[:, :3, :3] = local_frame**2
+        R_epsilon[:, :3, 3:6] = (
+            local_frame[:, :, [0, 2, 1]] * local_frame[:, :, [1, 0, 2]]
+        )
+        R_epsilon[:, 3:6, :3] = (
+            2 * local_frame[:, [0, 2, 1]] * local_frame[:, [1, 0, 2]]
+        )
+        R_epsilon[:, 3:6, 3:6] = (
+            local_frame[:, [[0], [2], [1]], [0, 2, 1]]
+            * local_frame[:, [[1], [0], [2]], [1, 0, 2]]
+            + local_frame[:, [[1], [0], [2]], [0, 2, 1]]
+            * local_frame[:, [[0], [2], [1]], [1, 0, 2]]
+        )
+        self._saved_rotation = (np.array(local_frame), R_epsilon)
+        return R_epsilon
+
+
+def _is_unchanged(saved, array):
+    # saved is a copy of array when cached. Comparing the values (and not
+    # only the identity) handles arrays modified in place such as the
+    # preallocated state variable buffers.
+    return saved.shape == np.shape(array) and np.array_equal(saved, array)
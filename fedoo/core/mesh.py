@@ -7,6 +7,8 @@ from fedoo.core.base import MeshBase
 from fedoo.lib_elements.element_list import get_default_n_gp, get_element
 from fedoo.util.test_periodicity import is_periodic
 from scipy import sparse
+from scipy.sparse.csgraph import connected_components
+from scipy.spatial import cKDTree
 
 from os.path import splitext
 
@@ -17,6 +19,34 @@ try:
 except ImportError:
     USE_PYVISTA = False
 
+# vtk cell type and number of nodes associated to each fedoo element type
+_vtk_cell_type = {
+    "lin2": (3, 2),
+    "tri3": (5, 3),
+    "quad4": (9, 4),
+    "tet4": (10, 4),
+    "hex8": (12, 8),
+    "wed6": (13, 6),
+    "pyr5": (14, 5),
+    "lin3": (21, 3),
+    "tri6": (22, 6),
+    "quad8": (23, 8),
+    "tet10": (24, 10),
+    "hex20": (25, 20),
+    "wed15": (26, 15),
+    "pyr13": (27, 13),
+    "quad9": (28, 9),
+    "hex27": (29, 27),
+    "wed18": (32, 18),
+}
+
+# node permutation between fedoo and vtk for elements with a different
+# numbering. These permutations are their own inverse so the same array
+# converts from fedoo to vtk and from vtk to fedoo.
+_vtk_node_order = {
+    "hex20": [0, 1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11, 16, 17, 18, 19, 12, 13, 14, 15],
+}
+
 
 class Mesh(MeshBase):
     """Fedoo Mesh object.
@@ -173,6 +203,8 @@ class Mesh(MeshBase):
 
             elm = list(pvmesh.cells_dict.values())[0]
             # elm = pvmesh.cells.reshape(-1,pvmesh.cells[0]+1)[1:]
+            if elm_type in _vtk_node_order:  # convert node order from vtk to fedoo
+                elm = elm[:, _vtk_node_order[elm_type]]
 
             if "ndim" in pvmesh.field_data:  # vtk mesh are always 3d. the ndim
                 return Mesh(
@@ -191,7 +223,10 @@ class Mesh(MeshBase):
         """Build a Mesh from a file.
 
         The file type is inferred from the file name.
-        This function use the pyvista read method which
+        Files with the '.fdmesh' extension (native fedoo format, see
+        :py:meth:`fedoo.Mesh.save`) are memory-mapped: the node sets, element
+        sets and local frame are also read.
+        For other formats, this function use the pyvista read method which
         is itself based on the vtk native readers and the meshio readers
         (available only if the meshio lib is installed.)
 
@@ -209,6 +244,10 @@ class Mesh(MeshBase):
         For now, only mesh with single element type may be imported.
         Multi-element meshes will be integrated later.
         """
+        if splitext(filename)[1].lower() == ".fdmesh":
+            from fedoo.core.mesh_store import load_fdmesh
+
+            return load_fdmesh(filename, name)
         if USE_PYVISTA:
             mesh = Mesh.from_pyvista(pv.read(filename), name=name)
             return mesh
@@ -396,51 +435,81 @@ class Mesh(MeshBase):
             meshObject.merge_nodes(meshObject.find_coincident_nodes())
 
         where meshObject is the Mesh object containing merged coincidentNodes.
-        """
-        decimal_round = int(-np.log10(tol) - 1)
-        crd = self.nodes.round(decimal_round)  # round coordinates to match tolerance
-        if self.ndim == 3:
-            ind_sorted = np.lexsort((crd[:, 2], crd[:, 1], crd[:, 0]))
-        elif self.ndim == 2:
-            ind_sorted = np.lexsort((crd[:, 1], crd[:, 0]))
 
-        ind_coincident = np.where(
-            np.linalg.norm(crd[ind_sorted[:-1]] - crd[ind_sorted[1:]], axis=1) == 0
-        )[0]  # indices of the first coincident nodes
-        return np.array([ind_sorted[ind_coincident], ind_sorted[ind_coincident + 1]]).T
+        Notes
+        -----
+        Two nodes are considered coincident if their euclidean distance is
+        lower or equal to tol. The candidate pairs are searched with a
+        KD-tree and gathered in clusters (connected components), so that
+        chains of nodes closer than tol are merged together. For each cluster,
+        the node with the lowest index is kept (first column of the returned
+        array).
+        """
+        pairs = cKDTree(self.nodes).query_pairs(tol, output_type="ndarray")
+        if len(pairs) == 0:
+            return np.empty((0, 2), dtype=int)
+
+        nodes_in_pairs, pairs = np.unique(pairs, return_inverse=True)
+        pairs = pairs.reshape(-1, 2)
+        cluster_id = connected_components(
+            sparse.coo_matrix(
+                (np.ones(len(pairs)), (pairs[:, 0], pairs[:, 1])),
+                shape=(len(nodes_in_pairs), len(nodes_in_pairs)),
+            ),
+            directed=False,
+        )[1]
+        # nodes_in_pairs is sorted -> the first node of each cluster is
+        # the one with the lowest index
+        first_ind = np.unique(cluster_id, return_index=True)[1]
+        kept_nodes = nodes_in_pairs[first_ind][cluster_id]
+        mask = kept_nodes != nodes_in_pairs
+        return np.c_[kept_nodes[mask], nodes_in_pairs[mask]]
 
     def merge_nodes(self, node_couples: np.ndarray[int]) -> None:
         """
         Merge some nodes
         The total number and the id of nodes are modified
+
+        Parameters
+        ----------
+        node_couples: np.ndarray[int] of shape (n_couples, 2)
+            Each line is a couple of nodes to merge: the node node_couples[i,1]
+            is deleted and replaced by node_couples[i,0]. A kept node may
+            itself be deleted in another couple: the whole chain is then
+            merged in the single remaining node.
         """
+        node_couples = np.asarray(node_couples, dtype=int).reshape(-1, 2)
         n_nodes = self.n_nodes
         nds_del = node_couples[:, 1]  # list des noeuds a supprimer
-        nds_kept = node_couples[:, 0]  # list des noeuds a conserver
 
-        unique_nodes, ordre = np.unique(nds_del, return_index=True)
-        assert len(unique_nodes) == len(nds_del), "A node can't be deleted 2 times"
-        # ordre = np.argsort(nds_del)
-        j = 0
-        new_num = np.zeros(n_nodes, dtype="int")
-        for nd in range(n_nodes):
-            if j < len(nds_del) and nd == nds_del[ordre[j]]:
-                # test if some nodes are equal to deleted node among the kept nodes. If required update the kept nodes values
-                deleted_nodes = np.where(
-                    nds_kept == nds_del[ordre[j]]
-                )[
-                    0
-                ]  # index of nodes to kept that are deleted and need to be updated to their new values
-                nds_kept[deleted_nodes] = nds_kept[ordre[j]]
-                j += 1
-            else:
-                new_num[nd] = nd - j
-        new_num[nds_del] = new_num[node_couples[:, 0]]
-        list_nd_new = [nd for nd in range(n_nodes) if not (nd in nds_del)]
+        if len(np.unique(nds_del)) != len(nds_del):
+            raise ValueError("A node can't be deleted 2 times")
+
+        # group the nodes to merge in clusters. Each cluster is a tree
+        # (each node is deleted once), so exactly one node is kept.
+        n_clusters, cluster_id = connected_components(
+            sparse.coo_matrix(
+                (np.ones(len(node_couples)), (node_couples[:, 0], nds_del)),
+                shape=(n_nodes, n_nodes),
+            ),
+            directed=False,
+        )
+
+        mask_kept = np.ones(n_nodes, dtype=bool)
+        mask_kept[nds_del] = False
+        if np.count_nonzero(mask_kept) != n_clusters:
+            raise ValueError("Merged nodes can't define a closed loop")
+
+        new_num = np.empty(n_nodes, dtype=int)
+        new_num[mask_kept] = np.arange(n_clusters)
+        cluster_new_num = np.empty(n_clusters, dtype=int)
+        cluster_new_num[cluster_id[mask_kept]] = new_num[mask_kept]
+        new_num = cluster_new_num[cluster_id]
+
         self.elements = new_num[self.elements]
         for key in self.node_sets:
             self.node_sets[key] = new_num[self.node_sets[key]]
-        self.nodes = self.nodes[list_nd_new]
+        self.nodes = self.nodes[mask_kept]
         self.reset_interpolation()
 
     def remove_nodes(self, index_nodes: list[int] | np.ndarray[int]) -> np.ndarray[int]:
@@ -454,21 +523,17 @@ class Mesh(MeshBase):
         -----
         The total number and the id of nodes are modified.
         """
-        nds_del = np.unique(index_nodes)
         n_nodes = self.n_nodes
+        mask_kept = np.ones(n_nodes, dtype=bool)
+        mask_kept[np.asarray(index_nodes, dtype=int)] = False
 
-        list_nd_new = [nd for nd in range(n_nodes) if not (nd in nds_del)]
-        self.nodes = self.nodes[list_nd_new]
+        self.nodes = self.nodes[mask_kept]
 
         new_num = np.zeros(n_nodes, dtype="int")
-        new_num[list_nd_new] = np.arange(len(list_nd_new))
+        new_num[mask_kept] = np.arange(self.n_nodes)
 
         # delete element associated with deleted nodes
-        deleted_elm = np.where(np.isin(self.elements, nds_del))[0]
-
-        mask = np.ones(len(self.elements), dtype=bool)
-        mask[deleted_elm] = False
-        self.elements = self.elements[mask]
+        self.elements = self.elements[mask_kept[self.elements].all(axis=1)]
 
         self.elements = new_num[self.elements]
 
@@ -877,25 +942,7 @@ class Mesh(MeshBase):
             pvmesh.field_data["ndim"] = self.ndim
             return pvmesh
         if USE_PYVISTA:
-            cell_type, n_elm_nodes = {
-                "lin2": (3, 2),
-                "tri3": (5, 3),
-                "quad4": (9, 4),
-                "tet4": (10, 4),
-                "hex8": (12, 8),
-                "wed6": (13, 6),
-                "pyr5": (14, 5),
-                "lin3": (21, 3),
-                "tri6": (22, 6),
-                "quad8": (23, 8),
-                "tet10": (24, 10),
-                "hex20": (25, 20),
-                "wed15": (26, 15),
-                "pyr13": (27, 13),
-                "quad9": (28, 9),
-                "hex27": (29, 27),
-                "wed18": (32, 18),
-            }.get(self.elm_type, None)
+            cell_type, n_elm_nodes = _vtk_cell_type.get(self.elm_type, (None, None))
             if cell_type is None:
                 raise NameError(
                     "Element Type " + str(self.elm_type) + " not available in pyvista"
@@ -904,7 +951,10 @@ class Mesh(MeshBase):
             # elm = np.empty((self.elements.shape[0], self.elements.shape[1]+1), dtype=int)
             elm = np.empty((self.elements.shape[0], n_elm_nodes + 1), dtype=int)
             elm[:, 0] = n_elm_nodes  # self.elements.shape[1]
-            elm[:, 1:] = self.elements[:, :n_elm_nodes]
+            # convert node order from fedoo to vtk if required
+            elm[:, 1:] = self.elements[
+                :, _vtk_node_order.get(self.elm_type, slice(n_elm_nodes))
+            ]
 
             return pv.UnstructuredGrid(
                 elm.ravel(),
@@ -916,7 +966,13 @@ class Mesh(MeshBase):
 
     def save(self, filename: str, binary: bool = True) -> None:
         """
-        Save the mesh object to file. This function use the save function of the pyvista UnstructuredGrid object
+        Save the mesh object to file.
+
+        If the extension is '.fdmesh', the mesh is saved in the native fedoo
+        binary format (including node sets, element sets and local frame)
+        that can be read very quickly with memory mapping
+        (see :py:func:`fedoo.core.mesh_store.save_fdmesh`).
+        Otherwise, this function use the save function of the pyvista UnstructuredGrid object
 
         Parameters
         ----------
@@ -928,6 +984,10 @@ class Mesh(MeshBase):
         extension = splitext(filename)[1]
         if extension == "":
             filename = filename + ".vtk"
+        elif extension.lower() == ".fdmesh":
+            from fedoo.core.mesh_store import save_fdmesh
+
+            return save_fdmesh(self, filename)
 
         self.to_pyvista().save(filename, binary)
 
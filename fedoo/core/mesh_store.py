@@ -0,0 +1,138 @@
+"""Native binary mesh file (fdmesh) that can be memory-mapped."""
+
+from __future__ import annotations
+
+import json
+
+import numpy as np
+
+_MAGIC = b"FDMESH01"
+_ALIGNMENT = 64  # each array begins at a multiple of 64 bytes
+
+
+def save_fdmesh(mesh, filename: str) -> None:
+    """Save a Mesh in the native fedoo binary format (fdmesh).
+
+    A fdmesh file contains:
+
+    * 8 bytes: the format identifier b'FDMESH01',
+    * 8 bytes: the size of the header (little endian uint64),
+    * a json header with the element type, the number of physical nodes and
+      the dtype, shape and offset of each array,
+    * the uncompressed arrays (nodes, elements, local_frame, node_sets and
+      element_sets), each one aligned on 64 bytes.
+
+    As the arrays are neither compressed nor split, they can be
+    memory-mapped when the file is read (see :py:func:`load_fdmesh`).
+
+    Parameters
+    ----------
+    mesh : Mesh
+        The mesh to save.
+    filename : str
+        Name of the file including the path.
+    """
+    arrays = {"nodes": mesh.nodes}
+    if mesh.elements is not None:
+        arrays["elements"] = mesh.elements
+    if mesh.local_frame is not None:
+        arrays["local_frame"] = mesh.local_frame
+    for k, v in mesh.node_sets.items():
+        arrays["node_set/" + k] = v
+    for k, v in mesh.element_sets.items():
+        arrays["element_set/" + k] = v
+    arrays = {k: np.ascontiguousarray(v) for k, v in arrays.items()}
+
+    header = {
+        "elm_type": mesh.elm_type,
+        "n_physical_nodes": (
+            None if mesh._n_physical_nodes is None else int(mesh._n_physical_nodes)
+        ),
+        "arrays": {},  # offsets relative to the beginning of the data
+    }
+    offset = 0
+    for k, v in arrays.items():
+        header["arrays"][k] = {
+            "dtype": v.dtype.str,
+            "shape": list(v.shape),
+            "offset": offset,
+        }
+        offset += -(-v.nbytes // _ALIGNMENT) * _ALIGNMENT
+    header = json.dumps(header).encode()
+    data_offset = _get_data_offset(len(header))
+
+    with open(filename, "wb") as f:
+        f.write(_MAGIC)
+        f.write(np.array(len(header), dtype="<u8").tobytes())
+        f.write(header)
+        for v in arrays.values():
+            f.write(b"\0" * (data_offset - f.tell()))  # padding
+            f.write(v.tobytes())
+            data_offset += -(-v.nbytes // _ALIGNMENT) * _ALIGNMENT
+
+
+def _get_data_offset(header_size):
+    # position of the first array in the file (aligned)
+    return -(-(16 + header_size) // _ALIGNMENT) * _ALIGNMENT
+
+
+def load_fdmesh(filename: str, name: str = "", mmap_mode: str | None = "c"):
+    """Load a Mesh from a fdmesh file (see :py:func:`save_fdmesh`).
+
+    Parameters
+    ----------
+    filename : str
+        Name of the file including the path.
+    name : str, optional
+        Name of the new created Mesh.
+    mmap_mode : {None, 'r', 'c', 'r+'}, default = 'c'
+        If not None, the arrays are memory-mapped from the file with the
+        given mode (see numpy.memmap) instead of being loaded in memory.
+        The file is opened instantly whatever its size and the memory pages
+        are shared between all the processes that read the same file.
+        With the default mode 'c' (copy-on-write), the arrays can be
+        modified without changing the file.
+
+    Returns
+    -------
+    Mesh
+    """
+    from fedoo.core.mesh import Mesh
+
+    with open(filename, "rb") as f:
+        if f.read(8) != _MAGIC:
+            raise NameError(f"{filename} is not a valid fdmesh file.")
+        header_size = int(np.frombuffer(f.read(8), dtype="<u8")[0])
+        header = json.loads(f.read(header_size))
+        data_offset = _get_data_offset(header_size)
+
+        def get_array(key):
+            info = header["arrays"][key]
+            dtype = np.dtype(info["dtype"])
+            shape = tuple(info["shape"])
+            if mmap_mode is not None and np.prod(shape) > 0:
+                return np.memmap(
+                    filename,
+                    dtype,
+                    mode=mmap_mode,
+                    offset=data_offset + info["offset"],
+                    shape=shape,
+                )
+            f.seek(data_offset + info["offset"])
+            return np.fromfile(f, dtype, count=int(np.prod(shape))).reshape(shape)
+
+        if "elements" in header["arrays"]:
+            elements = get_array("elements")
+        else:
+            elements = None
+        mesh = Mesh(get_array("nodes"), elements, header["elm_type"], name=name)
+        for key in header["arrays"]:
+            if key.startswith("node_set/"):
+                mesh.node_sets[key[9:]] = get_array(key)
+            elif key.startswith("element_set/"):
+                mesh.element_sets[key[12:]] = get_array(key)
+        if "local_frame" in header["arrays"]:
+            mesh.local_frame = get_array("local_frame")
+        mesh._n_physical_nodes = header["n_physical_nodes"]
+
+    return mesh
@@ -4,8 +4,21 @@ import numpy as np
 from fedoo.core.base import AssemblyBase
 
 # from fedoo.util.ExportData import ExportData
-from fedoo.core.dataset import DataSet, MultiFrameDataSet
+from fedoo.core.dataset import (
+    DataSet,
+    MultiFrameDataSet,
+    _write_fdz_frame,
+    _write_fdz_mesh,
+    _create_frame_store,
+    _add_frame_lim,
+    _quantize_frame,
+)
+from fedoo.core.mesh import Mesh
+from fedoo.core.frame_store import StoredFrame
+import atexit
 import os
+import queue
+import threading
 from zipfile import ZipFile, Path
 
 _available_output = [
@@ -60,6 +73,7 @@ _available_output = [
 
 _available_format = [
     "fdz",
+    "fdm",
     "vtk",
     "msh",
     "npz",
@@ -126,6 +140,7 @@ def _get_results(
     position=1,
     element_set=None,
     include_mesh=True,
+    node_set=None,
 ):
     if isinstance(output_list, str):
         output_list = [output_list]
@@ -156,8 +171,6 @@ def _get_results(
             print("List of available output: ", _available_output)
             raise NameError(res, "' doens't match to any available output")
 
-    data_sav = {}  # dict to keep data in memory that may be used more that one time
-
     if hasattr(assemb, "list_assembly"):  # AssemblySum object
         if assemb.assembly_output is None:
             raise NameError("AssemblySum objects can't be used to extract outputs")
@@ -165,18 +178,60 @@ def _get_results(
             assemb = assemb.assembly_output
 
     sv = assemb.sv  # state variables associated to the assembly
+    sv_store = getattr(assemb, "_sv_store", None)
+
+    if node_set is not None:
+        # probes: only the node data of the given nodes are kept
+        if output_type not in [None, "Node"]:
+            raise NameError("Only 'Node' output_type can be used with a node_set")
+        output_type = "Node"
+        if isinstance(node_set, str):
+            node_set = assemb.mesh.node_sets[node_set]
 
     if include_mesh:
-        if element_set is None:
+        if node_set is not None:
+            result = DataSet(_get_probe_mesh(assemb.mesh, node_set))
+        elif element_set is None:
             result = DataSet(assemb.mesh)
         else:
             result = DataSet(assemb.mesh.extract_elements(element_set))
-            if isinstance(element_set, str):
-                element_set = assemb.mesh.element_sets[element_set]
     else:
         result = DataSet()
 
-    for res in output_list:
+    if isinstance(element_set, str):
+        element_set = assemb.mesh.element_sets[element_set]
+
+    # data of the current increment shared by all the output requests
+    cache = _get_output_cache(pb, assemb, position)
+
+    def get_tensor(measure):
+        # tensor (StressTensorList or StrainTensorList) at gauss points
+        if (measure, "tensor") not in cache:
+            if measure in sv:
+                data = sv[measure]
+            else:
+                # attent to compute
+                try:
+                    if measure == "Strain":
+                        data = assemb.weakform.constitutivelaw.get_strain(
+                            assemb, position=position
+                        )
+                    elif measure == "Stress":
+                        data = assemb.weakform.constitutivelaw.get_stress(
+                            assemb, position=position
+                        )
+                    else:
+                        assert 0
+                except:
+                    raise NameError('Field "{}" not available'.format(measure))
+            cache[(measure, "tensor")] = data
+        return cache[(measure, "tensor")]
+
+    def get_raw_data(res):
+        # return the field res and its type, before any conversion
+        if (res, None) in cache:
+            return cache[(res, None)]
+
         if res in pb.space.list_variables() or res in pb.space.list_vectors():
             data = pb.get_dof_solution(res)
             data_type = "Node"
@@ -187,49 +242,15 @@ def _get_results(
             data_type = "Node"
 
         elif res in ["PK2", "Kirchhoff", "Strain", "Stress"]:
-            if res in data_sav:
-                data = data_sav[res]  # avoid a new data conversion
-            else:
-                if res in sv:
-                    data = sv[res]
-                else:
-                    # attent to compute
-                    try:
-                        if res == "Strain":
-                            data = assemb.weakform.constitutivelaw.get_strain(
-                                assemb, position=position
-                            )
-                        elif res == "Stress":
-                            data = assemb.weakform.constitutivelaw.get_stress(
-                                assemb, position=position
-                            )
-                        else:
-                            assert 0
-                    except:
-                        raise NameError('Field "{}" not available'.format(res))
-
-                # keep data in memory in case it may be used later for vm, pc or pdir stress computation
-                data_sav[res] = data
-
-                if output_type is not None and output_type != "GaussPoint":
-                    data = data.convert(assemb, None, output_type)
-                    data_type = output_type
-                else:
-                    data_type = "GaussPoint"
-
+            data = get_tensor(res)
             try:
                 data = data.asarray()
             except:
                 data = np.array(data)
+            data_type = "GaussPoint"
 
         elif res in ["PK2_vm", "Kirchhoff_vm", "Stress_vm"]:
-            if res[:-3] in data_sav:
-                data = data_sav[res[:-3]]
-            else:
-                data = sv[res[:-3]]
-                data_sav[res[:-3]] = data
-
-            data = data.von_mises()
+            data = get_tensor(res[:-3]).von_mises()
             data_type = "GaussPoint"
 
         elif res in [
@@ -256,28 +277,12 @@ def _get_results(
             else:
                 measure_type = res[:-6]
 
-            if measure_type + "_pc" in data_sav:
-                data = data_sav[measure_type + "_pc"]
-
-            elif measure_type in data_sav:
-                data = data_sav[measure_type]
-                data = data.diagonalize()
-                data_sav[measure_type + "_pc"] = data
-
-            else:
-                data = sv[measure_type]
-                # if measure_type in ['PKII','PK2']:
-                #     data = material.get_pk2()
-                # elif measure_type == 'Stress':
-                #     data = material.get_stress(position = position)
-                # elif measure_type == 'Kirchhoff':
-                #     data = material.get_kirchhoff()
-                # elif measure_type == 'Cauchy':
-                #     data = material.get_cauchy()
-
-                data_sav[measure_type] = data
-                data = data.diagonalize()
-                data_sav[measure_type + "_pc"] = data
+            # principal values and directions shared by _pc and _pdir outputs
+            if (measure_type, "diagonalized") not in cache:
+                cache[(measure_type, "diagonalized")] = get_tensor(
+                    measure_type
+                ).diagonalize()
+            data = cache[(measure_type, "diagonalized")]
 
             if res[-3:] == "_pc":  # principal component
                 data = data[0]  # principal component
@@ -292,36 +297,70 @@ def _get_results(
 
         elif res == "Statev":
             data = sv["Statev"]
-            # data = material.get_statev()
-            # data = assemb.convert_data(data, None, output_type).T
             data_type = "GaussPoint"
 
         elif res in ["Wm"]:
             data = sv["Wm"]
-            # data = material.get_wm()
-            # data = assemb.convert_data(data, None, output_type).T
             data_type = "GaussPoint"
 
         elif res == "Fint":
             data = assemb.get_int_forces(pb.get_dof_solution(), "local").T
-            # data = assemb.convert_data(data, None, output_type)
             data_type = "GaussPoint"  # or 'Element' ?
 
         elif res == "Fint_global":
             data = assemb.get_int_forces(pb.get_dof_solution(), "global").T
-            # data = assemb.convert_data(data, None, output_type)
             data_type = "GaussPoint"  # or 'Element' ?
 
         elif res in sv:
             data = sv[res]
             data_type = assemb.sv_type.get(res, "GaussPoint")
 
+        cache[(res, None)] = (data, data_type)
+        return data, data_type
+
+    list_data = {}  # res -> (data, data_type)
+    to_node = []  # gauss point fields to convert to node in one product
+    for res in output_list:
+        data, data_type = get_raw_data(res)
         if output_type is not None and output_type != data_type:
-            data = assemb.convert_data(data, data_type, output_type)
+            if (res, output_type) in cache:
+                data = cache[(res, output_type)]
+            elif (
+                data_type == "GaussPoint"
+                and output_type == "Node"
+                and isinstance(data, np.ndarray)
+                and data.ndim in [1, 2]
+                and data.shape[-1] == assemb.n_elm_gp * assemb.mesh.n_elements
+            ):
+                to_node.append(res)
+            else:
+                data = assemb.convert_data(data, data_type, output_type)
+                cache[(res, output_type)] = data
             data_type = output_type
+        list_data[res] = (data, data_type)
+
+    if len(to_node) > 0:
+        # convert all the gauss point fields with a single sparse product
+        gp_values = [list_data[res][0] for res in to_node]
+        n_comp = [1 if data.ndim == 1 else data.shape[0] for data in gp_values]
+        node_values = (
+            assemb.mesh._get_gausspoint2node_mat(assemb.n_elm_gp)
+            @ np.vstack(gp_values).T
+        ).T
+        node_values = np.split(node_values, np.cumsum(n_comp)[:-1])
+        for res, data in zip(to_node, node_values):
+            if list_data[res][0].ndim == 1:
+                data = data[0]
+            cache[(res, "Node")] = data
+            list_data[res] = (data, "Node")
 
+    for res in output_list:
+        data, data_type = list_data[res]
         if data_type == "Node":
-            result.node_data[res] = data
+            if node_set is None:
+                result.node_data[res] = data
+            else:
+                result.node_data[res] = np.asarray(data).T[node_set].T
         elif data_type == "Element":
             if element_set is None:
                 result.element_data[res] = data
@@ -329,6 +368,9 @@ def _get_results(
                 result.element_data[res] = data.T[element_set].T
         elif data_type == "GaussPoint":
             if element_set is None:
+                if sv_store is not None and sv_store.is_buffer(data):
+                    # buffers are modified in place by the next increments
+                    data = np.array(data)
                 result.gausspoint_data[res] = data
             else:
                 if data.ndim == 1:
@@ -346,10 +388,141 @@ def _get_results(
     return result
 
 
+def _get_output_cache(pb, assemb, position):
+    # dict used to keep in memory the output data of an assembly computed
+    # for the current increment
+    problem_output = getattr(pb, "_problem_output", None)
+    if problem_output is None:
+        return {}
+    return problem_output.get_cache(pb, assemb, position)
+
+
+def _get_probe_mesh(mesh, node_set):
+    # mesh of independent points used to store the results of a node_set
+    if isinstance(node_set, str):
+        node_set = mesh.node_sets[node_set]
+    node_set = np.asarray(node_set)
+    return Mesh(mesh.nodes[node_set], np.arange(len(node_set)).reshape(-1, 1), "node")
+
+
+class _ResultsWriter:
+    """Background thread used to write the result files.
+
+    The frames are submitted as callables in a bounded queue. If the queue
+    is full, submit blocks until a frame is written, which avoid to keep
+    an unlimited number of frames in memory when the writer is slower
+    than the solver. An error raised in the writer thread is stored and
+    raised again in the main thread at the next call to submit, flush or
+    close. The frames submitted after an error are ignored.
+
+    The writer is closed at the interpreter exit, so that the pending frames
+    are written. The thread is a daemon thread because the non daemon
+    threads are joined before the atexit functions are called.
+    """
+
+    def __init__(self, max_queue_size=2):
+        self._queue = queue.Queue(max_queue_size)
+        self._error = None
+        self._thread = threading.Thread(
+            target=self._run, name="fedoo_results_writer", daemon=True
+        )
+        self._thread.start()
+        atexit.register(self.close)
+
+    def _run(self):
+        while True:
+            job = self._queue.get()
+            try:
+                if job is None:
+                    return
+                if self._error is None:
+                    job()
+            except BaseException as err:
+                self._error = err
+            finally:
+                self._queue.task_done()
+
+    def check_error(self):
+        """Raise in the main thread the error raised by the writer, if any."""
+        if self._error is not None:
+            err = self._error
+            self._error = None
+            raise err
+
+    def submit(self, job):
+        self.check_error()
+        if not self._thread.is_alive():
+            raise NameError("The results writer has been closed")
+        self._queue.put(job)  # wait if the queue is full
+
+    def flush(self):
+        """Wait until all the submitted frames are written."""
+        self._queue.join()
+        self.check_error()
+
+    def close(self):
+        """Write the pending frames and stop the writer thread."""
+        atexit.unregister(self.close)
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join()
+        self.check_error()
+
+
 class _ProblemOutput:
     def __init__(self):
         self.__list_output = []  # a list containint dictionnary with defined output
         self.data_sets = {}
+        self._writer = None  # _ResultsWriter if the results are written asynchronously
+        self._pending_frames = []  # frames submitted to the writer and not flushed
+        self._frame_stores = {}  # FrameStore objects used for the fdm outputs
+        self._n_frames = {}  # number of frames submitted to each FrameStore
+        self._intervals = {}  # output interval associated to each filename
+        self._cache = {}  # output data of the current increment for each assembly
+
+    def set_async_output(self, asynchronous=True, max_queue_size=2):
+        if self._writer is not None:
+            self.flush()
+            writer = self._writer
+            self._writer = None
+            writer.close()
+        if asynchronous:
+            self._writer = _ResultsWriter(max_queue_size)
+
+    def flush(self):
+        if self._writer is not None:
+            self._writer.flush()
+            # the written frames are referenced in the main thread in the
+            # order of submission
+            for frame in self._pending_frames:
+                self._add_frame_ref(*frame)
+            self._pending_frames = []
+
+    def get_cache(self, pb, assemb, position=1):
+        """Return a dict used to keep the output data of an assembly in memory.
+
+        The same dict is returned while the problem stays at the same
+        increment, ie as long as the time, the dof solution and the state
+        variables of the assembly are not modified. It allows to share the
+        computed fields (stress conversion, principal values, gauss point to
+        node conversion, ...) between all the output requests.
+        """
+        time = getattr(pb, "time", None)
+        dof_solution = pb.get_dof_solution()
+        sv = dict(assemb.sv)
+        key = (assemb, position)
+        if key in self._cache:
+            cache_time, cache_dof_solution, cache_sv, cache = self._cache[key]
+            if (
+                cache_time == time
+                and np.array_equal(cache_dof_solution, dof_solution)
+                and cache_sv.keys() == sv.keys()
+                and all(cache_sv[k] is v for k, v in sv.items())
+            ):
+                return cache
+        cache = {}
+        self._cache[key] = (time, np.array(dof_solution), sv, cache)
+        return cache
 
     def add_output(
         self,
@@ -362,13 +535,40 @@ class _ProblemOutput:
         position=1,
         element_set=None,
         save_mesh=True,
+        interval=1,
+        node_set=None,
+        dtype=None,
+        encoding=None,
     ):
+        """Add an output request.
+
+        The requested fields are saved at each call of save_results
+        (see :py:meth:`fedoo.Problem.add_output` for the main parameters).
+
+        The following parameters allow to save only what is required:
+
+        * interval (int, default = 1): the fields are saved only one time
+          every interval outputs. The frames are numbered from 0 in the
+          saved files. Several output requests with different intervals
+          need to be saved in different files.
+        * node_set (list of int or str, optional): probes. Only the node
+          data of the given nodes are saved (the output_type is set to
+          'Node'). The mesh associated to the results is a set of
+          independent points.
+        * dtype (str or numpy dtype, optional): if defined, the float
+          fields are converted to this type before being saved
+          (for instance 'float32').
+        * encoding (None or 'quantize'): if 'quantize', each component of
+          the fields is stored as uint16 values linearly mapped between its
+          min and max values for the frame. The data are decoded when
+          loaded. Only available for 'fdz', 'fdm' and 'npz' file formats.
+        """
         dirname = os.path.dirname(filename)
         # filename = os.path.basename(filename)
         extension = os.path.splitext(filename)[1]
         if extension == "":
             file_format = file_format.lower()
-            if file_format != "fdz":
+            if file_format not in ["fdz", "fdm"]:
                 # if no extention -> create a new dir using filename as dirname
                 dirname = filename + "/"
                 filename = dirname + os.path.basename(filename)
@@ -413,7 +613,31 @@ class _ProblemOutput:
         if isinstance(assemb, str):
             assemb = AssemblyBase.get_all()[assemb]
 
-        if element_set is None:
+        interval = int(interval)
+        if interval < 1:
+            raise NameError("The output interval should be a positive integer")
+        if self._intervals.setdefault(filename, interval) != interval:
+            raise NameError(
+                f"The file '{filename}' is already used by an output with a "
+                "different interval."
+            )
+        if dtype is not None:
+            dtype = np.dtype(dtype)
+        if encoding not in [None, "quantize"]:
+            raise NameError("encoding should be either None or 'quantize'")
+        if encoding is not None and file_format not in ["fdz", "fdm", "npz"]:
+            raise NameError(
+                "Encoded outputs are only available for 'fdz', 'fdm' and 'npz' "
+                "file formats"
+            )
+
+        if node_set is not None:
+            if element_set is not None:
+                raise NameError("node_set and element_set can't be used together")
+            if output_type is not None and output_type.lower() != "node":
+                raise NameError("Only 'Node' output_type can be used with a node_set")
+            mesh = _get_probe_mesh(assemb.mesh, node_set)
+        elif element_set is None:
             mesh = assemb.mesh
         else:
             mesh = assemb.mesh.extract_elements(element_set)
@@ -430,18 +654,24 @@ class _ProblemOutput:
             "position": position,
             "element_set": element_set,
             "compressed": compressed,
+            "interval": interval,
+            "node_set": node_set,
+            "dtype": dtype,
+            "encoding": encoding,
         }
         self.__list_output.append(new_output)
 
         # if file_format in ['npz', 'npz_compressed', 'fdz', 'fdz_compressed']:
         if not (filename in self.data_sets):
             if file_format == "fdz":
-                file = ZipFile(filename + ".fdz", "w")  # create a new zip file
-                mesh.save("_mesh_")  # create temp '_mesh_.vtk' file
-
-                file.write("_mesh_.vtk")  # add '_mesh_.vtk' to the zip archive
-                os.remove("_mesh_.vtk")
-                file.close()
+                # create a new zip file including the mesh
+                with ZipFile(filename + ".fdz", "w") as file:
+                    _write_fdz_mesh(file, mesh)
+            elif file_format == "fdm":
+                self._frame_stores[filename] = _create_frame_store(
+                    filename + ".fdm", mesh
+                )
+                self._n_frames[filename] = self._frame_stores[filename].n_frames
             elif save_mesh and (file_format not in ["vtk", "msh"]):
                 mesh.save(filename)
 
@@ -459,6 +689,8 @@ class _ProblemOutput:
         list_full_filename = []
         list_file_format = []
         list_compressed = []  # True if the file should be compressed
+        list_encoded = []  # set of the to_dict keys to quantize for each file
+        list_iter = []  # frame number in each file
         list_data = []
 
         for output in self.__list_output:
@@ -468,15 +700,23 @@ class _ProblemOutput:
             position = output["position"]
             element_set = output["element_set"]
             compressed = output["compressed"]
+            interval = output["interval"]
 
             assemb = output["assembly"]
             # material = assemb.weakform.GetConstitutiveLaw()
 
+            if comp_output is None:
+                iteration = None
+            elif comp_output % interval == 0:
+                iteration = comp_output // interval
+            else:
+                continue  # nothing to save for this output
+
             if file_format in _available_format:  # if not ignored
-                if (comp_output is None) or (file_format == "fdz"):
+                if (iteration is None) or (file_format in ["fdz", "fdm"]):
                     filename_compl = ""
                 else:
-                    filename_compl = "_" + str(comp_output)
+                    filename_compl = "_" + str(iteration)
 
                 full_filename = (
                     filename + filename_compl + "." + file_format
@@ -488,8 +728,10 @@ class _ProblemOutput:
                     list_full_filename.append(full_filename)
                     list_file_format.append(file_format)
                     list_compressed.append(compressed)
+                    list_encoded.append(set())
+                    list_iter.append(iteration)
 
-                    out = DataSet(assemb.mesh)
+                    out = DataSet(self.data_sets[filename].mesh)
                     list_data.append(out)
                 else:
                     # else, the same file is used
@@ -504,24 +746,95 @@ class _ProblemOutput:
                     position,
                     element_set,
                     False,
+                    output["node_set"],
                 )
+                if output["dtype"] is not None:
+                    for data in [res.node_data, res.element_data, res.gausspoint_data]:
+                        for key, value in data.items():
+                            value = np.asarray(value)
+                            if np.issubdtype(value.dtype, np.floating):
+                                data[key] = value.astype(output["dtype"])
+                if output["encoding"] == "quantize":
+                    list_encoded[list_full_filename.index(full_filename)].update(
+                        k for k in res.to_dict() if k[-2:] in ["nd", "el", "gp"]
+                    )
                 out.add_data(res)
 
         for i, out in enumerate(list_data):
-            if list_file_format[i] == "fdz":
-                out.save("_mesh_.npz", False, list_compressed[i])
-                file = ZipFile(list_full_filename[i], "a")
-                if comp_output is None:
-                    iter_name = "iter_0" + ".npz"
-                else:
-                    iter_name = "iter_" + str(comp_output) + ".npz"
-                file.write("_mesh_.npz", iter_name)
-                os.remove("_mesh_.npz")
-                file.close()
-                self.data_sets[list_filename[i]].list_data.append(
-                    Path(list_full_filename[i], iter_name)
-                )
+            args = (
+                out,
+                list_filename[i],
+                list_full_filename[i],
+                list_file_format[i],
+                list_compressed[i],
+                list_iter[i],
+                list_encoded[i],
+            )
+            frame = (
+                list_filename[i],
+                list_full_filename[i],
+                list_file_format[i],
+                list_iter[i],
+            )
+            if self._writer is None:
+                self._write_frame(*args)
+                self._add_frame_ref(*frame)
+            else:
+                # copy the data because the arrays may be modified by the
+                # solver before being written
+                for data in [out.node_data, out.element_data, out.gausspoint_data]:
+                    for key in data:
+                        data[key] = np.array(data[key])
+                self._writer.submit(lambda args=args: self._write_frame(*args))
+                self._pending_frames.append(frame)
+
+    def _add_frame_ref(self, filename, full_filename, file_format, iteration):
+        # add a written frame to the list_data of the MultiFrameDataSet
+        if file_format == "fdz":
+            if iteration is None:
+                iteration = 0
+            ref = Path(full_filename, "iter_" + str(iteration) + ".npz")
+        elif file_format == "fdm":
+            store = self._frame_stores[filename]
+            ref = StoredFrame(store, self._n_frames[filename])
+            self._n_frames[filename] += 1
+        else:
+            ref = full_filename
+        self.data_sets[filename].list_data.append(ref)
+
+    def _write_frame(
+        self,
+        out,
+        filename,
+        full_filename,
+        file_format,
+        compressed,
+        iteration,
+        encoded_keys=(),
+    ):
+        if file_format in ["fdz", "fdm", "npz"]:
+            # the min/max values of the fields are saved to avoid reading
+            # all the frames to get the field limits
+            data = _add_frame_lim(out.to_dict(), out.mesh.n_physical_nodes)
+            if encoded_keys:
+                data = _quantize_frame(data, encoded_keys)
+
+        if file_format == "fdz":
+            if iteration is None:
+                iter_name = "iter_0" + ".npz"
+            else:
+                iter_name = "iter_" + str(iteration) + ".npz"
+            with ZipFile(full_filename, "a") as file:
+                _write_fdz_frame(file, iter_name, data, compressed)
 
+        elif file_format == "fdm":
+            self._frame_stores[filename].append(data)
+
+        elif file_format == "npz":
+            if compressed:
+                np.savez_compressed(full_filename, **data)
             else:
-                out.save(list_full_filename[i], compressed=list_compressed[i])
-                self.data_sets[list_filename[i]].list_data.append(list_full_filename[i])
+                np.savez(full_filename, **data)
+
+        else:
+            out.save(full_filename, compressed=compressed)
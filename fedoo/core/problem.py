@@ -5,7 +5,7 @@ import scipy.sparse.linalg
 
 from fedoo.core.assembly import Assembly
 from fedoo.core.base import ProblemBase
-from fedoo.core.boundary_conditions import BoundaryCondition, MPC
+from fedoo.core.boundary_conditions import BoundaryCondition, MPC, _ConstraintStore
 from fedoo.core.output import _ProblemOutput, _get_results
 from fedoo.core.dataset import DataSet
 
@@ -64,6 +64,7 @@ class Problem(ProblemBase):
 
         self._dof_slave = np.array([])
         self._dof_free = np.array([])
+        self._bc_topology = {}  # cached dof classification and mpc matrix
 
         # prepering output demand to export results
         self._problem_output = _ProblemOutput()
@@ -117,6 +118,10 @@ class Problem(ProblemBase):
         position=1,
         element_set=None,
         save_mesh=True,
+        interval=1,
+        node_set=None,
+        dtype=None,
+        encoding=None,
     ):
         return self._problem_output.add_output(
             filename,
@@ -128,10 +133,46 @@ class Problem(ProblemBase):
             position,
             element_set,
             save_mesh,
+            interval,
+            node_set,
+            dtype,
+            encoding,
         )
 
     def save_results(self, iterOutput=None):
         self._problem_output.save_results(self, iterOutput)
+        self._problem_output.flush()
+
+    def set_async_output(self, asynchronous=True, max_queue_size=2):
+        """Write the results in a background thread.
+
+        When enabled, the results saved at each increment of nlsolve are
+        only computed and a copy is submitted to a background writer that
+        serializes and writes the frames while the solver continue. The
+        results are flushed at the end of nlsolve, when the results property
+        is accessed and when save_results is called directly (for instance
+        after a linear solve). The pending frames are also written at the
+        interpreter exit.
+
+        Parameters
+        ----------
+        asynchronous : bool, default = True
+            If False, the pending frames are written and the results are
+            written again by the solver thread.
+        max_queue_size : int, default = 2
+            Maximal number of frames waiting to be written. If the queue is
+            full, save_results waits until a frame is written.
+            If max_queue_size <= 0, the queue size is not limited.
+        """
+        self._problem_output.set_async_output(asynchronous, max_queue_size)
+
+    def flush_results(self):
+        """Wait until all the results are written in the output files.
+
+        If an error has occurred in the background writer, it is raised.
+        Has no effect if the results are not written asynchronously.
+        """
+        self._problem_output.flush()
 
     def get_results(
         self, assemb, output_list, output_type=None, position=1, element_set=None
@@ -216,102 +257,91 @@ class Problem(ProblemBase):
         self._set_vect_component(self.__X, name, value)
 
     def apply_boundary_conditions(self, t_fact=1, t_fact_old=None):
-        n = self.mesh.n_nodes
-        nvar = self.space.nvar
-        self._Xbc = np.zeros(nvar * n)
-        F = np.zeros(nvar * n)
-
-        build_mpc = False
-        dof_blocked = set()  # only dirichlet bc
-        dof_slave = set()
-        data = []
-        row = []
-        col = []
+        n_dof = self.mesh.n_nodes * self.space.nvar
 
+        store = _ConstraintStore(n_dof)
+        # Xbc is filled during the bc generation (may be used by some bc)
+        self._Xbc = store.Xbc
         for e in self.bc.generate(self, t_fact, t_fact_old):
-            if e.bc_type == "Dirichlet":
-                self._Xbc[e._dof_index] = e._current_value
-                dof_blocked.update(e._dof_index)
+            store.append(e)
+        store.finalize()
 
-            if e.bc_type == "Neumann":
-                F[e._dof_index] = e._current_value
-
-            if e.bc_type == "MPC":
-                self._Xbc[e._dof_index[0]] = (
-                    e._current_value
-                )  # valid in this case ??? need to be checked
-                dof_slave.update(e._dof_index[0])  # eliminated dof
-                build_mpc = True
-
-                n_fact = len(e._factors)  # only factor for non eliminated (master) dof
-                # shape e.__Fact should be n_fact*nbMPC
-                # shape self.__Index should be nbMPC
-                # shape self.__IndexMaster should be n_fact*nbMPC
-                data.append(np.array(e._factors.T).ravel())
-                row.append(
-                    (np.array(e._dof_index[0]).reshape(-1, 1) * np.ones(n_fact)).ravel()
-                )
-                col.append(e._dof_index[1:].T.ravel())
-                # col.append((e.IndexMaster + np.c_[e.VariableMaster]*n).T.ravel())
+        # dof classification and mpc matrix: only rebuilt if the structure
+        # of the bc has changed
+        self._update_bc_topology(store)
 
-        dof_slave.update(dof_blocked)
-        dof_slave = np.fromiter(dof_slave, int, len(dof_slave))
-        # dof_slave= np.unique(np.hstack(dof_slave)).astype(int)
-        dof_free = np.setdiff1d(range(nvar * n), dof_slave).astype(int)
+        if self._MFext is not 0:
+            # update Xbc with the eliminated dof that may be used as slave dof in mpc
+            self._Xbc = self._Xbc + self._MFext @ self._Xbc
 
-        # build matrix MPC
-        if build_mpc:
-            # Treating the case where MPC includes some blocked nodes as master nodes
-            # M is a matrix such as Xblocked = M@X + Xbc
-            M = sparse.coo_matrix(
-                (np.hstack(data), (np.hstack(row), np.hstack(col))),
-                shape=(nvar * n, nvar * n),
-            )
+        self.__B = store.F
+        self._t_fact = t_fact
 
-            # update Xbc with the eliminated dof that may be used as slave dof in mpc
-            self._Xbc = self._Xbc + M @ self._Xbc
-            # M = (M+M@M).tocoo() #Compute M + M@M - not sure it is required
+    def _update_bc_topology(self, store):
+        # Build the topology related data of the boundary conditions:
+        # dof_slave, dof_free and the MatCB matrix such as X = MatCB @ X_free + Xbc.
+        # The dof classification and the mpc matrix are cached separately
+        # and keyed by the number of dof and a sha1 digest of the bc structure.
+        cache = self._bc_topology
+        dof_key = store.get_dof_key()
+        mpc_key = store.get_mpc_key()
+        if cache.get("MatCB_key") == (dof_key, mpc_key):
+            return
+
+        if cache.get("dof_key") != dof_key:
+            dof_free = np.nonzero(~store.slave_mask)[0]
+            # new numbering of the free dof (-1 for eliminated dof)
+            free_ind = np.full(store.n_dof, -1)
+            free_ind[dof_free] = np.arange(len(dof_free))
+
+            cache["dof_key"] = dof_key
+            cache["dof_slave"] = np.nonzero(store.slave_mask)[0]
+            cache["dof_blocked"] = np.nonzero(store.blocked_mask)[0]
+            cache["dof_free"] = dof_free
+            cache["free_ind"] = free_ind
+
+        if cache.get("mpc_key") != mpc_key:
+            cache["mpc_key"] = mpc_key
+            if store.n_mpc > 0:
+                # Treating the case where MPC includes some blocked nodes as master nodes
+                # M is a matrix such as Xblocked = M@X + Xbc
+                # M = (M+M@M).tocoo() #Compute M + M@M - not sure it is required
+                cache["M"] = store.get_mpc_matrix()
+            else:
+                cache["M"] = 0
 
-            data = M.data
-            row = M.row
-            col = M.col
+        dof_free = cache["dof_free"]
+        M = cache["M"]
 
+        # build matrix MPC
+        if M is not 0:
             # modification col numbering from dof_free to np.arange(len(dof_free))
-            changeInd = np.full(
-                nvar * n, np.nan
-            )  # mettre des nan plutôt que des zeros pour générer une erreur si pb
-            changeInd[dof_free] = np.arange(len(dof_free))
-            col = changeInd[np.hstack(col)]
-
-            mask = np.logical_not(np.isnan(col))  # mask to delete nan value
-            # print(len(col) - len(col[mask]))
+            col = cache["free_ind"][M.col]
+            mask = col != -1  # remove the eliminated master dof
+            row = M.row[mask]
             col = col[mask]
-            row = row[mask]
-            data = data[mask]
-
-            # self._MFext = M.tocsr().T
-            self._MFext = M
-            self._dof_blocked = dof_blocked
+            data = M.data[mask]
         else:
-            self._MFext = 0
-
-        # #adding identity for free nodes
-        col = np.hstack(
-            (col, np.arange(len(dof_free)))
-        )  # np.hstack((col,dof_free)) #col.append(dof_free)
-        row = np.hstack((row, dof_free))  # row.append(dof_free)
-        data = np.hstack(
-            (data, np.ones(len(dof_free)))
-        )  # data.append(np.ones(len(dof_free)))
-
-        self.__MatCB = sparse.coo_matrix(
-            (data, (row, col)), shape=(nvar * n, len(dof_free))
-        ).tocsr()
-
-        self.__B = F
-        self._dof_slave = dof_slave
+            row = col = np.empty(0, dtype=int)
+            data = np.empty(0)
+
+        # adding identity for free nodes
+        self.__MatCB = sparse.csr_matrix(
+            (
+                np.concatenate((data, np.ones(len(dof_free)))),
+                (
+                    np.concatenate((row, dof_free)),
+                    np.concatenate((col, np.arange(len(dof_free)))),
+                ),
+            ),
+            shape=(store.n_dof, len(dof_free)),
+        )
+        cache["MatCB_key"] = (dof_key, mpc_key)
+
+        self._MFext = M
+        self._dof_blocked = cache["dof_blocked"]
+        self._dof_slave = cache["dof_slave"]
         self._dof_free = dof_free
-        self._t_fact = t_fact
 
     def update_boundary_conditions(self):
         self.apply_boundary_conditions(self._t_fact, self._t_fact)
@@ -394,6 +424,7 @@ class Problem(ProblemBase):
 
     @property
     def results(self):
+        self._problem_output.flush()
         return self._problem_output.data_sets
 
     @property
@@ -0,0 +1,103 @@
+"""Storage of the state variables of an assembly."""
+
+from __future__ import annotations
+
+import numpy as np
+
+
+class StateVariableStore:
+    """Current and start state variables of an assembly.
+
+    The state variables are kept in two dict: ``current`` (Assembly.sv) with
+    the values of the current iteration and ``start`` (Assembly.sv_start) with
+    the values at the beginning of the time increment. The values are never
+    copied: a commit (new increment) makes the start dict alias the current
+    values and a rollback (restart of the increment) makes the current dict
+    alias the start values. Both operations only copy one reference per field
+    and keep the dict objects, so that the aliases of Assembly.sv stay valid.
+
+    As the arrays are shared by both dict, they can't be modified in place.
+    To avoid allocating new arrays at each iteration, gauss point fields with
+    a fixed shape and dtype can be written in the arrays given by
+    :py:meth:`get_buffer`. Two contiguous arrays (fortran order) are
+    allocated once for each of these fields and the array returned is always
+    the one that is not used by the start value (double buffering). Hence,
+    after a commit the roles of both arrays are swapped without any copy.
+    """
+
+    def __init__(self):
+        self.current = {}
+        self.start = {}
+        self._buffers = {}  # field name -> [array, array]
+
+    def commit(self):
+        """Set the start values to the current values (new time increment)."""
+        if self.start is not self.current:
+            self.start.clear()
+            self.start.update(self.current)
+
+    def rollback(self):
+        """Set the current values to the start values (restart the increment)."""
+        if self.start is not self.current:
+            self.current.clear()
+            self.current.update(self.start)
+
+    def clear(self):
+        """Remove all the state variables and the allocated buffers."""
+        self.current.clear()
+        self.start.clear()
+        self._buffers.clear()
+
+    def get_buffer(self, name: str, shape: tuple[int, ...], dtype=float) -> np.ndarray:
+        """Return an array in which the new current value of a field can be written.
+
+        The returned array never shares memory with the start value of the
+        field, but it may be the current value (if already given by a
+        previous call in the same increment). Its content is undefined.
+        If the shape or the dtype of a field is modified, new arrays are
+        allocated.
+
+        Parameters
+        ----------
+        name : str
+            Name of the field (key in the current dict).
+        shape : tuple of int
+            Shape of the field, generally with the gauss points as last axis.
+        dtype : data-type, default = float
+            dtype of the field.
+
+        Returns
+        -------
+        numpy.ndarray (fortran order)
+        """
+        shape = tuple(shape)
+        buffers = self._buffers.get(name)
+        if buffers is None or buffers[0].shape != shape or buffers[0].dtype != dtype:
+            buffers = [np.empty(shape, dtype, order="F") for i in range(2)]
+            self._buffers[name] = buffers
+
+        start_value = _get_array(self.start.get(name))
+        if start_value is not None and np.may_share_memory(buffers[0], start_value):
+            return buffers[1]
+        return buffers[0]
+
+    def is_buffer(self, value) -> bool:
+        """Return True if value shares memory with the buffer of a field."""
+        value = _get_array(value)
+        if value is None:
+            return False
+        return any(
+            np.may_share_memory(buf, value)
+            for buffers in self._buffers.values()
+            for buf in buffers
+        )
+
+
+def _get_array(value):
+    # array associated to a state variable (None if not an array)
+    if isinstance(value, np.ndarray):
+        return value
+    array = getattr(value, "array", None)  # StressTensorList or StrainTensorList
+    if isinstance(array, np.ndarray):
+        return array
+    return None
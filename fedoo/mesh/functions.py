@@ -505,7 +505,7 @@ def change_elm_type(mesh, elm_type, name=""):
 
     new_mesh = Mesh(new_nodes, new_elm, elm_type, name=name)
 
-    new_mesh.merge_nodes(new_mesh.find_coincident_nodes())  # very slow strategy
+    new_mesh.merge_nodes(new_mesh.find_coincident_nodes())
 
     # ○r using pyvista. try to see if it is more efficient
     # new_mesh = new_mesh.to_pyvista().clean(tol=1e-6, remove_unused_points=False)
@@ -2,9 +2,201 @@
 
 from __future__ import annotations
 
-from fedoo.core.mesh import Mesh, MultiMesh
+from itertools import islice
+
+from fedoo.core.mesh import Mesh, MultiMesh, _vtk_node_order
 import numpy as np
 
+_CHUNK_SIZE = 2**18  # max number of lines parsed at once
+
+# number of nodes and dimension of the gmsh element types
+_msh_element_types = {
+    1: (2, 1),  # lin2
+    2: (3, 2),  # tri3
+    3: (4, 2),  # quad4
+    4: (4, 3),  # tet4
+    5: (8, 3),  # hex8
+    6: (6, 3),  # wed6
+    7: (5, 3),  # pyr5
+    8: (3, 1),  # lin3
+    9: (6, 2),  # tri6
+    10: (9, 2),  # quad9
+    11: (10, 3),  # tet10
+    12: (27, 3),  # hex27
+    13: (18, 3),  # wed18
+    14: (14, 3),  # pyr14
+    15: (1, 0),  # point
+    16: (8, 2),  # quad8
+    17: (20, 3),  # hex20
+    18: (15, 3),  # wed15
+    19: (13, 3),  # pyr13
+}
+
+# number of nodes of the vtk cell types with a fixed number of nodes
+_vtk_cell_n_nodes = {
+    1: 1,
+    3: 2,
+    5: 3,
+    9: 4,
+    10: 4,
+    12: 8,
+    13: 6,
+    14: 5,
+    21: 3,
+    22: 6,
+    23: 8,
+    24: 10,
+    25: 20,
+    26: 15,
+    28: 9,
+    29: 27,
+    32: 18,
+}
+
+_vtk_binary_types = {
+    "bit": ">u1",
+    "unsigned_char": ">u1",
+    "char": ">i1",
+    "unsigned_short": ">u2",
+    "short": ">i2",
+    "unsigned_int": ">u4",
+    "int": ">i4",
+    "unsigned_long": ">u8",
+    "long": ">i8",
+    "float": ">f4",
+    "double": ">f8",
+    "vtkidtype": ">i8",
+    "vtktypeint64": ">i8",
+    "vtktypeuint64": ">u8",
+}
+
+
+def _parse_ascii(buf: bytes, dtype=float) -> np.ndarray:
+    # bulk conversion of a block of text with white space separated values
+    if buf.isspace():  # np.fromstring doesn't return an empty array in this case
+        return np.empty(0, dtype=dtype)
+    return np.fromstring(buf, dtype=dtype, sep=" ")
+
+
+def _count_tokens(buf: bytes, n_lines: int) -> np.ndarray:
+    # number of white space separated values in each line of a block of text
+    char = np.frombuffer(buf, np.uint8)
+    newline = char == 10
+    space = (char == 32) | (char == 9) | (char == 13) | newline
+    token_start = ~space
+    token_start[1:] &= space[:-1]
+    line = np.cumsum(newline)[token_start]
+    return np.bincount(line, minlength=n_lines)[:n_lines]
+
+
+class _FileReader:
+    """Read mesh files by blocks of lines or binary values.
+
+    The file is never fully loaded in memory: the numeric blocks are read
+    by chunks of lines and converted in bulk with numpy.
+    """
+
+    def __init__(self, filename: str):
+        self.file = open(filename, "rb")
+        self.binary = False
+        self.byteorder = "<"
+
+    def close(self):
+        self.file.close()
+
+    def readline(self) -> str:
+        """Return the next non empty line (stripped) or "" at the end of file."""
+        for line in self.file:
+            line = line.strip()
+            if line != b"":
+                return line.decode("latin-1")
+        return ""
+
+    def read_values(self, n_values: int, dtype=float) -> np.ndarray:
+        """Read n_values numbers (ascii or binary) as a 1d array.
+
+        In binary mode, dtype should be a numpy dtype with the file byte order.
+        In ascii mode, the values may be written on any number of lines but
+        the block should end at the end of a line.
+        """
+        if self.binary:
+            dtype = np.dtype(dtype)
+            data = self.file.read(n_values * dtype.itemsize)
+            if len(data) != n_values * dtype.itemsize:
+                raise NameError("Unexpected end of file")
+            return np.frombuffer(data, dtype).astype(dtype.newbyteorder("="))
+
+        values = []
+        n_read = 0
+        n_per_line = 0
+        while n_read < n_values:
+            if n_per_line == 0:
+                # first line used to estimate the number of lines to read
+                buf = self.file.readline()
+                if buf == b"":
+                    raise NameError("Unexpected end of file")
+            else:
+                n_lines = min(-(-(n_values - n_read) // n_per_line), _CHUNK_SIZE)
+                buf = b"".join(islice(self.file, n_lines))
+                if buf == b"":
+                    raise NameError("Unexpected end of file")
+            block = _parse_ascii(buf, dtype)
+            n_per_line = n_per_line or len(block)
+            values.append(block)
+            n_read += len(block)
+
+        if n_read != n_values:
+            raise NameError("Data size mismatch")
+        if len(values) == 1:
+            return values[0]
+        return np.concatenate(values)
+
+    def read_lines(self, n_lines: int, dtype=int) -> tuple[np.ndarray, np.ndarray]:
+        """Read n_lines lines of ascii values with a variable number of values.
+
+        Return the flat array of values and the number of values in each line.
+        """
+        values = []
+        counts = []
+        for i in range(0, n_lines, _CHUNK_SIZE):
+            n = min(_CHUNK_SIZE, n_lines - i)
+            buf = b"".join(islice(self.file, n))
+            counts.append(_count_tokens(buf, n))
+            values.append(_parse_ascii(buf, dtype))
+        values = np.concatenate(values)
+        counts = np.concatenate(counts)
+        if counts.sum() != len(values) or len(counts) != n_lines:
+            raise NameError("Data size mismatch")
+        return values, counts
+
+    def skip_lines(self, n_lines: int):
+        for line in islice(self.file, n_lines):
+            pass
+
+    def skip_section(self, section: str):
+        """Go to the end of a msh section (after the line $End<section>)."""
+        end = ("$end" + section).encode()
+        for line in self.file:
+            if line.strip().lower().startswith(end):
+                return
+        raise NameError("Unexpected end of file")
+
+
+def _sort_nodes(crd: np.ndarray, tags: np.ndarray):
+    # Return the node coordinates sorted by tag and a function that convert
+    # node tags in node indices
+    min_tag = tags.min()
+    if tags.max() - min_tag + 1 == len(tags):  # continuous node numbering
+        if np.any(tags[1:] < tags[:-1]):
+            sorted_crd = np.empty_like(crd)
+            sorted_crd[tags - min_tag] = crd
+            crd = sorted_crd
+        return crd, lambda elm: elm - min_tag
+
+    lookup = np.full(tags.max() + 1, -1, dtype=int)
+    lookup[tags] = np.arange(len(tags))
+    return crd, lambda elm: lookup[elm]
+
 
 def import_file(filename: str, name: str = "") -> Mesh:
     """Import a mesh from a file.
@@ -14,7 +206,7 @@ def import_file(filename: str, name: str = "") -> Mesh:
     Parameters
     ----------
     filename : str
-        Name of file to import. Should be a ".msh" or a ".vtk" ascii files.
+        Name of file to import. Should be a ".msh" or a ".vtk" files.
     name : str, optional
         Name of the imported Mesh. The default is "".
 
@@ -36,11 +228,14 @@ def import_msh(
     """Import a mesh from a msh file (gmsh format).
 
     Mesh.read should be prefered in most cases.
+    The 2.2 (ascii) and 4.1 (ascii or binary) versions of the gmsh format
+    are supported. The node and element blocks are parsed in bulk and the
+    file is read by chunks so that large files can be imported efficiently.
 
     Parameters
     ----------
     filename : str
-        Name of file to import. Should be a ".msh" or a ".vtk" ascii files.
+        Name of file to import. Should be a ".msh" file.
     name : str, optional
         Name of the imported Mesh. The default is "".
     mesh_type : list of str in {'curve', 'surface', 'volume'}
@@ -57,35 +252,23 @@ def import_msh(
 
     possible_element_type = []
     if "curve" in mesh_type:
-        possible_element_type.extend([("1", "lin2"), ("8", "lin3")])
+        possible_element_type.extend([(1, "lin2"), (8, "lin3")])
     if "surface" in mesh_type:
         possible_element_type.extend(
             [
-                ("2", "tri3"),
-                ("3", "quad4"),
-                ("9", "tri6"),
-                ("10", "quad9"),
-                ("16", "quad8"),
+                (2, "tri3"),
+                (3, "quad4"),
+                (9, "tri6"),
+                (10, "quad9"),
+                (16, "quad8"),
             ]
         )
     if "volume" in mesh_type:
         possible_element_type.extend(
-            [("4", "tet4"), ("5", "hex8"), ("11", "tet10"), ("17", "hex20")]
+            [(4, "tet4"), (5, "hex8"), (11, "tet10"), (17, "hex20")]
         )
     possible_element_type = dict(possible_element_type)
-
-    # possible_element_type = {
-    #             '1':'lin2',
-    #             '2':'tri3',
-    #             '3':'quad4',
-    #             '4':'tet4',
-    #             '5':'hex8',
-    #             '8':'lin3',
-    #             '9':'tri6',
-    #             '10':'quad9',
-    #             '11':'tet10',
-    #             '16':'quad8',
-    #             '17':'hex20'}
+    # not implemented 6:wed6 - 7:pyr5
 
     filename = filename.strip()
 
@@ -93,376 +276,307 @@ def import_msh(
         name = filename
         if name[-4:].lower() == ".msh":
             name = name[:-4]
-    mesh = None
 
-    # print 'Reading file',`filename`
-    f = open(filename, "r")
-    msh = f.read()
-    f.close()
-    msh = msh.split("\n")
-    msh = [line.strip() for line in msh if line.strip() != ""]
+    f = _FileReader(filename)
+    try:
+        if f.readline().lower() != "$meshformat":
+            raise NameError("Unknown file format")
+        l = f.readline().split()  # versionnumber, file-type, data-size
+
+        # Check version
+        version = l[0]
+        assert version in [
+            "4.1",
+            "2.2",
+        ], "Only support 2.2 and 4.1 version of gmsh format"
+        if l[1] == "1":
+            if version != "4.1":
+                raise NotImplementedError(
+                    "Binary msh files are only supported for the 4.1 version"
+                )
+            if l[2] != "8":
+                raise NotImplementedError("Only 8 bytes data size is supported")
+            f.binary = True
+            one = f.file.read(4)  # 1 written as int to detect endianness
+            f.byteorder = "<" if np.frombuffer(one, "<i4")[0] == 1 else ">"
+        f.skip_section("meshformat")
+
+        if version == "4.1":
+            crd, node_tags, element_all = _read_msh4(f, possible_element_type)
+        else:
+            crd, node_tags, element_all = _read_msh2(f, possible_element_type)
+    finally:
+        f.close()
 
-    l = msh.pop(0)
-    if l.lower() != "$meshformat":
-        raise NameError("Unknown file format")
-    l = msh.pop(0).lower().split()  # versionnumber, file-type, data-size
+    crd, get_node_index = _sort_nodes(crd, node_tags)
 
-    # Check version
-    version = l[0]
-    assert version in ["4.1", "2.2"], "Only support 2.2 and 4.1 version of gmsh format"
+    if len(element_all) > 1:
+        multi_mesh = True
+        list_mesh = []
+    else:
+        multi_mesh = False
 
-    l = msh.pop(0)  # $EndMeshFormat
+    for count, elementType in enumerate(element_all):
+        elm_tables, elm_sets = element_all[elementType]
+        elm = get_node_index(np.concatenate(elm_tables))
 
-    NodeData = []
-    ElmData = []
-    NodeDataName = []
-    ElmDataName = []
+        type_elm = possible_element_type[elementType]
 
-    PhysicalNames = None
-    # pointEntities = {}
-    curveEntities = {}
-    surfaceEntities = {}
-    volumeEntities = {}
+        if type_elm == "tet10":  # swap axes to account for different numbering schemes
+            elm[:, [8, 9]] = elm[:, [9, 8]]
 
-    curvePhysicalParts = {}
-    surfacePhysicalParts = {}
-    volumePhysicalParts = {}
+        if multi_mesh:
+            mesh_name = name + str(count)
+        else:
+            mesh_name = name
 
-    while msh != []:
-        l = msh.pop(0).lower()
+        imported_mesh = Mesh(crd, elm, type_elm, name=mesh_name)
+        # add entity and physical sets of elements
+        for elset, list_elm in elm_sets.items():
+            imported_mesh.add_element_set(np.concatenate(list_elm), elset)
 
-        if l == "$physicalnames":
-            # create a dict PhysicalNames which contains a str name for every physical tags
-            numPhysicalNames = int(msh.pop(0))
-            PhysicalNames = dict(
-                [
-                    msh[physical_name].split()[1:3]
-                    for physical_name in range(numPhysicalNames)
-                ]
-            )
-            del msh[0:numPhysicalNames]
-
-            msh.pop(0)  # $EndPhysicalNames
-
-        elif l == "$entities" and version == "4.1":
-            l = msh.pop(0).split()
-            numPoints = int(l[0])
-            numCurves = int(l[1])
-            numSurfaces = int(l[2])
-            numVolumes = int(l[3])
-
-            # #read point entities
-            # for i in range(numPoints):
-            #     l = msh.pop(0).split()
-            #     pointEntities[l[0]] =  l[5:5+int(l[4])]
-
-            del msh[0:numPoints]
-
-            if "curve" in mesh_type:
-                # read line entities
-                for i in range(numCurves):
-                    l = msh.pop(0).split()
-                    curveEntities[l[0]] = l[8 : 8 + int(l[7])]
-            else:
-                del msh[0:numCurves]
+        if multi_mesh:
+            list_mesh.append(imported_mesh)
 
-            if "surface" in mesh_type:
-                # read surface entities
-                for i in range(numSurfaces):
-                    l = msh.pop(0).split()
-                    surfaceEntities[l[0]] = l[8 : 8 + int(l[7])]
-            else:
-                del msh[0:numSurfaces]
+    if multi_mesh:
+        imported_mesh = MultiMesh.from_mesh_list(list_mesh, name)
 
-            if "volume" in mesh_type:
-                # read volume entitires
-                for i in range(numVolumes):
-                    l = msh.pop(0).split()
-                    volumeEntities[l[0]] = l[8 : 8 + int(l[7])]
-            else:
-                del msh[0:numVolumes]
+    return imported_mesh
 
-            msh.pop(0)  # $EndEntities
 
-        elif l == "$nodes":
-            if version == "2.2":
-                Nb_nodes = int(msh.pop(0))
-
-                numnode0 = int(
-                    msh[0].split()[0]
-                )  # 0 or 1, in the mesh format the first node is 0
-                # a conversion is required if the msh file begin with another number
-                # The numbering of nodes is assumed to be continuous (p. ex 1,2,3,....)
-                crd = np.array(
-                    [msh[nd].split()[1:] for nd in range(Nb_nodes)], dtype=float
-                )
+def _add_msh_element_sets(elm_sets, list_elm, entity_tag, physical_tags, dim, names):
+    # add the sets of elements associated to an entity and its physical groups
+    elm_sets.setdefault("Entity" + str(entity_tag), []).append(list_elm)
+    for physical_tag in physical_tags:
+        el_name = names.get((dim, physical_tag), "PhysicalPart" + str(physical_tag))
+        elm_sets.setdefault(el_name, []).append(list_elm)
 
-                del msh[0:Nb_nodes]
-                msh.pop(0)  # $EndNodes
-            elif version == "4.1":
-                l = msh.pop(0).split()
-                NbEntityBlocks = int(l[0])
-                Nb_nodes = int(l[1])
-                numnode0 = int(l[2])
-                assert (
-                    int(l[3]) == Nb_nodes - numnode0 + 1
-                ), "Only possible to import msh file with continuous node numbering"
-                crd = np.empty((Nb_nodes, 3))
-                for i in range(NbEntityBlocks):
-                    l = msh.pop(0).split()
-                    # entityDim = l[0]
-                    # entityTag = l[1] #id of the entity
-
-                    assert (
-                        int(l[2]) == 0
-                    ), "Parametric coordinates are not implemented in this msh reader"
-                    numNodesInBlock = int(l[3])
-                    if numNodesInBlock != 0:
-                        idnodes = np.array(msh[:numNodesInBlock], dtype=int) - numnode0
-                        crd[idnodes] = np.array(
-                            [
-                                nd_crd.split()
-                                for nd_crd in msh[numNodesInBlock : 2 * numNodesInBlock]
-                            ],
-                            dtype=float,
-                        )
-                        del msh[0 : 2 * numNodesInBlock]
 
-                msh.pop(0)  # $EndNodes
+def _read_physical_names(f):
+    # dict (dim, physical tag) -> name (always written as ascii)
+    names = {}
+    for i in range(int(f.readline())):
+        dim, tag, physical_name = f.readline().split(maxsplit=2)
+        names[(int(dim), int(tag))] = physical_name.strip('"')
+    f.skip_section("physicalnames")
+    return names
 
-        elif l == "$elements":
-            if version == "2.2":
-                Nb_el = int(msh.pop(0))
-                cells = [msh[el].split()[1:] for el in range(Nb_el)]
-                del msh[0:Nb_el]
-
-                celltype_all = np.array([cells[el][0] for el in range(Nb_el)], int)
-                Nb_tag = int(cells[0][1])  # assume to be constant
-                #            if np.linalg.norm(cells[:,1] - Nb_tag) != 0:
-                #                raise NameError('Only uniform number of Tags are readable')
-
-                if Nb_tag < 2:
-                    raise NameError("A minimum of 2 tags is required")
-                elif Nb_tag > 2:
-                    print("Warning: only the second tag is read")
-
-                msh.pop(0)  # $EndElements
-
-                # Tags = [cells[el][2:Nb_tag] for el in range(Nb_el)] #not used
-                # PhysicalEntity = np.array([cells[el][2] for el in range(Nb_el)]) #fist tag not used for now
-
-                Geom_all = np.array([cells[el][3] for el in range(Nb_el)], int)
-                list_geom = list(np.unique(Geom_all))
-
-            elif version == "4.1":
-                l = msh.pop(0).split()
-                NbEntityBlocks = int(l[0])
-                Nb_el = int(l[1])
-                # numel0 = int(l[2]) #usefull ?
-                element_all = {}
-
-                for i in range(NbEntityBlocks):
-                    l = msh.pop(0).split()
-                    entityDim = l[
-                        0
-                    ]  # 0 for point, 1 for curve, 2 for surface, 3 for volume
-                    entityTag = l[1]  # id of the entity
-                    elementType = l[2]
-                    numElementsInBlock = int(l[3])
-
-                    if entityDim == 1:
-                        Entities = curveEntities
-                    elif entityDim == 2:
-                        Entities = surfaceEntities
-                    elif entityDim == 3:
-                        Entities = volumeEntities
-                    else:
-                        Entities = {}
-
-                    if (
-                        numElementsInBlock != 0
-                        and elementType in possible_element_type.keys()
-                    ):
-                        if elementType not in element_all:
-                            element_all[elementType] = [
-                                [],
-                                {},
-                            ]  # [elementTable, elementSet]
-
-                        idel0 = len(element_all[elementType][0])
-                        element_all[elementType][0].extend(
-                            [msh[el].split()[1:] for el in range(numElementsInBlock)]
-                        )
 
-                        list_elm_entity = list(
-                            range(idel0, len(element_all[elementType][0]))
-                        )
+def _read_msh4(f, possible_element_type):
+    # read the sections of a msh file v4.1 (ascii or binary)
+    # return node coordinates, node tags and the elements
+    # as a dict {element type: [list of element tables, dict of element sets]}
+    size_t = f.byteorder + "u8"
+    int_t = f.byteorder + "i4"
+    double_t = f.byteorder + "f8"
 
-                        element_all[elementType][1]["Entity" + entityTag] = (
-                            list_elm_entity
-                        )
+    physical_names = {}
+    entities = {1: {}, 2: {}, 3: {}}  # dict dim -> {entity tag: physical tags}
+    crd = node_tags = None
+    element_all = {}
 
-                        # add physical parts elset
-                        if entityTag in Entities:
-                            for physicalTag in Entities[entityTag]:
-                                if physicalTag in PhysicalNames:
-                                    el_name = PhysicalNames["physicalTag"]
-                                else:
-                                    el_name = "PhysicalPart" + physicalTag
-
-                                if el_name not in element_all[elementType][1]:
-                                    element_all[elementType][1][el_name] = (
-                                        list_elm_entity
-                                    )
-                                else:
-                                    element_all[elementType][1][el_name].append(
-                                        list_elm_entity
-                                    )
-
-                        del msh[0:numElementsInBlock]
-
-                    elif numElementsInBlock != 0:
-                        del msh[0:numElementsInBlock]
-                        # print('Warning : Elements type {} is not implemeted!'.format(elementType)) #element ignored
-
-        elif l == "$nodedata" or l == "$elementdata":
-            nb_str_tag = int(msh.pop(0))
-            if l == "$nodedata":
-                NodeDataName += [
-                    str(msh.pop(0))
-                ]  # the first string tag is the name of data
-            else:
-                ElmDataName += [str(msh.pop(0))]
-            del msh[0 : nb_str_tag - 1]  # remove unused string tags
-            nb_real_tag = int(msh.pop(0))
-            del msh[0:nb_real_tag]  # remove unused real tags
-            nb_int_tag = int(msh.pop(0))
-            del msh[0:nb_int_tag]  # remove unused int tags
-
-            if l == "$nodedata":
-                if len(msh[0].split()) == 2:
-                    NodeData += [
-                        np.array(
-                            [msh[nd].split()[1] for nd in range(Nb_nodes)], dtype=float
-                        )
-                    ]
-                elif len(msh[0].split()) > 3:
-                    NodeData += [
-                        np.array(
-                            [msh[nd].split()[1:] for nd in range(Nb_nodes)], dtype=float
+    while True:
+        l = f.readline().lower()
+        if l == "":
+            break
+
+        if l == "$physicalnames":
+            physical_names = _read_physical_names(f)
+
+        elif l == "$entities":
+            if f.binary:
+                n_entities = f.read_values(4, size_t)
+                for i in range(n_entities[0]):  # point entities
+                    f.read_values(4 + 24, "u1")  # tag and coordinates
+                    f.read_values(f.read_values(1, size_t)[0], int_t)
+                for dim in [1, 2, 3]:
+                    for i in range(n_entities[dim]):
+                        tag = f.read_values(1, int_t)[0]
+                        f.read_values(6, double_t)  # bounding box
+                        physical_tags = f.read_values(
+                            f.read_values(1, size_t)[0], int_t
                         )
-                    ]
-                del msh[0:Nb_nodes]
+                        f.read_values(f.read_values(1, size_t)[0], int_t)
+                        entities[dim][int(tag)] = physical_tags.tolist()
             else:
-                if len(msh[0].split()) == 2:
-                    ElmData += [
-                        np.array(
-                            [msh[el].split()[1] for el in range(Nb_el)], dtype=float
-                        )
-                    ]
-                elif len(msh[0].split()) > 3:
-                    ElmData += [
-                        np.array(
-                            [msh[el].split()[1:] for el in range(Nb_el)], dtype=float
-                        )
-                    ]
-                del msh[0:Nb_el]
+                n_entities = [int(v) for v in f.readline().split()]
+                f.skip_lines(n_entities[0])  # point entities
+                for dim in [1, 2, 3]:
+                    for i in range(n_entities[dim]):
+                        l = f.readline().split()
+                        entities[dim][int(l[0])] = [
+                            int(v) for v in l[8 : 8 + int(l[7])]
+                        ]
+            f.skip_section("entities")
 
-    count = 0
-    if version == "2.2":
-        if len(list(np.unique(celltype_all))) > 1:
-            multi_mesh = True
-            list_mesh = []
-        else:
-            multi_mesh = False
-
-        for celltype in list(np.unique(celltype_all)):
-            type_elm = None
-            list_el = np.where(celltype_all == celltype)[0]
-            elm = np.array([cells[el][2 + Nb_tag :] for el in list_el], int) - numnode0
-
-            type_elm = possible_element_type.get(str(celltype))
-            # not implemented '6':wed6 - '7':pyr5
-
-            if (
-                type_elm == "tet10"
-            ):  # swap axes to account for different numbering schemes
-                elm[:, [8, 9]] = elm[:, [9, 8]]
-
-            GeometricalEntity = []
-            for geom in list_geom:
-                GeometricalEntity.append(
-                    [i for i in range(len(list_el)) if Geom_all[list_el[i]] == geom]
-                )
-
-            if type_elm is None:
-                print(
-                    "Warning : Elements type {} is not implemeted!".format(celltype)
-                )  # element ignored
+        elif l == "$nodes":
+            if f.binary:
+                NbEntityBlocks, Nb_nodes = f.read_values(4, size_t)[:2].tolist()
             else:
-                if multi_mesh:
-                    mesh_name = name + str(count)
+                NbEntityBlocks, Nb_nodes = [int(v) for v in f.readline().split()[:2]]
+            node_tags = []
+            crd = []
+            for i in range(NbEntityBlocks):
+                if f.binary:
+                    parametric = f.read_values(3, int_t)[2]
+                    numNodesInBlock = int(f.read_values(1, size_t)[0])
                 else:
-                    mesh_name = name
-
-                imported_mesh = Mesh(crd, elm, type_elm, name=mesh_name)
+                    l = f.readline().split()
+                    parametric = int(l[2])
+                    numNodesInBlock = int(l[3])
+                assert (
+                    parametric == 0
+                ), "Parametric coordinates are not implemented in this msh reader"
+                if numNodesInBlock != 0:
+                    node_tags.append(f.read_values(numNodesInBlock, size_t))
+                    crd.append(
+                        f.read_values(3 * numNodesInBlock, double_t).reshape(-1, 3)
+                    )
+            node_tags = np.concatenate(node_tags).astype(int)
+            crd = np.concatenate(crd)
+            if len(node_tags) != Nb_nodes:
+                raise NameError("Data size mismatch")
+            f.skip_section("nodes")
 
-                # Rajouter GeometricalEntity en elSet
+        elif l == "$elements":
+            if f.binary:
+                NbEntityBlocks = int(f.read_values(4, size_t)[0])
+            else:
+                NbEntityBlocks = int(f.readline().split()[0])
 
-                if multi_mesh:
-                    list_mesh.append(imported_mesh)
-                count += 1
+            for i in range(NbEntityBlocks):
+                if f.binary:
+                    entityDim, entityTag, elementType = f.read_values(3, int_t).tolist()
+                    numElementsInBlock = int(f.read_values(1, size_t)[0])
+                else:
+                    l = [int(v) for v in f.readline().split()]
+                    entityDim, entityTag, elementType, numElementsInBlock = l
+                if numElementsInBlock == 0:
+                    continue
+
+                if elementType in _msh_element_types:
+                    n_nodes = _msh_element_types[elementType][0]
+                elif f.binary:
+                    raise NotImplementedError(
+                        "Elements type {} is not implemeted!".format(elementType)
+                    )
+                else:  # element ignored
+                    f.skip_lines(numElementsInBlock)
+                    continue
+
+                if elementType not in possible_element_type:
+                    # element ignored
+                    if f.binary:
+                        f.read_values(numElementsInBlock * (n_nodes + 1), size_t)
+                    else:
+                        f.skip_lines(numElementsInBlock)
+                    continue
+
+                elm = f.read_values(numElementsInBlock * (n_nodes + 1), size_t)
+                elm = elm.reshape(-1, n_nodes + 1)[:, 1:].astype(int)
+
+                if elementType not in element_all:
+                    element_all[elementType] = [[], {}]  # [elementTable, elementSet]
+                elm_tables, elm_sets = element_all[elementType]
+                idel0 = sum(len(table) for table in elm_tables)
+                elm_tables.append(elm)
+                list_elm_entity = np.arange(idel0, idel0 + numElementsInBlock)
+
+                _add_msh_element_sets(
+                    elm_sets,
+                    list_elm_entity,
+                    entityTag,
+                    entities.get(entityDim, {}).get(entityTag, []),
+                    entityDim,
+                    physical_names,
+                )
+            f.skip_section("elements")
 
-    elif version == "4.1":
-        if len(element_all) > 1:
-            multi_mesh = True
-            list_mesh = []
-        else:
-            multi_mesh = False
+        elif l.startswith("$"):
+            # other sections ($NodeData, $ElementData, ...) ignored
+            f.skip_section(l[1:])
 
-        for elementType in element_all:
-            elm = np.array(element_all[elementType][0], int) - numnode0
+    return crd, node_tags, element_all
 
-            type_elm = possible_element_type.get(str(elementType))
-            # not implemented '6':wed6 - '7':pyr5
 
-            if (
-                type_elm == "tet10"
-            ):  # swap axes to account for different numbering schemes
-                elm[:, [8, 9]] = elm[:, [9, 8]]
+def _read_msh2(f, possible_element_type):
+    # read the sections of a msh file v2.2 (ascii only)
+    physical_names = {}
+    crd = node_tags = None
+    element_all = {}
 
-            if multi_mesh:
-                mesh_name = name + str(count)
-            else:
-                mesh_name = name
+    while True:
+        l = f.readline().lower()
+        if l == "":
+            break
 
-            imported_mesh = Mesh(crd, elm, type_elm, name=mesh_name)
-            # add entity set of elements
-            for elset in element_all[elementType][1]:
-                imported_mesh.add_element_set(element_all[elementType][1][elset], elset)
+        if l == "$physicalnames":
+            physical_names = _read_physical_names(f)
 
-            if multi_mesh:
-                list_mesh.append(imported_mesh)
+        elif l == "$nodes":
+            Nb_nodes = int(f.readline())
+            nodes = f.read_values(4 * Nb_nodes).reshape(-1, 4)
+            node_tags = nodes[:, 0].astype(int)
+            crd = nodes[:, 1:]
+            f.skip_section("nodes")
 
-            # print('Mesh imported: "' + importedMeshName + '" with elements ' + type_elm)
-            count += 1
+        elif l == "$elements":
+            Nb_el = int(f.readline())
+            # elm-number elm-type number-of-tags < tag > ... node-number-list
+            values, counts = f.read_lines(Nb_el)
+            f.skip_section("elements")
+
+            offsets = np.cumsum(counts) - counts
+            celltype_all = values[offsets + 1]
+            Nb_tag = values[offsets + 2]
+            if np.any(Nb_tag < 2):
+                raise NameError("A minimum of 2 tags is required")
+            PhysicalEntity = values[offsets + 3]
+            Geom_all = values[offsets + 4]
+
+            for celltype in np.unique(celltype_all):
+                if celltype not in possible_element_type:
+                    print(
+                        "Warning : Elements type {} is not implemeted!".format(celltype)
+                    )  # element ignored
+                    continue
+
+                n_nodes, dim = _msh_element_types[celltype]
+                list_el = np.where(celltype_all == celltype)[0]
+                first_node = offsets[list_el] + 3 + Nb_tag[list_el]
+                elm = values[first_node[:, None] + np.arange(n_nodes)]
+                element_all[celltype] = [[elm], {}]
+
+                # element sets associated to geometrical and physical entities
+                elm_sets = element_all[celltype][1]
+                for geom in np.unique(Geom_all[list_el]):
+                    in_geom = Geom_all[list_el] == geom
+                    _add_msh_element_sets(
+                        elm_sets,
+                        np.where(in_geom)[0],
+                        geom,
+                        np.unique(PhysicalEntity[list_el][in_geom]),
+                        dim,
+                        physical_names,
+                    )
 
-    if multi_mesh:
-        imported_mesh = MultiMesh.from_mesh_list(list_mesh, name)
+        elif l.startswith("$"):
+            f.skip_section(l[1:])
 
-    return imported_mesh
-    # return NodeData, NodeDataName, ElmData, ElmDataName
+    return crd, node_tags, element_all
 
 
 def import_vtk(filename: str, name: str = "") -> Mesh:
-    """Import a mesh from a vtk file (gmsh format).
+    """Import a mesh from a legacy vtk file (ascii or binary).
 
     Mesh.read should be prefered in most cases.
+    The data blocks are parsed in bulk and the file is read by chunks so that
+    large files can be imported efficiently.
 
     Parameters
     ----------
     filename : str
-        Name of file to import. Should be a ".msh" or a ".vtk" ascii files.
+        Name of file to import. Should be a ".vtk" file.
     name : str, optional
         Name of the imported Mesh. The default is "".
 
@@ -478,154 +592,176 @@ def import_vtk(filename: str, name: str = "") -> Mesh:
         if name[-4:].lower() == ".vtk":
             name = name[:-4]
 
-    # print 'Reading file',`filename`
-    f = open(filename, "r")
-    vtk = f.read()
-    f.close()
-    vtk = vtk.split("\n")
-    vtk = [line.strip() for line in vtk if line.strip() != ""]
-
-    l = vtk.pop(0)
-    fileversion = l.replace(" ", "").lower()
-    if not fileversion == "#vtkdatafileversion2.0":
-        print("File %s is not in VTK 2.0 format, got %s" % (filename, fileversion))
-        print(" but continuing anyway..")
-    header = vtk.pop(0)
-    format = vtk.pop(0).lower()
-    if format not in ["ascii", "binary"]:
-        raise ValueError("Expected ascii|binary but got %s" % (format))
-    if format == "binary":
-        raise NotImplementedError("reading vtk binary format")
-
-    l = vtk.pop(0).lower()
-    if l[0:7] != "dataset":
-        raise ValueError("expected dataset but got %s" % (l[0:7]))
-    if l[-17:] != "unstructured_grid":
-        raise NotImplementedError("Only unstructured grid are implemented")
-
-    point_data = False
-    cell_data = False
-    NodeData = []
-    ElmData = []
-    NodeDataName = []
-    ElmDataName = []
-
-    # à partir de maintenant il n'y a plus d'ordre. il faut tout tester.
-    while vtk != []:
-        l = vtk.pop(0).split()
-        if l[0].lower() == "points":
-            Nb_nodes = int(l[1])
-            # l[2] est considéré comme float dans tous les cas
-            crd = np.array([vtk[nd].split() for nd in range(Nb_nodes)], dtype=float)
-            del vtk[0:Nb_nodes]
-
-        elif l[0].lower() == "cells":
-            Nb_el = int(l[1])
-            cells = vtk[0:Nb_el]
-            del vtk[0:Nb_el]
-
-        elif l[0].lower() == "cell_types":
-            Nb_el = int(l[1])
-            celltype_all = np.array(vtk[0:Nb_el], dtype=int)
-            del vtk[0:Nb_el]
-
-        elif l[0].lower() == "point_data":
-            Nb_nodes = int(l[1])
-            point_data = True
-            cell_data = False
-
-        elif l[0].lower() == "cell_data":
-            Nb_el = int(l[1])
-            point_data = False
-            cell_data = True
-
-        if l[0].lower() == "scalars" or l[0].lower() == "vectors":
-            name = l[1]  # l[2] est considéré comme float dans tous les cas
-            if l[0].lower() == "scalars":
-                vtk.pop(0)  # lookup_table not implemented
-                ncol = int(l[3])
-            elif l[0].lower() == "vectors":
-                ncol = 3
-
-            if point_data == True:
-                NodeData.append(
-                    np.reshape(
-                        np.array(
-                            " ".join([vtk[ii] for ii in range(Nb_nodes)]).split(),
-                            dtype=float,
-                        ),
-                        (-1, ncol),
-                    )
-                )
-                #                NodeData.append(np.array([vtk[ii].split() for ii in range(Nb_nodes)], dtype = float))
-                NodeDataName.append(name)
-                del vtk[0:Nb_nodes]
-            elif cell_data == True:
-                ElmData.append(
-                    np.reshape(
-                        np.array(
-                            " ".join([vtk[ii] for ii in range(Nb_el)]).split(),
-                            dtype=float,
-                        ),
-                        (-1, ncol),
-                    )
-                )
-                #                ElmData.append(np.array([vtk[ii].split() for ii in range(Nb_el)], dtype = float))
-                print(np.shape(ElmData))
-                ElmDataName.append(name)
-                del vtk[0:Nb_el]
+    f = _FileReader(filename)
+    try:
+        fileversion = f.readline().replace(" ", "").lower()
+        if not fileversion.startswith("#vtkdatafileversion"):
+            print("File %s is not a legacy vtk file, got %s" % (filename, fileversion))
+            print(" but continuing anyway..")
+        header = f.readline()
+        format = f.readline().lower()
+        if format not in ["ascii", "binary"]:
+            raise ValueError("Expected ascii|binary but got %s" % (format))
+        if format == "binary":
+            f.binary = True
+
+        l = f.readline().lower()
+        if l[0:7] != "dataset":
+            raise ValueError("expected dataset but got %s" % (l[0:7]))
+        if l[-17:] != "unstructured_grid":
+            raise NotImplementedError("Only unstructured grid are implemented")
+
+        def read_values(n_values, data_type):
+            data_type = data_type.lower()
+            if f.binary:
+                return f.read_values(n_values, _vtk_binary_types[data_type])
+            elif data_type in ["float", "double"]:
+                return f.read_values(n_values, float)
             else:
-                print("Warning: Data ignored")
+                return f.read_values(n_values, int)
+
+        ndim = 3
+        crd = cells = offsets = celltype_all = None
+        n_data = 0  # number of items for point or cell data
+
+        # keywords may be in any order
+        while True:
+            l = f.readline().split()
+            if l == []:
+                break
+            keyword = l[0].lower()
+
+            if keyword == "points":
+                crd = read_values(3 * int(l[1]), l[2]).reshape(-1, 3)
+
+            elif keyword == "cells":
+                # vtk >= 5.1 files use offsets and connectivity arrays
+                position = f.file.tell()
+                l_next = f.readline().split()
+                if len(l_next) == 2 and l_next[0].lower() == "offsets":
+                    offsets = read_values(int(l[1]), l_next[1])
+                    l_next = f.readline().split()
+                    cells = read_values(int(l[2]), l_next[1])
+                else:
+                    f.file.seek(position)
+                    cells = read_values(int(l[2]), "int")
 
-        if l[0].lower() == "tensors":
-            print("Warning: tensor data not implemented. Data ignored")
-            if point_data == True:
-                del vtk[0:Nb_nodes]
-            elif cell_data == True:
-                del vtk[0:Nb_el]
+            elif keyword == "cell_types":
+                celltype_all = read_values(int(l[1]), "int")
 
-    # Traitement des éléments
-    count = 0
-    if len(list(np.unique(celltype_all))):
+            elif keyword in ["point_data", "cell_data"]:
+                n_data = int(l[1])
+
+            elif keyword == "scalars":
+                ncol = int(l[3]) if len(l) > 3 else 1
+                l_next = f.readline().split()  # lookup_table not implemented
+                read_values(n_data * ncol, l[2])  # data ignored
+
+            elif keyword in ["vectors", "normals"]:
+                read_values(n_data * 3, l[2])  # data ignored
+
+            elif keyword in ["tensors", "tensors6"]:
+                read_values(n_data * (9 if keyword == "tensors" else 6), l[2])
+
+            elif keyword == "texture_coordinates":
+                read_values(n_data * int(l[2]), l[3])
+
+            elif keyword == "color_scalars":
+                read_values(
+                    n_data * int(l[2]), "unsigned_char" if f.binary else "float"
+                )
+
+            elif keyword == "lookup_table":
+                read_values(4 * int(l[2]), "unsigned_char" if f.binary else "float")
+
+            elif keyword == "field":
+                for i in range(int(l[2])):
+                    l = f.readline().split()
+                    values = read_values(int(l[1]) * int(l[2]), l[3])
+                    if l[0] == "ndim" and len(values) == 1:
+                        ndim = int(values[0])
+
+            elif keyword == "metadata":
+                # metadata ignored: skip lines until an empty line
+                for line in f.file:
+                    if line.strip() == b"":
+                        break
+            else:
+                raise NameError("Unknown keyword {} in vtk file".format(l[0]))
+    finally:
+        f.close()
+
+    if ndim != 3:
+        crd = crd[:, :ndim]
+
+    # Element tables
+    if offsets is None:
+        # legacy cells array: n_nodes, node_1, ..., node_n for each cell
+        n_nodes = np.full(max(celltype_all.max(), *_vtk_cell_n_nodes) + 1, -1)
+        n_nodes[list(_vtk_cell_n_nodes)] = list(_vtk_cell_n_nodes.values())
+        n_nodes = n_nodes[celltype_all]
+        offsets = np.zeros(len(celltype_all) + 1, dtype=int)
+        offsets[1:] = np.cumsum(n_nodes + 1)
+        if (
+            np.any(n_nodes < 0)
+            or offsets[-1] != len(cells)
+            or np.any(cells[offsets[:-1]] != n_nodes)
+        ):
+            # cells with variable number of nodes
+            for i in range(len(celltype_all)):
+                offsets[i + 1] = offsets[i] + cells[offsets[i]] + 1
+        offsets = offsets[:-1] + 1  # first node of each cell
+    else:
+        offsets = offsets[:-1]
+
+    celltypes = np.unique(celltype_all)
+    if len(celltypes) > 1:
         multi_mesh = True
         list_mesh = []
     else:
         multi_mesh = False
 
-    for celltype in list(np.unique(celltype_all)):
-        list_el = np.where(celltype_all == celltype)[0]
-        elm = np.array([cells[el].split()[1:] for el in list_el], dtype=int)
+    count = 0
+    for celltype in celltypes:
         type_elm = {
-            "3": "lin2",
-            "5": "tri3",
-            "9": "quad4",
-            "10": "tet4",
-            "12": "hex8",
-            "21": "lin3",
-            "22": "tri6",
-            "23": "quad8",
-            "24": "tet10",
-            "25": "hex20",
-        }.get(str(celltype))
-        # not implemented '13':wed6 - '14':pyr5
-        # vtk format doesnt support quad9
+            3: "lin2",
+            5: "tri3",
+            9: "quad4",
+            10: "tet4",
+            12: "hex8",
+            13: "wed6",
+            21: "lin3",
+            22: "tri6",
+            23: "quad8",
+            24: "tet10",
+            25: "hex20",
+            26: "wed15",
+            28: "quad9",
+            32: "wed18",
+        }.get(celltype)
+        # not implemented 14:pyr5
 
         if type_elm == None:
             print(
                 "Warning : Elements type {} is not implemeted!".format(celltype)
             )  # element ignored
         else:
+            list_el = np.where(celltype_all == celltype)[0]
+            elm = cells[offsets[list_el, None] + np.arange(_vtk_cell_n_nodes[celltype])]
+            if type_elm in _vtk_node_order:  # convert node order from vtk to fedoo
+                elm = elm[:, _vtk_node_order[type_elm]]
+
             if multi_mesh:
                 mesh_name = name + str(count)
             else:
                 mesh_name = name
 
-            # print('Mesh imported: "' + mesh_name + '" with elements ' + type_elm)
             imported_mesh = Mesh(crd, elm, type_elm, name=mesh_name)
+            if multi_mesh:
+                list_mesh.append(imported_mesh)
             count += 1
 
     if multi_mesh:
-        list_mesh.append(imported_mesh)
+        imported_mesh = MultiMesh.from_mesh_list(list_mesh, name)
 
     return imported_mesh
-    # return NodeData, NodeDataName, ElmData, ElmDataName
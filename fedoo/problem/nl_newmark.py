@@ -168,7 +168,8 @@ class _NonLinearNewmarkBase:
         # Save results
         if self._dU is not 0:
             if save_results:
-                self.save_results(self.__compteurOutput)
+                # not flushed to keep writing the results in background
+                self._problem_output.save_results(self, self.__compteurOutput)
                 self.__compteurOutput += 1
 
             if callback is not None:
@@ -139,7 +139,8 @@ class _NonLinearBase:
 
             # Save results
             if save_results:
-                self.save_results(self.__compteurOutput)
+                # not flushed to keep writing the results in background
+                self._problem_output.save_results(self, self.__compteurOutput)
                 self.__compteurOutput += 1
 
             if callback is not None:
@@ -519,6 +520,7 @@ class _NonLinearBase:
                     )
 
         self.set_start(True, callback)
+        self.flush_results()
 
     # def GetElasticEnergy(self): #only work for classical FEM
     #     """
@@ -1,232 +1,380 @@
-from fedoo.core.mesh import Mesh
+import hashlib
+import os
+import re
+
+from fedoo.core.mesh import Mesh, MultiMesh
 
 # from fedoo.core.base import BoundaryCondition
 import numpy as np
 
+# lines beginning with "*" (keywords and comments)
+_keyword_line = re.compile(rb"^[ \t]*\*.*$", re.MULTILINE)
+_comma_to_space = bytes.maketrans(b",", b" ")
+
+# abaqus element type (without the suffix) -> fedoo element type
+_element_types = {
+    "cpe3": "tri3",
+    "cps3": "tri3",
+    "cax3": "tri3",
+    "s3": "tri3",
+    "cpe4": "quad4",
+    "cps4": "quad4",
+    "cax4": "quad4",
+    "s4": "quad4",
+    "cpe6": "tri6",
+    "cps6": "tri6",
+    "cax6": "tri6",
+    "cpe8": "quad8",
+    "cps8": "quad8",
+    "cax8": "quad8",
+    "s8": "quad8",
+    "c3d4": "tet4",
+    "c3d10": "tet10",
+    "c3d6": "wed6",
+    "c3d15": "wed15",
+    "c3d8": "hex8",
+    "c3d20": "hex20",
+    "t2d2": "lin2",
+    "t3d2": "lin2",
+    "b21": "lin2",
+    "b31": "lin2",
+    "t2d3": "lin3",
+    "t3d3": "lin3",
+    "b22": "lin3",
+    "b32": "lin3",
+}
+
+
+def _get_element_type(celltype):
+    # remove the suffix of the abaqus element type (for instance c3d8r -> c3d8)
+    match = re.match(r"[a-z]+\d+(d\d+)?", celltype)
+    if match is None:
+        return None
+    return _element_types.get(match.group())
+
+
+def _parse_keyword(line):
+    # return keyword and dict of parameters from a keyword line
+    # for instance '*nset, nset=set-1, generate' -> ('*nset', {'nset':'set-1', 'generate':''})
+    fields = [field.strip() for field in line.split(",")]
+    params = {}
+    for field in fields[1:]:
+        if field != "":
+            key, _, value = field.partition("=")
+            params[key.strip()] = value.strip()
+    return fields[0], params
+
+
+def _parse_values(blocks, dtype=float):
+    # bulk conversion of a list of data blocks (bytes) to a flat array
+    # (empty blocks are skipped because np.fromstring return a value for them)
+    return np.concatenate(
+        [
+            np.fromstring(block.translate(_comma_to_space), dtype=dtype, sep=" ")
+            for block in blocks
+            if not (block.isspace())
+        ]
+        + [np.empty(0, dtype=dtype)]
+    )
+
+
+def _first_line_size(blocks):
+    # number of values in the first non empty line of the data blocks
+    for block in blocks:
+        for line in block.splitlines():
+            line = line.strip()
+            if line != b"":
+                return len(line.rstrip(b",").split(b","))
+    return 0
+
+
+def _expand_generate(values):
+    # expand the (start, stop, increment) rows of a set defined with generate
+    start, stop, incr = values.T
+    counts = (stop - start) // incr + 1
+    shift = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    return np.repeat(start, counts) + np.repeat(incr, counts) * shift
+
 
 class ReadINP:
-    def __init__(self, *args):
+    """Read abaqus input files (inp) to build a fedoo mesh.
+
+    The keyword blocks are located in one pass over the file and the numeric
+    blocks (nodes, elements, sets) are converted in bulk with numpy.
+
+    Parameters
+    ----------
+    *args : str
+        Names of the inp files to read (the data of the files are merged).
+    cache : bool, default = False
+        If True, the parsed data are saved in a binary file
+        (filename + '.cache.npz') with a hash of the inp files. If this file
+        already exist with the same hash, the parsed data are directly loaded
+        from the cache file.
+    """
+
+    def __init__(self, *args, cache: bool = False):
         self.filename = args[0].strip()
-        keyword = []
-        inp = []
-        for filename in args:
-            filename = filename.strip()
-            # if meshname == None:
-            #     meshname = filename
-            #     if meshname[-4:].lower() == '.msh':
-            #         meshname = meshname[:-4]
-            # mesh = None
-
-            # print 'Reading file',`filename`
-            f = open(filename, "r")
-            txt = f.read()
-            f.close()
-            txt = txt.lower().replace(",", "\t")
-            txt = txt.split("\n")
-            txt = [line.strip() for line in txt]  # remove unwanted spaces
-            txt = [
-                line for line in txt if line != "" and line[:2] != "**"
-            ]  # remove empty line and comments
-            inp.extend(txt)
-
-        keyword = [
-            (i, line)
-            for i, line in enumerate(inp)
-            if (line[0] == "*" and line[1] != "*")
-        ]
-        keyword.append((len(inp), "*end"))
+        filenames = [filename.strip() for filename in args]
+
+        if cache:
+            file_hash = hashlib.sha1()
+            for filename in filenames:
+                with open(filename, "rb") as f:
+                    for chunk in iter(lambda: f.read(2**24), b""):
+                        file_hash.update(chunk)
+            file_hash = file_hash.hexdigest()
+
+            cache_file = self.filename + ".cache.npz"
+            if os.path.isfile(cache_file) and self._load_cache(cache_file, file_hash):
+                return
 
-        NodeData = []
-        ElmData = []
-        NodeDataName = []
-        ElmDataName = []
+        keywords = []  # list of (keyword line, list of data blocks)
+        for filename in filenames:
+            with open(filename, "rb") as f:
+                txt = f.read().lower()
+
+            lines = list(_keyword_line.finditer(txt))
+            for i, match in enumerate(lines):
+                end = lines[i + 1].start() if i + 1 < len(lines) else len(txt)
+                block = txt[match.end() : end]
+                line = match.group().strip().decode("latin-1")
+                if line[:2] == "**":  # comment: the data of the keyword continue
+                    if len(keywords) > 0:
+                        keywords[-1][1].append(block)
+                else:
+                    keywords.append((line, [block]))
 
         Element = []
         NodeSet = {}
         ElementSet = {}
-        NodeCoordinate = None
-        NodeNumber = None
+        NodeCoordinate = []
+        NodeNumber = []
 
-        Equation = {}  # dict where entry are nb terms on the multi point constraint equation
+        # dict where entry are nb terms on the multi point constraint equation
+        Equation = {}
 
-        for k in range(len(keyword)):
-            nline = keyword[k][0]
-            key = keyword[k][1]
+        for line, blocks in keywords:
+            key, params = _parse_keyword(line)
 
-            if key[0:5] == "*node":
-                # inp[nline+1:keyword[k+1][0]]
-                crd = np.array(
-                    [inp[line].split() for line in range(nline + 1, keyword[k + 1][0])],
-                    dtype=float,
-                )
-                NodeNumber = crd[:, 0]
-                NodeCoordinate = crd[:, 1:]
-                print(NodeCoordinate)
-
-                # numnode0 = int(msh[0].split()[0]) #0 or 1, in the mesh format the first node is 0
-                # #a conversion is required if the msh file begin with another number
-                # #The numbering of nodes is assumed to be continuous (p. ex 1,2,3,....)
-                # crd = np.array([msh[nd].split()[1:] for nd in range(Nb_nodes)], dtype = float)
-
-            elif key[0:8] == "*element":
-                celltype = key[8:].strip()[4:].replace("=", "").strip()
-
-                if celltype[:4] in ["cpe3", "cps3"]:  # , 'cpe3h'
-                    fedooElm = "tri3"
-                elif celltype[:4] in [
-                    "cpe4",
-                    "cps4",
-                ]:  #'cpe4h', 'cpe4i', 'cpe4ih', 'cpe4r', 'cpe4rh', 'cps4i', 'cps4r'
-                    fedooElm = "quad4"
-                elif celltype[:4] in [
-                    "cpe6",
-                    "cps6",
-                ]:  #'cpe6h', 'cpe6m', 'cpe6mh','cps6m'
-                    fedooElm = "tri6"
-                elif celltype[:4] in [
-                    "cpe8",
-                    "cps8",
-                ]:  #'cpe8h', 'cpe8r', 'cpe8rh', 'cps8r'
-                    fedooElm = "quad8"
-                elif celltype[:4] in ["c3d4"]:
-                    fedooElm = "tet4"
-                elif celltype[:4] in ["c3d8"]:
-                    fedooElm = "hex8"
+            if key == "*node":
+                n_col = _first_line_size(blocks)
+                if n_col == 0:
+                    continue
+                crd = _parse_values(blocks).reshape(-1, n_col)
+                NodeNumber.append(crd[:, 0].astype(int))
+                NodeCoordinate.append(crd[:, 1:])
+                if "nset" in params:
+                    NodeSet[params["nset"]] = NodeNumber[-1]
+
+            elif key == "*element":
+                fedooElm = _get_element_type(params.get("type", ""))
+                if fedooElm is None:
+                    n_col = _first_line_size(blocks)
                 else:
-                    fedooElm = None
+                    n_col = int(
+                        fedooElm[-2:] if fedooElm[-2].isdigit() else fedooElm[-1]
+                    )
+                    n_col += 1
+                if n_col == 0:
+                    continue
 
-                elm = np.array(
-                    [inp[line].split() for line in range(nline + 1, keyword[k + 1][0])],
-                    dtype=float,
-                )
+                elm = _parse_values(blocks, int).reshape(-1, n_col)
                 Element.append({})
                 Element[-1]["ElementNumber"] = elm[:, 0]
                 Element[-1]["ElementTable"] = elm[:, 1:]
                 Element[-1]["ElementType"] = fedooElm
+                if "elset" in params:
+                    idSet = params["elset"]
+                    ElementSet[idSet] = np.hstack(
+                        (ElementSet.get(idSet, []), elm[:, 0])
+                    )
+                    ElementSet[idSet] = ElementSet[idSet].astype(int)
 
-            elif key[0:5] == "*nset":
-                idSet = key[5:].strip()[4:].replace("=", "").strip()
-                if "unsorted" in idSet:
-                    idSet = idSet.replace("unsorted", "")  # option ignored
-                if "generate" in idSet:
-                    idSet = idSet.replace("generate", "")
-                    temp = [
-                        inp[line].split()
-                        for line in range(nline + 1, keyword[k + 1][0])
-                    ]
-                    nset = []
-                    for line in temp:
-                        if len(line) > 1:
-                            incr = int(line[2])
-                        else:
-                            incr = 1
-                        nset.extend(list(range(int(line[0]), int(line[1]) + 1, incr)))
-                    nset = np.array(nset)
+            elif key in ["*nset", "*elset"]:
+                idSet = params[key[1:]]  # option unsorted ignored
+                if key == "*nset":
+                    all_sets = NodeSet
                 else:
-                    nset = np.array(
-                        [
-                            nd
-                            for line in range(nline + 1, keyword[k + 1][0])
-                            for nd in inp[line].split()
-                        ],
-                        dtype=int,
-                    )
-                idSet = idSet.strip()
-                NodeSet[idSet] = nset
-
-            elif key[0:6] == "*elset":
-                idSet = key[6:].strip()[5:].replace("=", "").strip()
-                if "unsorted" in idSet:
-                    idSet = idSet.replace("unsorted", "")  # option ignored
-                if "generate" in idSet:
-                    idSet = idSet.replace("generate", "")
-                    temp = [
-                        inp[line].split()
-                        for line in range(nline + 1, keyword[k + 1][0])
-                    ]
-                    elset = []
-                    for line in temp:
-                        if len(line) > 1:
-                            incr = int(line[2])
-                        else:
-                            incr = 1
-                        elset.extend(list(range(int(line[0]), int(line[1]) + 1, incr)))
-                    elset = np.array(elset)
+                    all_sets = ElementSet
+
+                if "generate" in params:
+                    values = _parse_values(blocks, int)
+                    if _first_line_size(blocks) == 2:  # no increment
+                        values = np.c_[values.reshape(-1, 2), np.ones(len(values) // 2)]
+                    list_id = _expand_generate(values.reshape(-1, 3).astype(int))
                 else:
-                    elset = np.array(
-                        [
-                            el
-                            for line in range(nline + 1, keyword[k + 1][0])
-                            for el in inp[line].split()
-                        ],
-                        dtype=int,
-                    )
-                idSet = idSet.strip()
-                ElementSet[idSet] = elset
-
-            elif key[0:9] == "*equation":
-                # Equation.append(np.hstack([inp[line].split() for line in range(nline+1,keyword[k+1][0])]).astype(float))
-                nTerms = int(inp[nline + 1])
-                eq = np.hstack(
-                    [inp[line].split() for line in range(nline + 2, keyword[k + 1][0])]
-                ).astype(float)
-                listVar = tuple(eq[1::3].astype(int))
-                if not (listVar in Equation):
-                    Equation[listVar] = []
-                Equation[listVar].append(eq)
-
-                # if not(nTerms in Equation): Equation[nTerms] = []
-                # Equation[nTerms].append(np.hstack([inp[line].split() for line in range(nline+2,keyword[k+1][0])]).astype(float))
-
-        # self.Equation = Equation #for debug
+                    tokens = b" ".join(blocks).translate(_comma_to_space).split()
+                    try:
+                        list_id = np.array(tokens, dtype=int)
+                    except ValueError:
+                        # the set contains other sets
+                        list_id = np.hstack(
+                            [
+                                (
+                                    all_sets[token.decode()]
+                                    if token.decode() in all_sets
+                                    else [int(token)]
+                                )
+                                for token in tokens
+                            ]
+                        ).astype(int)
+
+                if idSet in all_sets:
+                    all_sets[idSet] = np.hstack((all_sets[idSet], list_id))
+                else:
+                    all_sets[idSet] = list_id
+
+            elif key == "*equation":
+                values = _parse_values(blocks)
+                # each equation: number of terms, then (node, dof, coefficient) for each term
+                i = 0
+                while i < len(values):
+                    nTerms = int(values[i])
+                    eq = values[i + 1 : i + 1 + 3 * nTerms]
+                    listVar = tuple(eq[1::3].astype(int))
+                    if not (listVar in Equation):
+                        Equation[listVar] = []
+                    Equation[listVar].append(eq)
+                    i += 1 + 3 * nTerms
+
         self.__Equation = Equation
         self.__Element = Element
         self.__NodeSet = NodeSet
         self.__ElementSet = ElementSet
-        self.__NodeCoordinate = NodeCoordinate
-        self.__NodeNumber = NodeNumber
+        if len(NodeNumber) > 0:
+            self.__NodeCoordinate = np.vstack(NodeCoordinate)
+            self.__NodeNumber = np.hstack(NodeNumber)
+        else:
+            self.__NodeCoordinate = self.__NodeNumber = None
+
+        if cache:
+            self._save_cache(cache_file, file_hash)
+
+    def _save_cache(self, cache_file, file_hash):
+        data = {
+            "hash": np.array(file_hash),
+            "node_number": self.__NodeNumber,
+            "node_coordinate": self.__NodeCoordinate,
+            "element_type": np.array(
+                [str(dict_elm["ElementType"]) for dict_elm in self.__Element]
+            ),
+            "node_set_names": np.array(list(self.__NodeSet), dtype=str),
+            "element_set_names": np.array(list(self.__ElementSet), dtype=str),
+        }
+        for i, dict_elm in enumerate(self.__Element):
+            data[f"element_number_{i}"] = dict_elm["ElementNumber"]
+            data[f"element_table_{i}"] = dict_elm["ElementTable"]
+        for i, nset in enumerate(self.__NodeSet.values()):
+            data[f"node_set_{i}"] = nset
+        for i, elset in enumerate(self.__ElementSet.values()):
+            data[f"element_set_{i}"] = elset
+        for i, eq in enumerate(self.__Equation.values()):
+            data[f"equation_{i}"] = np.array(eq)
+        np.savez(cache_file, **data)
 
-        ConvertNodeDict = dict(zip(NodeNumber, list(range(0, len(NodeNumber)))))
-        self.__ConvertNode = np.vectorize(ConvertNodeDict.get)  # function
+    def _load_cache(self, cache_file, file_hash):
+        # return False if the cache file doesn't match the inp files
+        with np.load(cache_file) as data:
+            if str(data["hash"]) != file_hash:
+                return False
+            self.__NodeNumber = data["node_number"]
+            self.__NodeCoordinate = data["node_coordinate"]
+            self.__Element = [
+                {
+                    "ElementNumber": data[f"element_number_{i}"],
+                    "ElementTable": data[f"element_table_{i}"],
+                    "ElementType": None if elm_type == "None" else str(elm_type),
+                }
+                for i, elm_type in enumerate(data["element_type"])
+            ]
+            self.__NodeSet = {
+                str(name): data[f"node_set_{i}"]
+                for i, name in enumerate(data["node_set_names"])
+            }
+            self.__ElementSet = {
+                str(name): data[f"element_set_{i}"]
+                for i, name in enumerate(data["element_set_names"])
+            }
+            self.__Equation = {}
+            i = 0
+            while f"equation_{i}" in data:
+                eq = data[f"equation_{i}"]
+                self.__Equation[tuple(eq[0, 1::3].astype(int))] = list(eq)
+                i += 1
+        return True
 
-        # self.ConvertNodeDict = ConvertNodeDict
-        # self.ConvertNode = self.__ConvertNode
-        # self.Element = Element
+    def __ConvertNode(self, node_numbers):
+        # convert abaqus node numbers to node indices (-1 if not found)
+        if not (hasattr(self, "_node_lookup")):
+            self._node_lookup = np.full(self.__NodeNumber.max() + 1, -1, dtype=int)
+            self._node_lookup[self.__NodeNumber] = np.arange(len(self.__NodeNumber))
+        node_numbers = np.asarray(node_numbers, dtype=int)
+        valid = node_numbers < len(self._node_lookup)
+        node_indices = np.full(node_numbers.shape, -1, dtype=int)
+        node_indices[valid] = self._node_lookup[node_numbers[valid]]
+        return node_indices
 
     def toMesh(self, meshname=None):
+        """Build the fedoo mesh.
+
+        The element blocks with the same element type are merged.
+        A MultiMesh is returned if several element types are defined.
+        """
         if meshname == None:
             meshname = self.filename
             if meshname[-4:].lower() == ".inp":
                 meshname = meshname[:-4]
-        for count, dict_elm in enumerate(self.__Element):
-            if len(self.__Element) < 2:
+
+        # group element blocks by element type
+        elm_types = []
+        for dict_elm in self.__Element:
+            if dict_elm["ElementType"] is None:
+                print(
+                    "Warning : Elements with {} nodes ignored (type not "
+                    "implemented)".format(dict_elm["ElementTable"].shape[1])
+                )
+            elif dict_elm["ElementType"] not in elm_types:
+                elm_types.append(dict_elm["ElementType"])
+
+        list_mesh = []
+        for count, elm_type in enumerate(elm_types):
+            if len(elm_types) < 2:
                 importedMeshName = meshname
             else:
                 importedMeshName = meshname + str(count)
 
-            elm = self.__ConvertNode(dict_elm["ElementTable"])
-            mesh = Mesh(
-                self.__NodeCoordinate,
-                elm,
-                dict_elm["ElementType"],
-                name=importedMeshName,
+            blocks = [
+                dict_elm
+                for dict_elm in self.__Element
+                if dict_elm["ElementType"] == elm_type
+            ]
+            ElementNumber = np.hstack(
+                [dict_elm["ElementNumber"] for dict_elm in blocks]
+            )
+            elm = self.__ConvertNode(
+                np.vstack([dict_elm["ElementTable"] for dict_elm in blocks])
             )
+            mesh = Mesh(self.__NodeCoordinate, elm, elm_type, name=importedMeshName)
+
             # add set of nodes
-            for SetOfId in self.__NodeSet:
-                NodeIndexes = self.__NodeSet[SetOfId]
-                mesh.add_node_set(self.__ConvertNode(NodeIndexes), SetOfId)
+            for SetOfId, NodeIndexes in self.__NodeSet.items():
+                NodeIndexes = self.__ConvertNode(NodeIndexes)
+                mesh.add_node_set(NodeIndexes[NodeIndexes >= 0], SetOfId)
 
-            ElementNumber = dict_elm["ElementNumber"]
-            ConvertElementDict = dict(
-                zip(ElementNumber, list(range(0, len(ElementNumber))))
-            )
-            ConvertElement = np.vectorize(ConvertElementDict.get)  # function
-            for SetOfId in self.__ElementSet:
-                ElementIndexes = self.__ElementSet[SetOfId]
-                Temp = ConvertElement(ElementIndexes)
-                mesh.add_element_set(Temp[Temp != None].astype(int), SetOfId)
+            # add set of elements (only the elements of the current mesh)
+            ElementLookup = np.full(ElementNumber.max() + 1, -1, dtype=int)
+            ElementLookup[ElementNumber] = np.arange(len(ElementNumber))
+            for SetOfId, ElementIndexes in self.__ElementSet.items():
+                ElementIndexes = ElementIndexes[ElementIndexes < len(ElementLookup)]
+                ElementIndexes = ElementLookup[ElementIndexes]
+                mesh.add_element_set(ElementIndexes[ElementIndexes >= 0], SetOfId)
+
+            list_mesh.append(mesh)
 
-        return mesh
+        if len(list_mesh) > 1:
+            return MultiMesh.from_mesh_list(list_mesh, meshname)
+        return list_mesh[0]
 
     # def applyBoundaryCondition(self, Problemname = "MainProblem"):
     #     for listVar in self.__Equation:
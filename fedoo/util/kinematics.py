@@ -0,0 +1,311 @@
+"""Batched kinematics for small and finite strain (pure numpy).
+
+The second order tensors are arrays of shape (3, 3, n) where n is the number
+of points (generally gauss points). The symmetric tensors are given with the
+voigt notation as arrays of shape (6, n) with the components ordered as
+(11, 22, 33, 12, 13, 23) and with the shear components multiplied by 2 for
+strain tensors. These are the conventions of simcoon, so these functions can
+be used when simcoon isn't installed.
+
+The functions that build a new tensor accept an optional ``out`` array
+(generally preallocated with order="F") in which the result is written.
+"""
+
+from __future__ import annotations
+
+import numpy as np
+
+_VOIGT_I = [0, 1, 2, 0, 0, 1]
+_VOIGT_J = [0, 1, 2, 1, 2, 2]
+
+
+def deformation_gradient(grad_disp, out: np.ndarray | None = None) -> np.ndarray:
+    """Return the deformation gradient F = I + grad(u).
+
+    Parameters
+    ----------
+    grad_disp : array_like of shape (3, 3, n)
+        Gradient of the displacement (may be a list of list of arrays).
+    out : np.ndarray, optional
+        Array of shape (3, 3, n) in which the result is written.
+
+    Returns
+    -------
+    np.ndarray of shape (3, 3, n)
+    """
+    grad_disp = np.asarray(grad_disp)
+    if out is None:
+        out = np.empty(grad_disp.shape, order="F")
+    out[...] = grad_disp
+    for i in range(3):
+        out[i, i] += 1
+    return out
+
+
+def small_strain(grad_disp, out: np.ndarray | None = None) -> np.ndarray:
+    """Return the linearized strain tensor with the voigt notation.
+
+    Parameters
+    ----------
+    grad_disp : array_like of shape (3, 3, n)
+        Gradient of the displacement (may be a list of list of arrays).
+    out : np.ndarray, optional
+        Array of shape (6, n) in which the result is written.
+
+    Returns
+    -------
+    np.ndarray of shape (6, n)
+    """
+    if out is None:
+        out = np.empty((6, len(grad_disp[0][0])), order="F")
+    for k in range(6):
+        i, j = _VOIGT_I[k], _VOIGT_J[k]
+        if i == j:
+            out[k] = grad_disp[i][i]
+        else:
+            np.add(grad_disp[i][j], grad_disp[j][i], out=out[k])
+    return out
+
+
+def green_lagrange_strain(F, out: np.ndarray | None = None) -> np.ndarray:
+    """Return the Green-Lagrange strain tensor E = (F^T.F - I)/2 (voigt).
+
+    Parameters
+    ----------
+    F : np.ndarray of shape (3, 3, n)
+        Deformation gradient.
+    out : np.ndarray, optional
+        Array of shape (6, n) in which the result is written.
+
+    Returns
+    -------
+    np.ndarray of shape (6, n)
+    """
+    C = np.einsum("ki...,kj...->ij...", F, F)
+    C[[0, 1, 2], [0, 1, 2]] -= 1
+    return _to_voigt(0.5 * C, 1.0, out)
+
+
+def log_strain(F, out: np.ndarray | None = None) -> np.ndarray:
+    """Return the eulerian logarithmic strain tensor ln(V) (voigt).
+
+    V is the left stretch tensor (F = V.R). The strain is computed from the
+    eigen decomposition of B = F.F^T, ie ln(V) = sum(ln(b_i)/2 * n_i x n_i).
+
+    Parameters
+    ----------
+    F : np.ndarray of shape (3, 3, n)
+        Deformation gradient.
+    out : np.ndarray, optional
+        Array of shape (6, n) in which the result is written.
+
+    Returns
+    -------
+    np.ndarray of shape (6, n)
+    """
+    F = _mat(F)
+    b, P = np.linalg.eigh(F @ F.transpose(0, 2, 1))
+    return _to_voigt(np.moveaxis(_tensor(P, 0.5 * np.log(b)), 0, -1), 1.0, out)
+
+
+def polar_decomposition(F) -> tuple[np.ndarray, np.ndarray]:
+    """Return the rotation R and the right stretch tensor U with F = R.U.
+
+    Parameters
+    ----------
+    F : np.ndarray of shape (3, 3, n)
+        Deformation gradient.
+
+    Returns
+    -------
+    R, U : np.ndarray of shape (3, 3, n)
+    """
+    F = _mat(F)
+    c, P = np.linalg.eigh(F.transpose(0, 2, 1) @ F)
+    u = np.sqrt(c)
+    R = F @ _tensor(P, 1 / u)
+    return _array(R), _array(_tensor(P, u))
+
+
+def objective_rate(
+    corate: str, F0, F1, dtime: float, return_de: bool = False
+) -> tuple[np.ndarray, ...]:
+    """Return the strain rate, rotation increment and spin of an objective rate.
+
+    The velocity gradient is evaluated in the middle of the increment:
+    L = (F1-F0).((F0+F1)/2)^-1 / dtime, and splitted in the rate of
+    deformation D (symmetric part) and the spin W (skew part). The spin
+    Omega of the objective rate is:
+
+    * 'jaumann': Omega = W,
+    * 'green_naghdi': Omega = dR/dt.R^T where R is the rotation of the polar
+      decomposition (evaluated in the middle of the increment),
+    * 'log': logarithmic spin (Xiao, Bruhns and Meyers, 1997) computed from
+      the eigen decomposition of B = F1.F1^T.
+
+    The rotation increment is DR = (I-Omega*dtime/2)^-1.(I+Omega*dtime/2),
+    so that the tensors of the beginning of the increment are rotated with
+    DR.T.DR^T (Hughes and Winget algorithm).
+
+    Parameters
+    ----------
+    corate : str in {'jaumann', 'green_naghdi', 'gn', 'log'}
+        Name of the objective rate.
+    F0, F1 : np.ndarray of shape (3, 3, n)
+        Deformation gradient at the beginning and at the end of the increment.
+    dtime : float
+        Time increment.
+    return_de : bool, default = False
+        If True, the strain increment (voigt notation) is also returned as
+        first value. For the 'log' rate, the strain increment is exactly
+        ln(V1) - DR.ln(V0).DR^T. For the other rates, it is D*dtime.
+
+    Returns
+    -------
+    tuple (de, D, DR, Omega) if return_de, else (D, DR, Omega).
+    de has a shape (6, n) and the other arrays a shape (3, 3, n).
+    """
+    corate = corate.lower()
+    F0 = _mat(F0)
+    F1 = _mat(F1)
+    eye = np.eye(3)
+
+    if dtime > 0:
+        L = np.linalg.solve(
+            (0.5 * (F0 + F1)).transpose(0, 2, 1), (F1 - F0).transpose(0, 2, 1)
+        )
+        L = L.transpose(0, 2, 1) / dtime
+    else:
+        L = np.zeros_like(F1)
+    D = 0.5 * (L + L.transpose(0, 2, 1))
+    W = 0.5 * (L - L.transpose(0, 2, 1))
+
+    if corate == "jaumann":
+        Omega = W
+    elif corate in ["green_naghdi", "gn"]:
+        R0 = _mat(polar_decomposition(_array(F0))[0])
+        R1 = _mat(polar_decomposition(_array(F1))[0])
+        if dtime > 0:
+            Omega = np.linalg.solve(
+                (0.5 * (R0 + R1)).transpose(0, 2, 1), (R1 - R0).transpose(0, 2, 1)
+            )
+            Omega = Omega.transpose(0, 2, 1) / dtime
+        else:
+            Omega = np.zeros_like(F1)
+    elif corate == "log":
+        b, P = np.linalg.eigh(F1 @ F1.transpose(0, 2, 1))
+        # components of D in the eigen basis of B
+        D_eig = P.transpose(0, 2, 1) @ D @ P
+        # x = ln(b_i/b_j) and factor = (1+b_i/b_j)/(1-b_i/b_j) + 2/x
+        log_b = np.log(b)
+        x = log_b[:, :, None] - log_b[:, None, :]
+        small = np.abs(x) < 1e-3
+        x_safe = np.where(small, 1.0, x)
+        factor = np.where(
+            small, -x / 6 + x**3 / 360, 2 / x_safe - 1 / np.tanh(0.5 * x_safe)
+        )
+        Omega = W + P @ (factor * D_eig) @ P.transpose(0, 2, 1)
+    else:
+        raise NameError(
+            "corate should be 'jaumann', 'green_naghdi' or 'log' ({} given)".format(
+                corate
+            )
+        )
+
+    DR = np.linalg.solve(eye - (0.5 * dtime) * Omega, eye + (0.5 * dtime) * Omega)
+    res = (_array(D), _array(DR), _array(Omega))
+
+    if return_de:
+        if corate == "log":
+            b0, P0 = np.linalg.eigh(F0 @ F0.transpose(0, 2, 1))
+            log_v0 = _tensor(DR @ P0, 0.5 * np.log(b0))
+            de = _tensor(P, 0.5 * log_b) - log_v0
+        else:
+            de = D * dtime
+        res = (_to_voigt(np.moveaxis(de, 0, -1), 1.0),) + res
+
+    return res
+
+
+def rotate_strain(strain, R, out: np.ndarray | None = None) -> np.ndarray:
+    """Return the rotated strain tensor R.strain.R^T (voigt).
+
+    Parameters
+    ----------
+    strain : np.ndarray of shape (6, n)
+        Strain tensor with the voigt notation (doubled shear components).
+    R : np.ndarray of shape (3, 3, n)
+        Rotation matrices.
+    out : np.ndarray, optional
+        Array of shape (6, n) in which the result is written.
+
+    Returns
+    -------
+    np.ndarray of shape (6, n)
+    """
+    return _rotate_voigt(strain, R, 0.5, out)
+
+
+def rotate_stress(stress, R, out: np.ndarray | None = None) -> np.ndarray:
+    """Return the rotated stress tensor R.stress.R^T (voigt).
+
+    Parameters
+    ----------
+    stress : np.ndarray of shape (6, n)
+        Stress tensor with the voigt notation.
+    R : np.ndarray of shape (3, 3, n)
+        Rotation matrices.
+    out : np.ndarray, optional
+        Array of shape (6, n) in which the result is written.
+
+    Returns
+    -------
+    np.ndarray of shape (6, n)
+    """
+    return _rotate_voigt(stress, R, 1.0, out)
+
+
+def _rotate_voigt(tensor, R, shear_factor, out):
+    # shear_factor = 0.5 for strains (doubled shear components), 1 for stress
+    tensor = np.asarray(tensor)
+    T = np.empty((3, 3) + tensor.shape[1:])
+    for k in range(6):
+        i, j = _VOIGT_I[k], _VOIGT_J[k]
+        if i == j:
+            T[i, i] = tensor[k]
+        else:
+            T[i, j] = T[j, i] = shear_factor * tensor[k]
+    T = np.einsum("ik...,kl...,jl...->ij...", R, T, R)
+    return _to_voigt(T, 0.5 / shear_factor, out)
+
+
+def _to_voigt(T, shear_factor, out=None):
+    # symmetric tensor (3, 3, n) to voigt (6, n). The shear components are
+    # (T_ij + T_ji) * shear_factor, ie shear_factor = 1 for strains and 0.5
+    # for stress.
+    if out is None:
+        out = np.empty((6,) + T.shape[2:], order="F")
+    for k in range(6):
+        i, j = _VOIGT_I[k], _VOIGT_J[k]
+        if i == j:
+            out[k] = T[i, i]
+        else:
+            np.add(T[i, j], T[j, i], out=out[k])
+            if shear_factor != 1:
+                out[k] *= shear_factor
+    return out
+
+
+def _mat(A):
+    # (3, 3, n) array -> (n, 3, 3) view for batched linear algebra
+    return np.moveaxis(np.asarray(A), -1, 0)
+
+
+def _array(A):
+    # (n, 3, 3) array -> (3, 3, n) array (fortran order)
+    return np.asfortranarray(np.moveaxis(A, 0, -1))
+
+
+def _tensor(P, values):
+    # (n, 3, 3) tensor with eigen vectors P (columns) and eigen values
+    return (P * values[:, None, :]) @ P.transpose(0, 2, 1)
@@ -1,326 +1,434 @@
-import numpy as np
-from fedoo.core.mesh import Mesh
-
+"""Writers for vtk (legacy and xml), and msh (gmsh) files.
 
-def write_vtk(dataset, filename="test.vtk", gp_data_to_node=True):
-    # if multi_mesh == True: raise NotImplementedError('multi_mesh not implemented')
+The files are written directly from the numpy arrays (binary format by
+default) and streamed to disk by chunks, without any dependency to pyvista.
+"""
 
-    datatype = "UNSTRUCTURED_GRID"
-    mesh = dataset.mesh
+import numpy as np
+from fedoo.core.mesh import Mesh, _vtk_cell_type, _vtk_node_order
+
+_CHUNK_SIZE = 2**20  # max number of rows formatted or converted at once
+
+_msh_element_type = {
+    "lin2": 1,
+    "tri3": 2,
+    "quad4": 3,
+    "tet4": 4,
+    "hex8": 5,
+    "wed6": 6,
+    "pyr5": 7,
+    "lin3": 8,
+    "tri6": 9,
+    "quad9": 10,
+    "tet10": 11,
+    "quad8": 16,
+    "hex20": 17,
+}
+
+
+def _get_elements(mesh, file_format):
+    # element table without the internal nodes and with the node order
+    # of the file format
     type_elm = mesh.elm_type
-
     try:  # get the number of nodes per element (in case  there is additional internal nodes)
-        nb_nd_elm = str(int(type_elm[-2:]))
+        nb_nd_elm = int(type_elm[-2:])
     except:
-        nb_nd_elm = str(int(type_elm[-1]))
-
-    #        nb_nd_elm = str(np.shape(elm)[1]) #Number of nodes per element
-
-    elm = mesh.elements[:, : int(nb_nd_elm)]
-
-    if type_elm == "hex20":
-        elm = elm[
-            :, [0, 1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11, 16, 17, 18, 19, 12, 13, 14, 15]
-        ]  # convert node order from fedoo mesh to vtk
-
-    cell_type = {
-        "lin2": "3",
-        "tri3": "5",
-        "quad4": "9",
-        "tet4": "10",
-        "hex8": "12",
-        "wed6": "13",
-        "pyr5": "14",
-        "lin3": "21",
-        "tri6": "22",
-        "quad8": "23",
-        "tet10": "24",
-        "hex20": "25",
-    }.get(type_elm)
-    if cell_type == None:
-        raise NotImplementedError("{} is not available in vtk".format(type_elm))
-
-    ret = ["# vtk DataFile Version 3.0", "Some data", "ASCII"]
-
-    # POINT
-    ret += ["DATASET {}".format(datatype), "POINTS {} float".format(mesh.n_nodes)]
-
-    if mesh.ndim == 2:
-        ret += [
-            " ".join([str(xx) for xx in line] + ["0.0"]) for line in mesh.nodes
-        ]  # add a third dimension
-    elif mesh.ndim == 3:
-        ret += [" ".join([str(xx) for xx in line]) for line in mesh.nodes]
+        nb_nd_elm = int(type_elm[-1])
+
+    elm = mesh.elements[:, :nb_nd_elm]
+
+    if file_format == "vtk":
+        if type_elm not in _vtk_cell_type:
+            raise NotImplementedError("{} is not available in vtk".format(type_elm))
+        if type_elm in _vtk_node_order:  # convert node order from fedoo to vtk
+            elm = elm[:, _vtk_node_order[type_elm]]
+    else:  # msh
+        if type_elm not in _msh_element_type:
+            raise NotImplementedError("{} is not available in msh".format(type_elm))
+        if type_elm == "tet10":
+            elm = elm[:, [0, 1, 2, 3, 4, 5, 6, 7, 9, 8]]
+
+    return elm
+
+
+def _get_nodes_3d(mesh):
+    if mesh.ndim == 3:
+        return mesh.nodes
+    elif mesh.ndim == 2:
+        return np.c_[mesh.nodes, np.zeros(mesh.n_nodes)]  # add a third dimension
     else:
         raise NameError(
             "Error in the dimension of nodes coordinates - only 2D or 3D available"
         )
 
-    # CELLS
-    ret += [
-        "CELLS {} {}".format(
-            len(elm), (np.array(np.shape(elm)) + np.array([0, 1])).prod()
-        )
-    ]
-    ret += [" ".join([nb_nd_elm] + [str(nd) for nd in line]) for line in elm]
-    ret += ["CELL_TYPES {}".format(len(elm))]
-    ret += [cell_type for i in range(mesh.n_elements)]
 
-    # POINT_DATA
-    # Convert gausspoint data to node data if gp_data_to_node == True
+def _iter_node_data(dataset, gp_data_to_node):
+    # Generator of the node data (name, array with shape (n_nodes, n_comp)).
+    # The gauss point data are converted only when they are requested.
+    for data_name, data in dataset.node_data.items():
+        yield data_name, _as_rows(data)
     if gp_data_to_node:
-        node_data = {}
         for field in dataset.gausspoint_data:
-            node_data[field] = dataset.get_data(field, data_type="Node")
-        node_data.update(dataset.node_data)
+            if field not in dataset.node_data:
+                yield field, _as_rows(dataset.get_data(field, data_type="Node"))
+
+
+def _as_rows(data):
+    # convert fedoo data (n_comp, n) or (n) or (3, 3, n) to (n, n_comp)
+    data = np.asarray(data)
+    if data.ndim == 1:  # Scalar data
+        return data.reshape(-1, 1)
+    elif data.ndim == 2:  # vector data
+        return data.T
+    elif data.ndim == 3:  # tensor data
+        return data.reshape(-1, data.shape[-1]).T
     else:
-        node_data = dataset.node_data
-    if len(node_data) > 0:
-        ret += ["POINT_DATA {}".format(mesh.n_nodes)]
-        for data_name, data in node_data.items():
-            # only scalar for now Vector and Tensor data may be developped
-            if len(np.shape(data)) == 1:  # Scalar data
-                ret += ["SCALARS {} float 1".format(data_name)]
-                ret += ["LOOKUP_TABLE default"]  # to be developped if needed
-                ret += list(data.astype(str))
-            elif len(np.shape(data)) == 2:  # vector data
-                data = data.T
-                if np.shape(data)[1] == 3:  # vecteur
-                    ret += ["VECTORS {} float".format(data_name)]
-                    ret += [" ".join(val.astype(str)) for val in data]
-                #                        ret += [' '.join('%.2f' % i for i in val) for val in data]
-                else:
-                    ret += ["SCALARS {} float {}".format(data_name, np.shape(data)[1])]
-                    ret += ["LOOKUP_TABLE default"]  # to be developped if needed
-                    ret += [" ".join(val.astype(str)) for val in data]
-            elif len(np.shape(data)) == 3:  # tensor data
-                data = data.transpose(2, 0, 1)
-                ret += ["TENSORS {} float".format(data_name)]
-                ret += [
-                    "\n".join([" ".join(line.astype(str)) for line in val]) + "\n "
-                    for val in data
-                ]
-            else:
-                raise NameError("Data size mismatch")
-
-    # CELL_DATA
-    if len(dataset.element_data) > 0:
-        ret += ["CELL_DATA {}".format(mesh.n_elements)]
-        for data_name, data in dataset.element_data.items():
-            if len(np.shape(data)) == 1:  # Scalar data
-                ret += ["SCALARS {} float 1".format(data_name)]
-                ret += ["LOOKUP_TABLE default"]  # to be developped if needed
-                ret += list(data.astype(str))
-            elif len(np.shape(data)) == 2:
-                data = data.T
-                if np.shape(data)[1] == 3:  # vector data
-                    ret += ["VECTORS {} float".format(data_name)]
-                    ret += [" ".join(val.astype(str)) for val in data]
-                else:
-                    ret += ["SCALARS {} float {}".format(data_name, np.shape(data)[1])]
-                    ret += ["LOOKUP_TABLE default"]  # to be developped if needed
-                    ret += [" ".join(val.astype(str)) for val in data]
-            elif len(np.shape(data)) == 3:  # tensor data
-                data = data.transpose(2, 0, 1)
-                ret += ["TENSORS {} float".format(data_name)]
-                ret += [
-                    "\n".join([" ".join(line.astype(str)) for line in val]) + "\n "
-                    for val in data
-                ]
-            else:
-                raise NameError("Data size mismatch")
-
-    f = open(filename, "w")
-    f.write("\n".join(ret))
-    f.close()
-
-
-def write_msh(dataset, filename="test.msh", gp_data_to_node=True):
-    # if self.multi_mesh == True: raise NotImplementedError('multi_mesh not implemented')
+        raise NameError("Data size mismatch")
+
+
+def _n_comp(data):
+    # number of components of fedoo data without conversion
+    shape = np.shape(data)
+    if len(shape) == 1:
+        return 1
+    elif len(shape) == 2:
+        return shape[0]
+    elif len(shape) == 3:
+        return shape[0] * shape[1]
+    else:
+        raise NameError("Data size mismatch")
+
+
+def _get_field_data(dataset):
+    # dataset level data (scalar data and mesh dimension if not 3d)
+    field_data = {k: np.atleast_1d(v) for k, v in dataset.scalar_data.items()}
+    if dataset.mesh.ndim != 3:
+        field_data["ndim"] = np.array([dataset.mesh.ndim])
+    return field_data
+
+
+def _write_array(file, data, dtype, binary=True, fmt="%.17g"):
+    """Write a 2d array in an opened binary file by chunks of rows.
+
+    If binary is True, the raw data are written with the given dtype.
+    Else, each row is written as a line of text.
+    """
+    data = np.asarray(data)
+    if data.ndim == 1:
+        data = data.reshape(-1, 1)
+    for i in range(0, len(data), _CHUNK_SIZE):
+        chunk = data[i : i + _CHUNK_SIZE]
+        if binary:
+            file.write(np.ascontiguousarray(chunk, dtype=dtype).tobytes())
+        else:
+            line_fmt = " ".join([fmt] * chunk.shape[1]) + "\n"
+            file.write(
+                ((line_fmt * len(chunk)) % tuple(chunk.astype(dtype).ravel())).encode()
+            )
 
+
+def write_vtk(dataset, filename="test.vtk", gp_data_to_node=True, binary=True):
+    """Write a legacy vtk file with the mesh and the node and element data.
+
+    Parameters
+    ----------
+    dataset : DataSet
+        DataSet containing the mesh and data to write.
+    filename : str
+        Name of the file including the path.
+    gp_data_to_node : bool, default = True
+        If True, the Gauss Point data are interpolated as Node data.
+        If False, the Gauss Point data are ignored.
+    binary : bool, default = True
+        If True, write as binary. Otherwise, write as ASCII.
+    """
     mesh = dataset.mesh
-    type_elm = mesh.elm_type
+    elm = _get_elements(mesh, "vtk")
+    cell_type = _vtk_cell_type[mesh.elm_type][0]
 
-    try:  # get the number of nodes per element (in case  there is additional internal nodes)
-        nb_nd_elm = int(type_elm[-2:])
-    except:
-        nb_nd_elm = int(type_elm[-1])
+    if binary:
+        # legacy vtk binary files are big endian
+        float_type, int_type, fmt = ">f8", ">i4", "%.17g"
+    else:
+        float_type, int_type, fmt = "f8", "i8", "%.17g"
 
-    #        nb_nd_elm = str(np.shape(elm)[1]) #Number of nodes per element
+    def write_data(f, data_name, data):
+        n_comp = data.shape[1]
+        if n_comp == 1:
+            f.write(
+                "SCALARS {} double 1\nLOOKUP_TABLE default\n".format(data_name).encode()
+            )
+        elif n_comp == 3:
+            f.write("VECTORS {} double\n".format(data_name).encode())
+        elif n_comp == 9:
+            f.write("TENSORS {} double\n".format(data_name).encode())
+        else:
+            f.write(
+                "FIELD FieldData 1\n{} {} {} double\n".format(
+                    data_name, n_comp, len(data)
+                ).encode()
+            )
+        _write_array(f, data, float_type, binary, fmt)
+        f.write(b"\n")
+
+    with open(filename, "wb") as f:
+        f.write(
+            "# vtk DataFile Version 3.0\nSome data\n{}\n".format(
+                "BINARY" if binary else "ASCII"
+            ).encode()
+        )
 
-    elm = mesh.elements[:, :nb_nd_elm]
+        f.write(b"DATASET UNSTRUCTURED_GRID\n")
 
-    if type_elm == "tet10":
-        elm = elm[:, [1, 2, 3, 4, 5, 6, 7, 9, 8]]
-
-    type_el = {
-        "lin2": "1",
-        "tri3": "2",
-        "quad4": "3",
-        "tet4": "4",
-        "hex8": "5",
-        "wed6": "6",
-        "pyr5": "7",
-        "lin3": "8",
-        "tri6": "9",
-        "quad9": "10",
-        "tet10": "11",
-        "quad8": "16",
-        "hex20": "17",
-    }.get(type_elm)
-
-    GeometricalEntity = []
-    #        if self.mesh.geometricalEntity != []:
-    #            GeometricalEntity = np.zeros(self.mesh.mesh.n_elements,dtype=int)
-    #            for ii,listelm in enumerate(self.mesh.geometricalEntity):
-    #                GeometricalEntity[listelm] = ii
-
-    if type_el == None:
-        raise NotImplementedError("{} is not available in msh".format(type_elm))
-
-    ret = ["$MeshFormat", "2.2 0 8", "$EndMeshFormat", "$Nodes", str(mesh.n_nodes)]
-    if np.shape(mesh.nodes)[1] == 2:
-        ret += [
-            " ".join([str(nd)] + [str(xx) for xx in mesh.nodes[nd]] + ["0.0"])
-            for nd in range(mesh.n_nodes)
-        ]
-    elif np.shape(mesh.nodes)[1] == 3:
-        ret += [
-            " ".join([str(nd)] + [str(xx) for xx in mesh.nodes[nd]])
-            for nd in range(mesh.n_nodes)
-        ]
-    else:
-        raise NameError(
-            "Error in the dimension of nodes coordinates - only 2D or 3D available"
+        # FIELD data (scalar data)
+        field_data = _get_field_data(dataset)
+        if len(field_data) > 0:
+            f.write("FIELD FieldData {}\n".format(len(field_data)).encode())
+            for data_name, data in field_data.items():
+                if np.issubdtype(data.dtype, np.integer):
+                    vtk_type, dtype = "int", int_type
+                else:
+                    vtk_type, dtype = "double", float_type
+                f.write("{} 1 {} {}\n".format(data_name, len(data), vtk_type).encode())
+                _write_array(f, data.reshape(1, -1), dtype, binary, fmt)
+                f.write(b"\n")
+
+        # POINTS
+        f.write("POINTS {} double\n".format(mesh.n_nodes).encode())
+        _write_array(f, _get_nodes_3d(mesh), float_type, binary, fmt)
+
+        # CELLS
+        f.write(
+            "\nCELLS {} {}\n".format(len(elm), len(elm) * (elm.shape[1] + 1)).encode()
         )
-
-    ret += ["$EndNodes", "$Elements", str(mesh.n_elements)]
-    if GeometricalEntity == []:
-        ret += [
-            " ".join([str(el), type_el, "2", "1", "0"] + [str(nd) for nd in elm[el]])
-            for el in range(mesh.n_elements)
-        ]
-    else:
-        ret += [
-            " ".join(
-                [str(el), type_el, "2", "1", str(GeometricalEntity[el])]
-                + [str(nd) for nd in elm[el]]
+        _write_array(
+            f,
+            np.column_stack((np.full(len(elm), elm.shape[1]), elm)),
+            int_type,
+            binary,
+            "%d",
+        )
+        f.write("\nCELL_TYPES {}\n".format(len(elm)).encode())
+        _write_array(f, np.full(len(elm), cell_type), int_type, binary, "%d")
+        f.write(b"\n")
+
+        # POINT_DATA
+        point_data_header = "POINT_DATA {}\n".format(mesh.n_nodes).encode()
+        for data_name, data in _iter_node_data(dataset, gp_data_to_node):
+            if point_data_header is not None:
+                f.write(point_data_header)
+                point_data_header = None
+            write_data(f, data_name, data)
+
+        # CELL_DATA
+        if len(dataset.element_data) > 0:
+            f.write("CELL_DATA {}\n".format(mesh.n_elements).encode())
+            for data_name, data in dataset.element_data.items():
+                write_data(f, data_name, _as_rows(data))
+
+
+def write_vtu(dataset, filename="test.vtu", gp_data_to_node=True):
+    """Write a xml vtk file (vtu) using raw appended binary data.
+
+    Parameters
+    ----------
+    dataset : DataSet
+        DataSet containing the mesh and data to write.
+    filename : str
+        Name of the file including the path.
+    gp_data_to_node : bool, default = True
+        If True, the Gauss Point data are interpolated as Node data.
+        If False, the Gauss Point data are ignored.
+    """
+    mesh = dataset.mesh
+    elm = _get_elements(mesh, "vtk")
+    cell_type = _vtk_cell_type[mesh.elm_type][0]
+    n_nodes = mesh.n_nodes
+    n_elm = len(elm)
+
+    # list of appended arrays: (name, n_comp, vtk type, nbytes, get_data).
+    # get_data is only called when the array is written to allow the lazy
+    # conversion of the gauss point data
+    point_arrays = [
+        (k, _n_comp(v), "Float64", 8 * n_nodes * _n_comp(v), lambda v=v: _as_rows(v))
+        for k, v in dataset.node_data.items()
+    ]
+    if gp_data_to_node:
+        point_arrays += [
+            (
+                k,
+                _n_comp(v),
+                "Float64",
+                8 * n_nodes * _n_comp(v),
+                lambda k=k: _as_rows(dataset.get_data(k, data_type="Node")),
             )
-            for el in range(mesh.n_elements)
+            for k, v in dataset.gausspoint_data.items()
+            if k not in dataset.node_data
         ]
-    ret += ["$EndElements"]
+    cell_arrays = [
+        (k, _n_comp(v), "Float64", 8 * n_elm * _n_comp(v), lambda v=v: _as_rows(v))
+        for k, v in dataset.element_data.items()
+    ]
+    field_arrays = [
+        (k, 1, "Float64", 8 * len(v), lambda v=v: v.reshape(-1, 1))
+        for k, v in _get_field_data(dataset).items()
+    ]
+    points = [
+        (None, 3, "Float64", 8 * 3 * n_nodes, lambda: _get_nodes_3d(mesh)),
+    ]
+    cells = [
+        ("connectivity", 1, "Int64", 8 * elm.size, lambda: elm.reshape(-1, 1)),
+        (
+            "offsets",
+            1,
+            "Int64",
+            8 * n_elm,
+            lambda: np.arange(1, n_elm + 1) * elm.shape[1],
+        ),
+        ("types", 1, "UInt8", n_elm, lambda: np.full(n_elm, cell_type)),
+    ]
 
-    # Convert gausspoint data to node data if gp_data_to_node == True
-    if gp_data_to_node:
-        node_data = {}
-        for field in dataset.gausspoint_data:
-            node_data[field] = dataset.get_data(field, data_type="Node")
-        node_data.update(dataset.node_data)
-    else:
-        node_data = dataset.node_data
-
-    for data_name, data in node_data.items():
-        ret += ["$NodeData", "1", data_name]  # NumerOfStringTag, Name of Data
-        if len(np.shape(data)) == 1:  # Scalar data
-            ret += [
-                "1",
-                "0.0",
-                "3",
-                "0",
-                "1",
-                str(mesh.n_nodes),
-            ]  # NumberOfRealTag, time value, NumberOfIntegerTag, time step, number of scalar component (1, 3 or 9), Number of Nodes
-            ret += [" ".join([str(nd), str(data[nd])]) for nd in range(mesh.n_nodes)]
-        elif len(np.shape(data)) == 2:  # Vector data
-            data = data.T
-            ret += [
-                "1",
-                "0.0",
-                "3",
-                "0",
-                str(np.shape(data)[1]),
-                str(mesh.n_nodes),
-            ]  # NumberOfRealTag, time value, NumberOfIntegerTag, time step, number of scalar component (1, 3 or 9), Number of Nodes
-            ret += [
-                " ".join([str(nd)] + list(data[nd].astype(str)))
-                for nd in range(mesh.n_nodes)
-            ]
-        elif len(np.shape(data)) == 3:  # Tensor data
-            data = data.transpose(2, 0, 1)
-            ret += [
-                "1",
-                "0.0",
-                "3",
-                "0",
-                "9",
-                str(mesh.n_nodes),
-            ]  # NumberOfRealTag, time value, NumberOfIntegerTag, time step, number of scalar component (1, 3 or 9), Number of Nodes
-            ret += [
-                " ".join(
-                    [str(nd)] + list(data[nd][0].astype(str)),
-                    +list(data[nd][1].astype(str)),
-                    +list(data[nd][2].astype(str)),
-                )
-                for nd in range(mesh.n_nodes)
-            ]
+    dtypes = {"Float64": "<f8", "Int64": "<i8", "UInt8": "u1"}
+    offset = [0]
+
+    def data_array_tag(name, n_comp, vtk_type, nbytes, get_data):
+        tag = '<DataArray type="{}"'.format(vtk_type)
+        if name is not None:
+            tag += ' Name="{}"'.format(name)
+        tag += ' NumberOfComponents="{}" format="appended" offset="{}"/>\n'.format(
+            n_comp, offset[0]
+        )
+        offset[0] += 8 + nbytes  # UInt64 header with the number of bytes
+        return tag
+
+    header = [
+        '<?xml version="1.0"?>\n',
+        '<VTKFile type="UnstructuredGrid" version="1.0" '
+        'byte_order="LittleEndian" header_type="UInt64">\n',
+        "<UnstructuredGrid>\n",
+        "<FieldData>\n",
+    ]
+    header += [data_array_tag(*array) for array in field_arrays]
+    header += [
+        "</FieldData>\n",
+        '<Piece NumberOfPoints="{}" NumberOfCells="{}">\n'.format(n_nodes, n_elm),
+        "<PointData>\n",
+    ]
+    header += [data_array_tag(*array) for array in point_arrays]
+    header += ["</PointData>\n", "<CellData>\n"]
+    header += [data_array_tag(*array) for array in cell_arrays]
+    header += ["</CellData>\n", "<Points>\n"]
+    header += [data_array_tag(*array) for array in points]
+    header += ["</Points>\n", "<Cells>\n"]
+    header += [data_array_tag(*array) for array in cells]
+    header += [
+        "</Cells>\n",
+        "</Piece>\n",
+        "</UnstructuredGrid>\n",
+        '<AppendedData encoding="raw">\n_',
+    ]
+
+    with open(filename, "wb") as f:
+        f.write("".join(header).encode())
+        for name, n_comp, vtk_type, nbytes, get_data in (
+            field_arrays + point_arrays + cell_arrays + points + cells
+        ):
+            f.write(np.uint64(nbytes).tobytes())
+            _write_array(f, get_data(), dtypes[vtk_type])
+        f.write(b"\n</AppendedData>\n</VTKFile>\n")
+
+
+def write_msh(dataset, filename="test.msh", gp_data_to_node=True, binary=True):
+    """Write a msh file (gmsh format 4.1) with the mesh and the node and
+    element data.
+
+    Parameters
+    ----------
+    dataset : DataSet
+        DataSet containing the mesh and data to write.
+    filename : str
+        Name of the file including the path.
+    gp_data_to_node : bool, default = True
+        If True, the Gauss Point data are interpolated as Node data.
+        If False, the Gauss Point data are ignored.
+    binary : bool, default = True
+        If True, write as binary. Otherwise, write as ASCII.
+    """
+    mesh = dataset.mesh
+    elm = _get_elements(mesh, "msh")
+    type_el = _msh_element_type[mesh.elm_type]
+    elm_dim = {"lin": 1, "tri": 2, "qua": 2}.get(mesh.elm_type[:3], 3)
+    n_nodes = mesh.n_nodes
+    n_elm = len(elm)
+
+    # node and element tags begin at 1 in msh files
+    node_tags = np.arange(1, n_nodes + 1)
+    elm_tags = np.arange(1, n_elm + 1)
+
+    def write_size_t(f, *values):
+        if binary:
+            f.write(np.array(values, dtype="<u8").tobytes())
+        else:
+            f.write((" ".join(str(v) for v in values) + "\n").encode())
+
+    def write_block_header(f, *values):
+        # entity dim, entity tag, parametric or element type (int) and
+        # number of items in block (size_t)
+        if binary:
+            f.write(np.array(values[:3], dtype="<i4").tobytes())
+            f.write(np.array(values[3:], dtype="<u8").tobytes())
         else:
-            raise NameError("Data size mismatch")
-        ret += ["$EndNodeData"]
-
-    for data_name, data in dataset.element_data.items():
-        ret += ["$ElementData", "1", data_name]  # NumerOfStringTag, Name of Data
-        if len(np.shape(data)) == 1:  # Scalar data
-            ret += [
-                "1",
-                "0.0",
-                "3",
-                "0",
-                "1",
-                str(mesh.n_elements),
-            ]  # NumberOfRealTag, time value, NumberOfIntegerTag, time step, number of scalar component (1, 3 or 9), Number of Nodes
-            ret += [" ".join([str(el), str(data[el])]) for el in range(mesh.n_elements)]
-        elif len(np.shape(data)) == 2:  # Vector data
-            data = data.T
-            ret += [
-                "1",
-                "0.0",
-                "3",
-                "0",
-                str(np.shape(data)[1]),
-                str(mesh.n_elements),
-            ]  # NumberOfRealTag, time value, NumberOfIntegerTag, time step, number of scalar component (1, 3 or 9), Number of Nodes
-            ret += [
-                " ".join([str(el)] + list(data[el].astype(str)))
-                for el in range(mesh.n_elements)
-            ]
-        elif len(np.shape(data)) == 3:  # Tensor data
-            data = data.transpose(2, 0, 1)
-            ret += [
-                "1",
-                "0.0",
-                "3",
-                "0",
-                "9",
-                str(mesh.n_elements),
-            ]  # NumberOfRealTag, time value, NumberOfIntegerTag, time step, number of scalar component (1, 3 or 9), Number of Nodes
-            ret += [
-                " ".join(
-                    [str(el)] + list(data[el][0].astype(str)),
-                    +list(data[el][1].astype(str)),
-                    +list(data[el][2].astype(str)),
-                )
-                for el in range(mesh.n_elements)
-            ]
+            f.write((" ".join(str(v) for v in values) + "\n").encode())
 
+    def write_data(f, section, data_name, data, tags):
+        f.write(
+            '${}\n1\n"{}"\n1\n0.0\n3\n0\n{}\n{}\n'.format(
+                section, data_name, data.shape[1], len(data)
+            ).encode()
+        )
+        if binary:
+            # int tag followed by the double values for each item
+            rows = np.empty(
+                len(data), dtype=[("tag", "<i4"), ("val", "<f8", (data.shape[1],))]
+            )
+            rows["tag"] = tags
+            rows["val"] = data
+            _write_array(f, rows, rows.dtype)
+            f.write(b"\n")
         else:
-            raise NameError("Data size mismatch")
-        ret += ["$EndElementData"]
+            _write_array(f, np.column_stack((tags, data)), float, False, "%.17g")
+        f.write("$End{}\n".format(section).encode())
+
+    with open(filename, "wb") as f:
+        if binary:
+            f.write(b"$MeshFormat\n4.1 1 8\n")
+            f.write(np.array(1, dtype="<i4").tobytes())  # to detect endianness
+            f.write(b"\n$EndMeshFormat\n")
+        else:
+            f.write(b"$MeshFormat\n4.1 0 8\n$EndMeshFormat\n")
+
+        # Nodes in a single entity block
+        f.write(b"$Nodes\n")
+        write_size_t(f, 1, n_nodes, 1, n_nodes)
+        write_block_header(f, elm_dim, 1, 0, n_nodes)
+        _write_array(f, node_tags, "<u8", binary, "%d")
+        _write_array(f, _get_nodes_3d(mesh), "<f8", binary, "%.17g")
+        f.write(b"\n$EndNodes\n" if binary else b"$EndNodes\n")
+
+        # Elements in a single entity block
+        f.write(b"$Elements\n")
+        write_size_t(f, 1, n_elm, 1, n_elm)
+        write_block_header(f, elm_dim, 1, type_el, n_elm)
+        _write_array(f, np.column_stack((elm_tags, elm + 1)), "<u8", binary, "%d")
+        f.write(b"\n$EndElements\n" if binary else b"$EndElements\n")
+
+        for data_name, data in _iter_node_data(dataset, gp_data_to_node):
+            write_data(f, "NodeData", data_name, data, node_tags)
 
-    # Si besoin on peu faire pareil $ElementNodeData
+        for data_name, data in dataset.element_data.items():
+            write_data(f, "ElementData", data_name, _as_rows(data), elm_tags)
 
-    f = open(filename, "w")
-    f.write("\n".join(ret))
-    f.close()
+    # Si besoin on peu faire pareil $ElementNodeData
 
 
 # class ExportData:
@@ -3,6 +3,7 @@
 from fedoo.core.weakform import WeakFormBase
 from fedoo.core.base import ConstitutiveLaw
 from fedoo.util.voigt_tensors import StressTensorList, StrainTensorList
+from fedoo.util import kinematics
 
 try:
     from simcoon import simmit as sim
@@ -22,10 +23,10 @@ class StressEquilibrium(WeakFormBase):
         assumption (plane strain or plane stress).
       * Include initial stress for non linear problems or if defined in
         the associated assembly.
-      * This weak form accepts geometrical non linearities if simcoon is
-        installed. (nlgeom should be in {True, 'UL', 'TL'}. In this case
-        the initial displacement is also
-        considered.
+      * This weak form accepts geometrical non linearities (nlgeom should
+        be in {True, 'UL', 'TL'}. In this case the initial displacement is
+        also considered. The total lagrangian method and the 'log_r'
+        corotational rates require simcoon to be installed.
 
     Parameters
     ----------
@@ -83,25 +84,7 @@ class StressEquilibrium(WeakFormBase):
 
     def get_weak_equation(self, assembly, pb):
         """Get the weak equation related to the current problem state."""
-        if assembly._nlgeom == "TL":  # add initial displacement effect
-            eps = self.space.op_strain(assembly.sv["DispGradient"])
-            initial_stress = assembly.sv["PK2"]
-        else:
-            eps = self.space.op_strain()
-            initial_stress = assembly.sv[
-                "Stress"
-            ]  # Stress = Cauchy for updated lagrangian method
-
-            if self.space._dimension == "2Daxi":
-                rr = assembly.sv["_R_gausspoints"]
-
-                # nlgeom = False
-                eps[2] = self.space.variable("DispX") * np.divide(
-                    1, rr, out=np.zeros_like(rr), where=rr != 0
-                )  # put zero if X==0 (division by 0)
-                # eps[2] = self.space.variable('DispX') * (1/rr)
-
-        H = assembly.sv["TangentMatrix"]
+        eps, H, initial_stress, factor = self._get_strain_stress(assembly)
 
         sigma = [
             sum([0 if eps[j] == 0 else eps[j] * H[i][j] for j in range(6)])
@@ -127,11 +110,66 @@ class StressEquilibrium(WeakFormBase):
                 ]
             )
 
-        if self.space._dimension == "2Daxi":
-            DiffOp = DiffOp * ((2 * np.pi) * rr)
+        if factor is not 1:
+            DiffOp = DiffOp * factor
 
         return DiffOp
 
+    def get_bdb_data(self, assembly, pb):
+        """Get the data used to assemble the weak equation with the B^T.D.B
+        kernel of the Assembly.
+
+        Returns
+        -------
+        eps: list of 6 DiffOp (or 0)
+            Strain operator (B) using the voigt notation.
+        H: array or 6x6 list
+            Tangent matrix (D). Each component is a scalar or gauss point
+            values.
+        initial_stress: list of 6 values or 0
+            Initial stress.
+        factor: scalar or array
+            Factor applied to the weak equation at gauss points
+            (2*pi*r for 2Daxi).
+
+        Return None if the generic weak equation (given by get_weak_equation)
+        should be used instead, ie for total lagrangian method or if
+        get_weak_equation is overriden by a derived class.
+        """
+        if (
+            assembly._nlgeom == "TL"
+            or type(self).get_weak_equation is not StressEquilibrium.get_weak_equation
+        ):
+            return None
+        return self._get_strain_stress(assembly)
+
+    def _get_strain_stress(self, assembly):
+        # return the strain operator, tangent matrix, initial stress and
+        # the factor to apply to the weak equation
+        factor = 1
+        if assembly._nlgeom == "TL":  # add initial displacement effect
+            eps = self.space.op_strain(assembly.sv["DispGradient"])
+            initial_stress = assembly.sv["PK2"]
+        else:
+            eps = self.space.op_strain()
+            initial_stress = assembly.sv[
+                "Stress"
+            ]  # Stress = Cauchy for updated lagrangian method
+
+            if self.space._dimension == "2Daxi":
+                rr = assembly.sv["_R_gausspoints"]
+
+                # nlgeom = False
+                eps[2] = self.space.variable("DispX") * np.divide(
+                    1, rr, out=np.zeros_like(rr), where=rr != 0
+                )  # put zero if X==0 (division by 0)
+                # eps[2] = self.space.variable('DispX') * (1/rr)
+
+        if self.space._dimension == "2Daxi":
+            factor = (2 * np.pi) * assembly.sv["_R_gausspoints"]
+
+        return eps, assembly.sv["TangentMatrix"], initial_stress, factor
+
     def initialize(self, assembly, pb):
         """Initialize the weakform at the begining of a problem."""
         # TO DO: change stress initialization to remove initial stress
@@ -160,10 +198,12 @@ class StressEquilibrium(WeakFormBase):
             )
 
         if assembly._nlgeom:
-            if not (USE_SIMCOON):
+            if not (USE_SIMCOON) and (
+                assembly._nlgeom == "TL" or self._corate in ["log_r", "log_r_inc"]
+            ):
                 raise ModuleNotFoundError(
                     "Simcoon library need to be installed to deal with \
-                     geometric non linearities (nlgeom = True)"
+                     the total lagrangian method or the 'log_r' corate"
                 )
             if assembly._nlgeom == "TL":
                 assembly.sv["PK2"] = 0
@@ -274,7 +314,7 @@ class StressEquilibrium(WeakFormBase):
             if "DStrain" in assembly.sv:
                 # rotate strain and stress -> need to be checked
                 assembly.sv["Strain"] = StrainTensorList(
-                    sim.rotate_strain_R(
+                    kinematics.rotate_strain(
                         assembly.sv_start["Strain"].asarray(),
                         assembly.sv["DR"],
                     )
@@ -292,7 +332,7 @@ class StressEquilibrium(WeakFormBase):
             ):  # True when the problem have been updated once
                 stress = assembly.sv["Stress"].asarray()
                 assembly.sv["Stress"] = StressTensorList(
-                    sim.rotate_stress_R(stress, assembly.sv["DR"])
+                    kinematics.rotate_stress(stress, assembly.sv["DR"])
                 )
                 if assembly._nlgeom == "TL":
                     assembly.sv["PK2"] = assembly.sv["Stress"].cauchy_to_pk2(
@@ -397,123 +437,82 @@ def _comp_linear_strain(wf, assembly, pb):
     assert not (wf.nlgeom), "the current strain measure isn't adapted for finite strain"
     grad_values = assembly.sv["DispGradient"]
 
-    strain = np.empty((6, len(grad_values[0][0])), order="F")
     # order = F for compatibility with simcoon without performance loss
     # in other cases
-    strain[0:3] = [grad_values[i][i] for i in range(3)]
-    strain[3] = grad_values[0][1] + grad_values[1][0]
-    strain[4] = grad_values[0][2] + grad_values[2][0]
-    strain[5] = grad_values[1][2] + grad_values[2][1]
-    assembly.sv["Strain"] = StrainTensorList(strain)
+    strain = assembly.get_sv_buffer("Strain", (6, len(grad_values[0][0])))
+    assembly.sv["Strain"] = StrainTensorList(
+        kinematics.small_strain(grad_values, out=strain)
+    )
 
 
-def _comp_log_strain(wf, assembly, pb):
+def _comp_F(assembly):
+    # compute the deformation gradient F at the end of the increment and
+    # return F at the beginning and at the end of the increment.
     grad_values = assembly.sv["DispGradient"]
-    eye_3 = np.empty((3, 3, 1), order="F")
-    eye_3[:, :, 0] = np.eye(3)
-    F1 = np.add(eye_3, grad_values)
+    n_points = len(grad_values[0][0])
+    F1 = kinematics.deformation_gradient(
+        grad_values, out=assembly.get_sv_buffer("F", (3, 3, n_points))
+    )
     assembly.sv["F"] = F1
     if "F" not in assembly.sv_start:
         F0 = np.empty_like(F1)
-        F0[...] = eye_3
+        F0[...] = np.eye(3).reshape(3, 3, 1)
         assembly.sv_start["F"] = F0
+    return assembly.sv_start["F"], F1
 
-    (D, DR, Omega) = sim.objective_rate(
-        "log", assembly.sv_start["F"], F1, pb.dtime, False
-    )
+
+def _comp_log_strain(wf, assembly, pb):
+    F0, F1 = _comp_F(assembly)
+    D, DR, Omega = kinematics.objective_rate("log", F0, F1, pb.dtime)
     assembly.sv["DR"] = DR
-    assembly.sv["Strain"] = StrainTensorList(sim.Log_strain(F1, True, False))
+    strain = assembly.get_sv_buffer("Strain", (6, F1.shape[2]))
+    assembly.sv["Strain"] = StrainTensorList(kinematics.log_strain(F1, out=strain))
 
 
 def _comp_log_strain_inc(wf, assembly, pb):
-    grad_values = assembly.sv["DispGradient"]
-    eye_3 = np.empty((3, 3, 1), order="F")
-    eye_3[:, :, 0] = np.eye(3)
-    F1 = np.add(eye_3, grad_values)
-    assembly.sv["F"] = F1
-    if "F" not in assembly.sv_start:
-        F0 = np.empty_like(F1)
-        F0[...] = eye_3
-        assembly.sv_start["F"] = F0
-
-    (DStrain, D, DR, Omega) = sim.objective_rate(
-        "log", assembly.sv_start["F"], F1, pb.dtime, True
-    )
+    F0, F1 = _comp_F(assembly)
+    DStrain, D, DR, Omega = kinematics.objective_rate("log", F0, F1, pb.dtime, True)
     assembly.sv["DR"] = DR
     assembly.sv["DStrain"] = StrainTensorList(DStrain)
 
 
 def _comp_log_strain_R(wf, assembly, pb):
-    grad_values = assembly.sv["DispGradient"]
-    eye_3 = np.empty((3, 3, 1), order="F")
-    eye_3[:, :, 0] = np.eye(3)
-    F1 = np.add(eye_3, grad_values)
-    assembly.sv["F"] = F1
-    if "F" not in assembly.sv_start:
-        F0 = np.empty_like(F1)
-        F0[...] = eye_3
-        assembly.sv_start["F"] = F0
-
-    (D, DR, Omega) = sim.objective_rate(
-        "log_R", assembly.sv_start["F"], F1, pb.dtime, False
-    )
+    F0, F1 = _comp_F(assembly)
+    D, DR, Omega = sim.objective_rate("log_R", F0, F1, pb.dtime, False)
     assembly.sv["DR"] = DR
-    assembly.sv["Strain"] = StrainTensorList(sim.Log_strain(F1, True, False))
+    strain = assembly.get_sv_buffer("Strain", (6, F1.shape[2]))
+    assembly.sv["Strain"] = StrainTensorList(kinematics.log_strain(F1, out=strain))
 
 
 def _comp_log_strain_R_inc(wf, assembly, pb):
-    grad_values = assembly.sv["DispGradient"]
-    eye_3 = np.empty((3, 3, 1), order="F")
-    eye_3[:, :, 0] = np.eye(3)
-    F1 = np.add(eye_3, grad_values)
-    assembly.sv["F"] = F1
-    if "F" not in assembly.sv_start:
-        F0 = np.empty_like(F1)
-        F0[...] = eye_3
-        assembly.sv_start["F"] = F0
-
-    (DStrain, D, DR, Omega) = sim.objective_rate(
-        "log_R", assembly.sv_start["F"], F1, pb.dtime, True
-    )
+    F0, F1 = _comp_F(assembly)
+    DStrain, D, DR, Omega = sim.objective_rate("log_R", F0, F1, pb.dtime, True)
     assembly.sv["DR"] = DR
     assembly.sv["DStrain"] = StrainTensorList(DStrain)
 
 
-def _comp_jaumann_strain(wf, assembly, pb):
-    grad_values = assembly.sv["DispGradient"]
-    eye_3 = np.empty((3, 3, 1), order="F")
-    eye_3[:, :, 0] = np.eye(3)
-    F1 = np.add(eye_3, grad_values)
-    assembly.sv["F"] = F1
-    if "F" not in assembly.sv_start:
-        F0 = np.empty_like(F1)
-        F0[...] = eye_3
-        assembly.sv_start["F"] = F0
-
-    (DStrain, D, DR, Omega) = sim.objective_rate(
-        "jaumann", assembly.sv_start["F"], F1, pb.dtime, True
-    )
+def _comp_corate_strain_inc(corate, assembly, pb):
+    # strain increment of the jaumann and green_naghdi corates. The simcoon
+    # increment is kept when available as it differs slightly from the
+    # D*dt increment of kinematics.objective_rate.
+    F0, F1 = _comp_F(assembly)
+    if USE_SIMCOON:
+        DStrain, D, DR, Omega = sim.objective_rate(corate, F0, F1, pb.dtime, True)
+    else:
+        DStrain, D, DR, Omega = kinematics.objective_rate(
+            corate, F0, F1, pb.dtime, True
+        )
     assembly.sv["DR"] = DR
     assembly.sv["DStrain"] = StrainTensorList(DStrain)
 
 
+def _comp_jaumann_strain(wf, assembly, pb):
+    _comp_corate_strain_inc("jaumann", assembly, pb)
+
+
 def _comp_gn_strain(wf, assembly, pb):
     # green_naghdi corate
-    grad_values = assembly.sv["DispGradient"]
-    eye_3 = np.empty((3, 3, 1), order="F")
-    eye_3[:, :, 0] = np.eye(3)
-    F1 = np.add(eye_3, grad_values)
-    assembly.sv["F"] = F1
-    if "F" not in assembly.sv_start:
-        F0 = np.empty_like(F1)
-        F0[...] = eye_3
-        assembly.sv_start["F"] = F0
-
-    (DStrain, D, DR, Omega) = sim.objective_rate(
-        "green_naghdi", assembly.sv_start["F"], F1, pb.dtime, True
-    )
-    assembly.sv["DR"] = DR
-    assembly.sv["DStrain"] = StrainTensorList(DStrain)
+    _comp_corate_strain_inc("green_naghdi", assembly, pb)
 
 
 def _comp_linear_strain_pgd(wf, assembly, pb):
@@ -536,27 +535,5 @@ def _comp_gl_strain(wf, assembly, pb):
     if not (wf.nlgeom):
         return _comp_linear_strain_pgd(wf, assembly, pb)
     else:
-        grad_values = assembly.sv["DispGradient"]
-        # GL strain tensor
-        # possibility to be improve from simcoon functions
-        # to get the logarithmic strain tensor...
-        strain = [
-            grad_values[i][i] + 0.5 * sum([grad_values[k][i] ** 2 for k in range(3)])
-            for i in range(3)
-        ]
-        strain += [
-            grad_values[0][1]
-            + grad_values[1][0]
-            + sum([grad_values[k][0] * grad_values[k][1] for k in range(3)])
-        ]
-        strain += [
-            grad_values[0][2]
-            + grad_values[2][0]
-            + sum([grad_values[k][0] * grad_values[k][2] for k in range(3)])
-        ]
-        strain += [
-            grad_values[1][2]
-            + grad_values[2][1]
-            + sum([grad_values[k][1] * grad_values[k][2] for k in range(3)])
-        ]
-        return StrainTensorList(strain)
+        F = kinematics.deformation_gradient(assembly.sv["DispGradient"])
+        return StrainTensorList(kinematics.green_lagrange_strain(F))
@@ -0,0 +1,52 @@
+import os
+
+import numpy as np
+
+from fedoo.util.abaqus_inp import ReadINP
+
+INP = """*Heading
+** Job name: test
+*Node
+ 1, 0., 0., 0.
+ 2, 1., 0., 0.
+ 3, 1., 1., 0.
+ 4, 0., 1., 0.
+ 5, 0., 0., 1.
+ 6, 1., 0., 1.
+ 7, 1., 1., 1.
+ 8, 0., 1., 1.
+ 10, 0., 0., 2.
+*Element, type=C3D8R, elset=cube
+1, 1, 2, 3, 4, 5, 6, 7, 8
+*Element, type=C3D4
+2, 5, 6, 7, 10
+*Nset, nset=bottom, generate
+ 1, 4, 1
+*Nset, nset=Top
+ 5, 6, 7,
+ 8
+*Elset, elset=all
+ cube, 2
+*Node Output
+U
+"""
+
+
+def test_abaqus_inp(tmp_path):
+    filename = os.path.join(tmp_path, "test.inp")
+    with open(filename, "w") as f:
+        f.write(INP)
+
+    for i in range(2):  # the 2nd time, the data are read from the cache file
+        mesh = ReadINP(filename, cache=True).toMesh()
+        assert os.path.isfile(filename + ".cache.npz")
+
+        hex_mesh = mesh.mesh_dict["hex8"]
+        tet_mesh = mesh.mesh_dict["tet4"]
+        assert np.array_equal(hex_mesh.elements, [np.arange(8)])
+        assert np.array_equal(tet_mesh.elements, [[4, 5, 6, 8]])
+        assert np.array_equal(hex_mesh.node_sets["bottom"], [0, 1, 2, 3])
+        assert np.array_equal(hex_mesh.node_sets["top"], [4, 5, 6, 7])
+        assert np.array_equal(hex_mesh.element_sets["all"], [0])
+        assert np.array_equal(tet_mesh.element_sets["all"], [0])
+        assert len(tet_mesh.element_sets["cube"]) == 0
@@ -0,0 +1,88 @@
+import os
+import subprocess
+import sys
+
+import numpy as np
+
+import fedoo as fd
+
+
+def _run_tensile_test(filename, asynchronous):
+    fd.ModelingSpace("2Dstress")
+
+    mesh = fd.mesh.rectangle_mesh(nx=11, ny=5, elm_type="quad4")
+    material = fd.constitutivelaw.ElasticIsotrop(200e3, 0.3)
+    wf = fd.weakform.StressEquilibrium(material, nlgeom=False)
+    assemb = fd.Assembly.create(wf, mesh)
+
+    pb = fd.problem.NonLinear(assemb)
+    pb.set_async_output(asynchronous, max_queue_size=1)
+    res = pb.add_output(filename, assemb, ["Disp", "Stress", "Strain"])
+
+    pb.bc.add("Dirichlet", "left", "Disp", 0)
+    pb.bc.add("Dirichlet", "right", "DispX", 0.1)
+
+    pb.nlsolve(dt=0.1, tmax=1, print_info=0)
+    return res
+
+
+def test_async_output(tmp_path):
+    res_sync = _run_tensile_test(os.path.join(tmp_path, "sync"), False)
+    res_async = _run_tensile_test(os.path.join(tmp_path, "async"), True)
+
+    assert res_async.n_iter == res_sync.n_iter == 10
+    for i in [0, 5, -1]:
+        res_sync.load(i)
+        res_async.load(i)
+        for field in ["Disp", "Stress", "Strain"]:
+            assert np.array_equal(res_async[field], res_sync[field])
+
+    # results can be reloaded from the written file
+    res_file = fd.read_data(os.path.join(tmp_path, "async.fdz"))
+    res_file.load(-1)
+    assert np.array_equal(res_file["Disp"], res_async["Disp"])
+
+
+def test_async_output_linear(tmp_path):
+    # results saved after a linear solve are available once save_results
+    # returns
+    fd.ModelingSpace("2Dstress")
+    mesh = fd.mesh.rectangle_mesh(nx=11, ny=5, elm_type="quad4")
+    material = fd.constitutivelaw.ElasticIsotrop(200e3, 0.3)
+    assemb = fd.Assembly.create(fd.weakform.StressEquilibrium(material), mesh)
+    pb = fd.problem.Linear(assemb)
+    pb.set_async_output(True)
+    res = pb.add_output(os.path.join(tmp_path, "linear"), assemb, ["Disp"])
+
+    pb.bc.add("Dirichlet", "left", "Disp", 0)
+    bc = pb.bc.add("Dirichlet", "right", "DispX", 0)
+    for i in range(3):
+        bc.change_value(0.1 * (i + 1))
+        pb.solve()
+        pb.save_results(i)
+        assert len(res.list_data) == i + 1
+        res.load(i)
+        assert np.allclose(res["Disp"][0].max(), 0.1 * (i + 1))
+
+
+def test_async_output_at_exit(tmp_path):
+    # the pending frames are written at the interpreter exit
+    filename = os.path.join(tmp_path, "exit")
+    script = f"""
+import fedoo as fd
+fd.ModelingSpace("2Dstress")
+mesh = fd.mesh.rectangle_mesh(nx=11, ny=5, elm_type="quad4")
+material = fd.constitutivelaw.ElasticIsotrop(200e3, 0.3)
+assemb = fd.Assembly.create(fd.weakform.StressEquilibrium(material), mesh)
+pb = fd.problem.Linear(assemb)
+pb.set_async_output(True, max_queue_size=0)
+pb.add_output({filename!r}, assemb, ["Disp"])
+pb.bc.add("Dirichlet", "left", "Disp", 0)
+pb.bc.add("Dirichlet", "right", "DispX", 0.1)
+pb.solve()
+for i in range(3):
+    pb._problem_output.save_results(pb, i)  # not flushed
+"""
+    subprocess.run([sys.executable, "-c", script], check=True)
+    res = fd.read_data(filename + ".fdz")
+    assert res.n_iter == 3
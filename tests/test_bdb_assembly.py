@@ -0,0 +1,100 @@
+import numpy as np
+
+import fedoo as fd
+from fedoo.util.voigt_tensors import StressTensorList
+
+
+def test_bdb_assembly():
+    # the B^T.D.B kernel should give the same global matrix and vector as
+    # the generic assembly of the weak equation
+    for space, mesh in [
+        ("3D", fd.mesh.box_mesh(4, 3, 3, elm_type="hex8")),
+        ("3D", fd.mesh.box_mesh(3, 3, 3, elm_type="hex20")),
+        ("2Dstress", fd.mesh.rectangle_mesh(6, 5, elm_type="quad4")),
+        ("2Dplane", fd.mesh.rectangle_mesh(6, 5, elm_type="tri6")),
+        ("2Daxi", fd.mesh.rectangle_mesh(6, 5, elm_type="quad8")),
+    ]:
+        fd.ModelingSpace(space)
+        material = fd.constitutivelaw.ElasticIsotrop(200e3, 0.3)
+        wf = fd.weakform.StressEquilibrium(material)
+        assemb = fd.Assembly.create(wf, mesh)
+        pb = fd.problem.Linear(assemb)
+
+        # gauss point dependent tangent matrix and initial stress
+        n_gp = assemb.n_gauss_points
+        H = np.array(assemb.sv["TangentMatrix"], dtype=float)
+        assemb.sv["TangentMatrix"] = H[..., None] * (1 + np.random.rand(n_gp))
+        assemb.sv["Stress"] = StressTensorList(list(np.random.rand(6, n_gp)))
+
+        results = []
+        for use_bdb_kernel in [False, True]:
+            assemb._use_bdb_kernel = use_bdb_kernel
+            assemb.assemble_global_mat()
+            results.append((assemb.global_matrix, assemb.global_vector))
+
+        (mat_ref, vec_ref), (mat, vec) = results
+        assert abs(mat - mat_ref).max() < 1e-10 * abs(mat_ref).max()
+        assert np.allclose(vec, vec_ref, rtol=1e-10, atol=1e-10 * abs(vec_ref).max())
+
+
+def test_assembly_plan():
+    # the assembly plan is built once and reused when only the coefficients
+    # of the weak equation change
+    fd.ModelingSpace("2Dstress")
+    mesh = fd.mesh.rectangle_mesh(6, 5, elm_type="quad4")
+    material = fd.constitutivelaw.ElasticIsotrop(200e3, 0.3)
+    assemb = fd.Assembly.create(fd.weakform.StressEquilibrium(material), mesh)
+    pb = fd.problem.Linear(assemb)
+    assemb._use_bdb_kernel = False
+
+    assemb.assemble_global_mat("matrix")
+    mat_ref = assemb.global_matrix
+    plans = dict(assemb._saved_assembly_plans)
+
+    H = np.array(assemb.sv["TangentMatrix"], dtype=float)
+    assemb.sv["TangentMatrix"] = 2 * H
+    assemb.assemble_global_mat("matrix")
+    assert assemb._saved_assembly_plans == plans
+    assert abs(assemb.global_matrix - 2 * mat_ref).max() < 1e-10 * abs(mat_ref).max()
+
+    # product of a real and a virtual operator in both orders
+    u = fd.core.diffop.DiffOp(0) + 2 * fd.core.diffop.DiffOp(1, 0, 1)
+    v = fd.core.diffop.DiffOp(1, 1, 1, vir=1)
+    assert str(u * v) == str(v * u) == "1 dv1/dx1 u0 + 2 dv1/dx1 du1/dx0"
+
+
+def test_lazy_coef():
+    # the products of DiffOp and arrays are only evaluated when required
+    DiffOp = fd.core.diffop.DiffOp
+    a, b = np.random.rand(2, 10)
+    u = DiffOp(0, 1, 1)
+    assert (u * a).coef[0] is a  # no copy
+
+    coef = ((2 * u * a) * (-b)).coef[0]
+    assert isinstance(coef, fd.core.diffop._CoefProduct)
+    assert len(coef) == 10
+    assert np.allclose(np.asarray(coef), -2 * a * b)
+    assert np.allclose(coef[:], -2 * a * b)
+
+    coef_vir = (DiffOp(0, vir=1) * (u * a * b)).coef[0]
+    cache = {}
+    assert np.allclose(coef_vir.evaluate(cache=cache), a * b)
+    assert len(cache) == 1
+
+
+def test_bdb_overriden_weak_equation():
+    # the kernel should not be used if get_weak_equation is overriden
+    class DoubleStiffness(fd.weakform.StressEquilibrium):
+        def get_weak_equation(self, assembly, pb):
+            return 2 * super().get_weak_equation(assembly, pb)
+
+    fd.ModelingSpace("2Dstress")
+    mesh = fd.mesh.rectangle_mesh(6, 5, elm_type="quad4")
+    material = fd.constitutivelaw.ElasticIsotrop(200e3, 0.3)
+    results = []
+    for wf_class in [fd.weakform.StressEquilibrium, DoubleStiffness]:
+        assemb = fd.Assembly.create(wf_class(material), mesh)
+        pb = fd.problem.Linear(assemb)
+        assemb.assemble_global_mat("matrix")
+        results.append(assemb.global_matrix)
+    assert abs(results[1] - 2 * results[0]).max() < 1e-10 * abs(results[0]).max()
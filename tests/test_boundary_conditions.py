@@ -0,0 +1,118 @@
+import numpy as np
+from scipy import sparse
+
+import fedoo as fd
+from fedoo.core.boundary_conditions import _ConstraintStore
+
+
+def get_ref_bc(pb):
+    # MatCB and Xbc built one elementary bc at a time
+    n_dof = pb.mesh.n_nodes * pb.space.nvar
+    Xbc = np.zeros(n_dof)
+    dof_slave = set()
+    data, row, col = [], [], []
+    for e in pb.bc.generate(pb):
+        if e.bc_type == "Dirichlet":
+            Xbc[e._dof_index] = e._current_value
+            dof_slave.update(e._dof_index)
+        elif e.bc_type == "MPC":
+            Xbc[e._dof_index[0]] = e._current_value
+            dof_slave.update(e._dof_index[0])
+            n_fact, n_mpc = e._dof_index[1:].shape
+            factors = np.reshape(e._factors, (n_fact, -1))
+            data.append(np.broadcast_to(factors, (n_fact, n_mpc)).T.ravel())
+            row.append(np.repeat(e._dof_index[0], n_fact))
+            col.append(e._dof_index[1:].T.ravel())
+
+    dof_free = np.setdiff1d(np.arange(n_dof), list(dof_slave))
+    M = sparse.coo_matrix(
+        (np.hstack(data), (np.hstack(row), np.hstack(col))), shape=(n_dof, n_dof)
+    )
+    Xbc = Xbc + M @ Xbc
+    M = M.toarray()
+    MatCB = M[:, dof_free]
+    MatCB[dof_free, np.arange(len(dof_free))] += 1
+    return MatCB, Xbc
+
+
+def test_constraint_store():
+    fd.ModelingSpace("2D")
+    mesh = fd.mesh.rectangle_mesh(5, 4, elm_type="quad4")
+    material = fd.constitutivelaw.ElasticIsotrop(200e3, 0.3)
+    assemb = fd.Assembly.create(fd.weakform.StressEquilibrium(material), mesh)
+    pb = fd.problem.Linear(assemb)
+
+    left = mesh.node_sets["left"]
+    right = mesh.node_sets["right"]
+    top_node = mesh.nearest_node([0.5, 1])
+    pb.bc.add("Dirichlet", left, "Disp", 0)
+    pb.bc.add("Dirichlet", right, "DispX", 0.1)
+    pb.bc.add("Neumann", "top", "DispY", -2)
+    # same DispY on the right face
+    pb.bc.mpc(
+        [right[1:], np.full(len(right) - 1, right[0])], ["DispY", "DispY"], [1, -1]
+    )
+    # mpc with blocked master dof
+    pb.bc.mpc([[top_node], [left[0]], [right[0]]], ["DispX"] * 3, [1, -0.5, -0.5])
+    pb.apply_boundary_conditions()
+
+    MatCB_ref, Xbc_ref = get_ref_bc(pb)
+    assert np.allclose(pb._Problem__MatCB.toarray(), MatCB_ref)
+    assert np.allclose(pb._Xbc, Xbc_ref)
+    assert np.isclose(pb._Xbc[top_node], 0.05)
+
+
+def test_bc_topology_cache():
+    fd.ModelingSpace("2D")
+    mesh = fd.mesh.rectangle_mesh(5, 4, elm_type="quad4")
+    material = fd.constitutivelaw.ElasticIsotrop(200e3, 0.3)
+    assemb = fd.Assembly.create(fd.weakform.StressEquilibrium(material), mesh)
+    pb = fd.problem.Linear(assemb)
+
+    right = mesh.node_sets["right"]
+    pb.bc.add("Dirichlet", "left", "Disp", 0)
+    bc_right = pb.bc.add("Dirichlet", "right", "DispX", 0.1)
+    pb.bc.mpc(
+        [right[1:], np.full(len(right) - 1, right[0])], ["DispY", "DispY"], [1, -1]
+    )
+    pb.apply_boundary_conditions()
+    MatCB = pb._Problem__MatCB
+
+    # only the bc values change: the topology is reused
+    bc_right.change_value(0.2)
+    pb.apply_boundary_conditions()
+    assert pb._Problem__MatCB is MatCB
+    assert np.allclose(pb._Xbc, get_ref_bc(pb)[1])
+
+    # removed bc
+    pb.bc.remove(bc_right)
+    pb.apply_boundary_conditions()
+    assert pb._Problem__MatCB is not MatCB
+    MatCB_ref, Xbc_ref = get_ref_bc(pb)
+    assert np.allclose(pb._Problem__MatCB.toarray(), MatCB_ref)
+    assert np.allclose(pb._Xbc, Xbc_ref)
+
+    # new bc
+    MatCB = pb._Problem__MatCB
+    pb.bc.add("Dirichlet", "right", "DispX", 0.1)
+    pb.apply_boundary_conditions()
+    assert pb._Problem__MatCB is not MatCB
+    assert np.allclose(pb._Problem__MatCB.toarray(), get_ref_bc(pb)[0])
+
+
+def test_bc_topology_key():
+    # same blocked dof but different number of dof: packbits gives the same
+    # bytes, the keys should differ
+    keys = []
+    for n_dof in [10, 16]:
+        store = _ConstraintStore(n_dof)
+        store.add_dirichlet(np.array([0, 3]))
+        store.finalize()
+        keys.append((store.get_dof_key(), store.get_mpc_key()))
+    assert keys[0][0] != keys[1][0]
+    assert keys[0][1] != keys[1][1]
+
+    store = _ConstraintStore(10)
+    store.add_dirichlet(np.array([0, 3]), 0.5)  # only the value changes
+    store.finalize()
+    assert (store.get_dof_key(), store.get_mpc_key()) == keys[0]
@@ -0,0 +1,74 @@
+import numpy as np
+
+import fedoo as fd
+
+
+def damage_ref(law, delta, d_irr):
+    # point by point damage of the Crisfield model
+    p = law.parameters
+    alpha = 2
+    SIImax = p["SImax"] * np.sqrt(p["GIIc"] / p["GIc"])
+    delta_0_I = p["SImax"] / p["KI"]
+    delta_0_II = SIImax / p["KII"]
+    delta_m_II = 2 * p["GIIc"] / SIImax
+    res = []
+    for i in range(len(delta[0])):
+        delta_n = delta[2][i]
+        delta_t = np.sqrt(delta[0][i] ** 2 + delta[1][i] ** 2)
+        if delta_n > 0:
+            beta = delta_t / delta_n
+            t0 = (delta_0_II * delta_0_I) * np.sqrt(
+                (1 + beta**2) / (delta_0_II**2 + (beta * delta_0_I) ** 2)
+            )
+            tm = (2 * (1 + beta) ** 2 / t0) * (
+                (p["KI"] / p["GIc"]) ** alpha
+                + (p["KII"] * beta**2 / p["GIIc"]) ** alpha
+            ) ** (-1 / alpha)
+            dta = np.sqrt(delta_t**2 + delta_n**2)
+        else:
+            t0, tm, dta = delta_0_II, delta_m_II, delta_t
+
+        if dta <= t0:
+            d = 0
+        elif dta < tm:
+            d = (tm / (tm - t0)) * (1 - t0 / dta)
+        else:
+            d = 1
+        res.append(max(d, d_irr[i]))
+    return np.array(res)
+
+
+def test_cohesive_law():
+    fd.ModelingSpace("3D")
+    n_elm = 50
+    square = np.array([[0, 0, 0], [1, 0, 0], [1, 1, 0], [0, 1, 0]])
+    nodes = np.vstack(
+        [square + [2 * i, 0, 0] for i in range(n_elm) for face in range(2)]
+    )
+    elements = np.arange(8 * n_elm).reshape(-1, 8)
+    mesh = fd.Mesh(nodes, elements, "quad4interface")
+    law = fd.constitutivelaw.CohesiveLaw(GIc=0.3, SImax=60, KI=1e4, GIIc=1.6, KII=5e4)
+    assemb = fd.Assembly.create(fd.weakform.InterfaceForce(law), mesh)
+    assemb.initialize(fd.problem.Linear(assemb))
+    n = assemb.n_gauss_points
+
+    # undamaged interface: constant rigidity
+    assert np.isscalar(law.get_tangent_matrix(assemb)[2][2])
+
+    # intact, process zone and fully broken points
+    d_irr = np.zeros(n)
+    rng = np.random.default_rng(0)
+    for scale in [0.001, 0.01, 0.1]:
+        U = scale * (rng.random(3 * mesh.n_nodes) - 0.5)
+        law.update_damage(assemb, U)
+        delta = [assemb.get_gp_results(op, U) for op in assemb.space.op_disp()]
+        d = assemb.sv["DamageVariable"]
+        assert np.allclose(d, damage_ref(law, delta, d_irr))
+        assert np.allclose(assemb.sv["DamageVariableOpening"], (delta[2] > 0) * d)
+
+        K = law.get_tangent_matrix(assemb)
+        assert np.allclose(K[0][0], (1 - d) * 5e4)
+        law.update_irreversible_damage(assemb)
+        d_irr = d.copy()
+
+    assert 0 < (d == 1).sum() < n
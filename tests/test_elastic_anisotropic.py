@@ -0,0 +1,93 @@
+import numpy as np
+
+import fedoo as fd
+
+
+def test_elastic_stress_update():
+    # stress computed from a uniform and from an element dependent
+    # tangent matrix
+    fd.ModelingSpace("3D")
+    mesh = fd.mesh.box_mesh(4, 3, 3, elm_type="hex8")
+    E = 200e3 * (1 + np.random.rand(mesh.n_elements))
+    for young_modulus in [200e3, E]:
+        material = fd.constitutivelaw.ElasticIsotrop(young_modulus, 0.3)
+        assemb = fd.Assembly.create(fd.weakform.StressEquilibrium(material), mesh)
+        pb = fd.problem.Linear(assemb)
+        pb.bc.add("Dirichlet", "left", "Disp", 0)
+        pb.bc.add("Dirichlet", "right", "DispX", 0.1)
+        pb.solve()
+        pb.get_results(assemb, ["Stress", "Strain"])
+
+        strain = np.array(assemb.sv["Strain"])
+        H = [
+            [assemb.convert_data(Hij) for Hij in line]
+            for line in material.get_tangent_matrix(assemb)
+        ]
+        stress_ref = [sum(H[i][j] * strain[j] for j in range(6)) for i in range(6)]
+        assert np.allclose(assemb.sv["Stress"], stress_ref)
+
+
+def test_local_frame_rotation():
+    # the rotated tangent matrix is cached until the local frame changes
+    fd.ModelingSpace("3D")
+    mesh = fd.mesh.box_mesh(3, 3, 3, elm_type="hex8")
+    material = fd.constitutivelaw.CompositeUD(angle=30)
+    assemb = fd.Assembly.create(fd.weakform.StressEquilibrium(material), mesh)
+
+    theta = np.random.rand(assemb.n_gauss_points)
+    c, s, zero = np.cos(theta), np.sin(theta), 0 * theta
+    local_frame = np.array([[c, s, zero], [-s, c, zero], [zero, zero, zero + 1]])
+    material.local_frame = local_frame.transpose(2, 0, 1)
+
+    H = material.get_tangent_matrix(assemb)
+    assert material.get_tangent_matrix(assemb) is H
+    material.local_frame = material.local_frame.copy()
+    assert material.get_tangent_matrix(assemb) is H  # same values
+
+    H_local = np.array(material.local2global_H(np.eye(6)))
+    R = material._get_strain_rotation()
+    assert np.allclose(H_local, np.einsum("nji,njl->iln", R, R))
+
+    # rotation of a correction on some gauss points only
+    index = np.array([1, 5, 8])
+    dH = np.random.rand(6, 6, len(index))
+    assert np.allclose(
+        material.local2global_H(dH, index),
+        np.einsum("nji,jkn,nkl->iln", R[index], dH, R[index]),
+    )
+
+    # local frame and tangent matrix modified in place
+    material.local_frame[:] = material.local_frame[:, [1, 0, 2]]
+    H2 = material.get_tangent_matrix(assemb)
+    assert not np.allclose(H2, H)
+    H_buffer = np.ones((6, 6, assemb.n_gauss_points))
+    material.local2global_H(H_buffer)
+    H_buffer[0, 0] = 2
+    R = material._get_strain_rotation()
+    assert np.allclose(
+        material.local2global_H(H_buffer),
+        np.einsum("nji,jkn,nkl->iln", R, H_buffer, R),
+    )
+
+
+def test_compact_tangent_matrix():
+    # compact tangent matrix cached for each assembly sharing the law
+    fd.ModelingSpace("3D")
+    mesh = fd.mesh.box_mesh(4, 3, 3, elm_type="hex8")
+    C = np.array(fd.constitutivelaw.ElasticIsotrop(200e3, 0.3).get_elastic_matrix())
+    H = [list(row) for row in C]
+    H[0][0] = C[0, 0] * np.ones(mesh.n_elements)  # element values
+    material = fd.constitutivelaw.ElasticAnisotropic(H)
+    wf = fd.weakform.StressEquilibrium(material)
+    assemblies = [
+        fd.Assembly.create(wf, mesh),
+        fd.Assembly.create(wf, mesh, n_elm_gp=1),
+    ]
+    compact = [material._get_compact_H(assemb, H) for assemb in assemblies]
+    for assemb, compact_H in zip(assemblies, compact):
+        assert compact_H.shape == (6, 6, assemb.n_gauss_points)
+        assert material._get_compact_H(assemb, H) is compact_H
+
+    H[0][0] *= 2  # modified in place
+    for assemb in assemblies:
+        assert np.allclose(material._get_compact_H(assemb, H)[0, 0], 2 * C[0, 0])
@@ -0,0 +1,214 @@
+import os
+from zipfile import ZipFile
+
+import numpy as np
+
+import fedoo as fd
+
+
+def test_fdz(tmp_path):
+    mesh = fd.mesh.rectangle_mesh(nx=5, ny=4, elm_type="quad4")
+    mesh.add_virtual_nodes(1)
+    data = fd.DataSet(mesh)
+    data.node_data["Disp"] = np.random.rand(2, mesh.n_nodes)
+    data.element_data["Stress"] = np.random.rand(3, mesh.n_elements)
+    data.scalar_data["Time"] = 0.5
+
+    filename = os.path.join(tmp_path, "test.fdz")
+    data.save(filename)
+    data.to_fdz(filename, iteration=1, compressed=True)
+
+    # no temporary file should be written in the working directory
+    assert not os.path.isfile("_mesh_.npz") and not os.path.isfile("_mesh_.vtk")
+
+    res = fd.read_data(filename)
+    assert res.n_iter == 2
+    assert np.array_equal(res.mesh.nodes, mesh.nodes)
+    assert np.array_equal(res.mesh.elements, mesh.elements)
+    assert res.mesh.elm_type == "quad4"
+    assert res.mesh.n_physical_nodes == mesh.n_physical_nodes
+    for key in mesh.node_sets:
+        assert np.array_equal(res.mesh.node_sets[key], mesh.node_sets[key])
+
+    res.load(1)
+    assert np.array_equal(res["Disp"], data.node_data["Disp"])
+    assert np.array_equal(res["Stress"], data.element_data["Stress"])
+    assert res.scalar_data["Time"] == 0.5
+
+    # old fdz files with a vtk mesh can still be read
+    old_filename = os.path.join(tmp_path, "old.fdz")
+    mesh.save(os.path.join(tmp_path, "_mesh_.vtk"))
+    data.savez(os.path.join(tmp_path, "iter_0.npz"))
+    with ZipFile(old_filename, "w") as file:
+        file.write(os.path.join(tmp_path, "_mesh_.vtk"), "_mesh_.vtk")
+        file.write(os.path.join(tmp_path, "iter_0.npz"), "iter_0.npz")
+
+    res = fd.read_data(old_filename)
+    assert np.allclose(res.mesh.nodes, mesh.nodes)
+    assert np.array_equal(res["Disp"], data.node_data["Disp"])
+
+
+def test_fdm(tmp_path):
+    fd.ModelingSpace("2Dstress")
+
+    mesh = fd.mesh.rectangle_mesh(nx=11, ny=5, elm_type="quad4")
+    material = fd.constitutivelaw.ElasticIsotrop(200e3, 0.3)
+    wf = fd.weakform.StressEquilibrium(material, nlgeom=False)
+    assemb = fd.Assembly.create(wf, mesh)
+
+    pb = fd.problem.NonLinear(assemb)
+    res_fdz = pb.add_output(os.path.join(tmp_path, "res"), assemb, ["Disp", "Stress"])
+    res_fdm = pb.add_output(
+        os.path.join(tmp_path, "res_fdm.fdm"), assemb, ["Disp", "Stress"]
+    )
+
+    pb.bc.add("Dirichlet", "left", "Disp", 0)
+    pb.bc.add("Dirichlet", "right", "DispX", 0.1)
+    pb.nlsolve(dt=0.1, tmax=1, print_info=0)
+
+    res_file = fd.read_data(os.path.join(tmp_path, "res_fdm.fdm"))
+    assert res_file.n_iter == res_fdz.n_iter == 10
+    assert np.array_equal(res_file.mesh.elements, mesh.elements)
+
+    nodes = mesh.node_sets["right"]
+    for res in [res_fdm, res_file]:
+        # history directly read from the memory-mapped arrays
+        t, ux, sxx = res.get_history(["Time", "Disp", "Stress"], [None, nodes, 0])
+        t_ref, ux_ref, sxx_ref = res_fdz.get_history(
+            ["Time", "Disp", "Stress"], [None, nodes, 0]
+        )
+        assert np.array_equal(t, t_ref)
+        assert np.array_equal(ux, ux_ref) and ux.shape == (10, len(nodes))
+        assert np.array_equal(sxx, sxx_ref)
+
+        res.load(5)
+        res_fdz.load(5)
+        assert np.array_equal(res["Stress", "vm"], res_fdz["Stress", "vm"])
+
+    # convert a fdz file to the fdm format
+    res_fdz.save_all(os.path.join(tmp_path, "converted.fdm"))
+    res_conv = fd.read_data(os.path.join(tmp_path, "converted.fdm"))
+    assert np.array_equal(
+        res_conv.get_history("Disp", nodes)[0], res_fdz.get_history("Disp", nodes)[0]
+    )
+
+
+def test_frame_lim(tmp_path):
+    fd.ModelingSpace("2Dstress")
+
+    mesh = fd.mesh.rectangle_mesh(nx=11, ny=5, elm_type="quad4")
+    material = fd.constitutivelaw.ElasticIsotrop(200e3, 0.3)
+    wf = fd.weakform.StressEquilibrium(material, nlgeom=False)
+    assemb = fd.Assembly.create(wf, mesh)
+
+    pb = fd.problem.NonLinear(assemb)
+    res_fdz = pb.add_output(os.path.join(tmp_path, "res"), assemb, ["Disp", "Stress"])
+    res_fdm = pb.add_output(
+        os.path.join(tmp_path, "res_fdm.fdm"), assemb, ["Disp", "Stress"]
+    )
+
+    pb.bc.add("Dirichlet", "left", "Disp", 0)
+    pb.bc.add("Dirichlet", "right", "Disp", [0.1, 0.05])
+    pb.nlsolve(dt=0.1, tmax=1, print_info=0)
+
+    for field, component, data_type in [
+        ("Disp", "Y", None),
+        ("Stress", 0, None),
+        ("Stress", "vm", None),  # not available in the saved limits
+        ("Stress", 1, "Node"),  # need a data conversion
+    ]:
+        # reference values computed by loading each frame
+        clim = [np.inf, -np.inf]
+        xmin = np.full(2, np.inf)
+        xmax = np.full(2, -np.inf)
+        for i in range(res_fdz.n_iter):
+            res_fdz.load(i)
+            data = res_fdz.get_data(field, component, data_type)
+            clim = [min(clim[0], data.min()), max(clim[1], data.max())]
+            new_crd = mesh.nodes + 2 * res_fdz.node_data["Disp"].T
+            xmin = np.minimum(xmin, new_crd.min(axis=0))
+            xmax = np.maximum(xmax, new_crd.max(axis=0))
+
+        for res in [res_fdz, res_fdm]:
+            Xmin, Xmax, lim = res.get_all_frame_lim(field, component, data_type, 2)
+            assert np.allclose(lim, clim)
+            assert np.allclose(Xmin, xmin) and np.allclose(Xmax, xmax)
+
+
+def test_output_request(tmp_path):
+    fd.ModelingSpace("2Dstress")
+
+    mesh = fd.mesh.rectangle_mesh(nx=11, ny=5, elm_type="quad4")
+    material = fd.constitutivelaw.ElasticIsotrop(200e3, 0.3)
+    wf = fd.weakform.StressEquilibrium(material, nlgeom=False)
+    assemb = fd.Assembly.create(wf, mesh)
+
+    pb = fd.problem.NonLinear(assemb)
+    res_ref = pb.add_output(os.path.join(tmp_path, "ref"), assemb, ["Disp", "Stress"])
+    res_dec = pb.add_output(os.path.join(tmp_path, "dec"), assemb, ["Disp"], interval=3)
+    nodes = mesh.node_sets["right"]
+    res_probe = pb.add_output(
+        os.path.join(tmp_path, "probe.fdm"), assemb, ["Stress"], node_set="right"
+    )
+    res_q = pb.add_output(
+        os.path.join(tmp_path, "quantized"),
+        assemb,
+        ["Disp", "Stress"],
+        dtype="float32",
+        encoding="quantize",
+    )
+
+    pb.bc.add("Dirichlet", "left", "Disp", 0)
+    pb.bc.add("Dirichlet", "right", "DispX", 0.1)
+    pb.nlsolve(dt=0.1, tmax=1, print_info=0)
+
+    assert res_ref.n_iter == 10
+    assert res_dec.n_iter == fd.read_data(os.path.join(tmp_path, "dec.fdz")).n_iter == 4
+    res_dec.load(1)
+    res_ref.load(3)
+    assert np.array_equal(res_dec["Disp"], res_ref["Disp"])
+
+    stress_ref = res_ref.get_history("Stress", nodes, data_type="Node")[0]
+    res_file = fd.read_data(os.path.join(tmp_path, "probe.fdm"))
+    for res in [res_probe, res_file]:
+        assert res.mesh.n_nodes == len(nodes)
+        assert np.allclose(res.mesh.nodes, mesh.nodes[nodes])
+        assert np.allclose(res.get_history("Stress")[0], stress_ref)
+
+    disp_ref = res_ref.get_history("Disp")[0]
+    disp = fd.read_data(os.path.join(tmp_path, "quantized.fdz")).get_history("Disp")[0]
+    tol = np.ptp(disp_ref, axis=1)[:, None] / 65535
+    assert np.all(np.abs(disp - disp_ref) <= tol)
+    res_q.load(-1)
+    assert res_q["Disp"].dtype == np.float32
+    assert np.isclose(res_q.get_all_frame_lim("Disp")[2][1], disp_ref.max())
+
+
+def test_output_cache():
+    fd.ModelingSpace("2Dstress")
+
+    mesh = fd.mesh.rectangle_mesh(nx=11, ny=5, elm_type="quad4")
+    material = fd.constitutivelaw.ElasticIsotrop(200e3, 0.3)
+    wf = fd.weakform.StressEquilibrium(material, nlgeom=False)
+    assemb = fd.Assembly.create(wf, mesh)
+
+    pb = fd.problem.Linear(assemb)
+    pb.bc.add("Dirichlet", "left", "Disp", 0)
+    pb.bc.add("Dirichlet", "right", "DispX", 0.1)
+    pb.solve()
+
+    res = pb.get_results(assemb, ["Stress", "Stress_vm", "Disp"], "Node")
+    for field in ["Stress", "Stress_vm"]:
+        ref = assemb.convert_data(
+            pb.get_results(assemb, field)[field], "GaussPoint", "Node"
+        )
+        assert np.allclose(res[field], ref)
+
+    # the fields are computed only once for the same increment
+    res2 = pb.get_results(assemb, ["Stress"], "Node")
+    assert res2["Stress"] is res["Stress"]
+
+    pb.bc.add("Dirichlet", "right", "DispY", 0.1)
+    pb.solve()
+    res2 = pb.get_results(assemb, ["Stress"], "Node")
+    assert not np.allclose(res2["Stress"], res["Stress"])
@@ -0,0 +1,49 @@
+import numpy as np
+
+import fedoo as fd
+
+
+def test_heterogeneous():
+    fd.ModelingSpace("3D")
+    mesh = fd.mesh.box_mesh(5, 5, 5, elm_type="hex8")
+    phase = np.arange(mesh.n_elements) % 3
+    mesh.element_sets["phase0"] = np.where(phase == 0)[0]
+    list_elset = ["phase0", np.where(phase == 1)[0], np.where(phase == 2)[0]]
+    list_cl = [fd.constitutivelaw.ElasticIsotrop(E, 0.3) for E in [1e5, 2e5, 3e5]]
+
+    def solve(assembly):
+        pb = fd.problem.NonLinear(assembly)
+        pb.bc.add("Dirichlet", mesh.find_nodes("X", 0), "Disp", 0)
+        pb.bc.add("Dirichlet", mesh.find_nodes("X", 1), "Disp", [0.01, 0.005, 0])
+        pb.nlsolve(dt=0.5, tmax=1, print_info=0)
+        return pb
+
+    # reference: sum of one assembly per phase
+    assembly = fd.Assembly.sum(
+        *[
+            fd.Assembly.create(
+                fd.weakform.StressEquilibrium(cl), mesh.extract_elements(elset)
+            )
+            for cl, elset in zip(list_cl, list_elset)
+        ]
+    )
+    pb_ref = solve(assembly)
+
+    material = fd.constitutivelaw.Heterogeneous(list_cl, list_elset)
+    assembly = fd.Assembly.create(fd.weakform.StressEquilibrium(material), mesh)
+    pb = solve(assembly)
+    assert np.allclose(pb.get_disp(), pb_ref.get_disp())
+
+    # stress of each phase
+    stress = assembly.sv["Stress"].asarray()
+    assert stress.shape == (6, assembly.n_gauss_points)
+    for cl, sub_assembly in zip(list_cl, material.list_assembly):
+        strain = sub_assembly.sv["Strain"].asarray()
+        H = np.array(cl.get_tangent_matrix(sub_assembly), dtype=float)
+        assert np.allclose(sub_assembly.sv["Stress"].asarray(), H @ strain)
+
+    # the update doesn't change sv_start (that share the same arrays)
+    assembly.sv["Strain"] = 2 * assembly.sv["Strain"].asarray()
+    material.update(assembly, pb)
+    assert np.allclose(assembly.sv["Stress"].asarray(), 2 * stress)
+    assert np.allclose(assembly.sv_start["Stress"].asarray(), stress)
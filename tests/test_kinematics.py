@@ -0,0 +1,85 @@
+import numpy as np
+import pytest
+
+import fedoo as fd
+from fedoo.util import kinematics
+
+
+def test_kinematics():
+    rng = np.random.default_rng(0)
+    F0 = np.eye(3)[..., None] + 0.2 * rng.standard_normal((3, 3, 50))
+    F1 = F0 + 0.05 * rng.standard_normal((3, 3, 50))
+
+    R, U = kinematics.polar_decomposition(F1)
+    assert np.allclose(np.einsum("ik...,kj...->ij...", R, U), F1)
+    assert np.allclose(np.einsum("ki...,kj...->ij...", R, R), np.eye(3)[..., None])
+
+    # ln(V) = R.ln(U).R^T and E = (U^2 - I)/2
+    c, P = np.linalg.eigh(np.moveaxis(U, -1, 0))
+    log_u = np.moveaxis((P * np.log(c)[:, None]) @ P.transpose(0, 2, 1), 0, -1)
+    log_u = np.array(
+        [log_u[0, 0], log_u[1, 1], log_u[2, 2]]
+        + [2 * log_u[0, 1], 2 * log_u[0, 2], 2 * log_u[1, 2]]
+    )
+    assert np.allclose(kinematics.log_strain(F1), kinematics.rotate_strain(log_u, R))
+    E = kinematics.green_lagrange_strain(F1)
+    C = np.einsum("ki...,kj...->ij...", F1, F1)
+    assert np.allclose(E[:3], 0.5 * (C[[0, 1, 2], [0, 1, 2]] - 1))
+    assert np.allclose(E[3:], C[[0, 0, 1], [1, 2, 2]])
+
+    # the log strain increments give exactly the log strain
+    de, D, DR, Omega = kinematics.objective_rate("log", F0, F1, 0.1, True)
+    strain = kinematics.rotate_strain(kinematics.log_strain(F0), DR) + de
+    assert np.allclose(strain, kinematics.log_strain(F1))
+
+    for corate in ["jaumann", "green_naghdi", "log"]:
+        D, DR, Omega = kinematics.objective_rate(corate, F0, F1, 0.1)
+        assert np.allclose(Omega, -Omega.transpose(1, 0, 2))
+        assert np.allclose(
+            np.einsum("ki...,kj...->ij...", DR, DR), np.eye(3)[..., None]
+        )
+
+
+def test_finite_strain_corates():
+    # updated lagrangian tension test with the different objective rates
+    fd.ModelingSpace("3D")
+    mesh = fd.mesh.box_mesh(3, 3, 3, elm_type="hex8")
+    results = []
+    for corate in ["log", "log_inc", "jaumann", "gn"]:
+        material = fd.constitutivelaw.ElasticIsotrop(1000, 0.3)
+        wf = fd.weakform.StressEquilibrium(material, nlgeom=True)
+        wf.corate = corate
+        assemb = fd.Assembly.create(wf, mesh)
+        pb = fd.problem.NonLinear(assemb)
+        pb.bc.add("Dirichlet", "left", "Disp", 0)
+        pb.bc.add("Dirichlet", "right", "DispX", 0.5)
+        pb.nlsolve(dt=0.2, tmax=1, update_dt=False, print_info=0)
+        results.append(assemb.sv["Stress"].asarray().copy())
+
+    for stress in results[1:]:
+        assert np.allclose(stress, results[0], rtol=1e-2, atol=1e-2 * 400)
+
+
+def test_corate_strain_increment():
+    # with simcoon, the jaumann and green_naghdi strain increments are the
+    # simcoon ones (used by the simcoon umat)
+    sim = pytest.importorskip("simcoon").simmit
+    fd.ModelingSpace("3D")
+    mesh = fd.mesh.box_mesh(3, 3, 3, elm_type="hex8")
+    material = fd.constitutivelaw.ElasticIsotrop(1000, 0.3)
+    rng = np.random.default_rng(0)
+    for corate, corate_simcoon in [("jaumann", "jaumann"), ("gn", "green_naghdi")]:
+        wf = fd.weakform.StressEquilibrium(material, nlgeom=True)
+        wf.corate = corate
+        assemb = fd.Assembly.create(wf, mesh)
+        pb = fd.problem.NonLinear(assemb)
+        pb.initialize()
+        pb.dtime = 0.1
+        grad_disp = 0.1 * rng.standard_normal((3, 3, assemb.n_gauss_points))
+        assemb.sv["DispGradient"] = grad_disp
+        wf._corate_func(wf, assemb, pb)
+
+        F0 = np.asfortranarray(assemb.sv_start["F"])
+        F1 = np.asfortranarray(np.eye(3)[..., None] + grad_disp)
+        de = sim.objective_rate(corate_simcoon, F0, F1, 0.1, True)[0]
+        assert np.allclose(assemb.sv["DStrain"], de)
@@ -0,0 +1,37 @@
+#
+# Merge coincident nodes of stacked meshes
+#
+
+import numpy as np
+
+import fedoo as fd
+
+
+def test_merge_nodes():
+    mesh = fd.mesh.box_mesh(4, 4, 4)
+
+    # stack 3 times the same mesh -> clusters of 3 coincident nodes
+    stacked = fd.Mesh.stack(fd.Mesh.stack(mesh, mesh), mesh)
+    stacked.node_sets["all"] = np.arange(stacked.n_nodes)
+    node_couples = stacked.find_coincident_nodes()
+
+    assert node_couples.shape == (2 * mesh.n_nodes, 2)
+    assert np.all(node_couples[:, 0] < node_couples[:, 1])
+
+    stacked.merge_nodes(node_couples)
+
+    assert stacked.n_nodes == mesh.n_nodes
+    assert np.array_equal(stacked.nodes, mesh.nodes)
+    assert np.array_equal(stacked.elements[: mesh.n_elements], mesh.elements)
+    assert np.array_equal(stacked.elements[-mesh.n_elements :], mesh.elements)
+    assert np.array_equal(stacked.node_sets["all"], np.tile(np.arange(mesh.n_nodes), 3))
+
+    # chained couples: node 3 -> 2 -> 1
+    line = fd.Mesh(
+        np.array([[0.0, 0], [1, 0], [1, 0], [1, 0], [2, 0]]),
+        np.array([[0, 1], [2, 3], [3, 4]]),
+        "lin2",
+    )
+    line.merge_nodes(np.array([[1, 2], [2, 3]]))
+    assert line.n_nodes == 3
+    assert np.array_equal(line.elements, [[0, 1], [1, 1], [1, 2]])
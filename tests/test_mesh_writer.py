@@ -0,0 +1,132 @@
+import os
+
+import numpy as np
+import pyvista as pv
+
+import fedoo as fd
+from fedoo.util.mesh_writer import write_msh, write_vtk, write_vtu
+
+
+def test_mesh_writer(tmp_path):
+    mesh = fd.mesh.box_mesh(4, 3, 3, elm_type="hex8")
+    data = fd.DataSet(mesh)
+    data.node_data["Disp"] = np.random.rand(3, mesh.n_nodes)
+    data.node_data["Temp"] = np.random.rand(mesh.n_nodes)
+    data.element_data["Stress"] = np.random.rand(6, mesh.n_elements)
+    data.scalar_data["Time"] = 0.5
+
+    ref = mesh.to_pyvista()
+    for filename, binary in [("bin.vtk", True), ("ascii.vtk", False), ("a.vtu", None)]:
+        filename = os.path.join(tmp_path, filename)
+        if binary is None:
+            write_vtu(data, filename)
+        else:
+            write_vtk(data, filename, binary=binary)
+
+        res = pv.read(filename)
+        assert np.allclose(res.points, ref.points)
+        assert np.array_equal(res.cells, ref.cells)
+        assert np.array_equal(res.celltypes, ref.celltypes)
+        assert np.allclose(res.point_data["Disp"], data.node_data["Disp"].T)
+        assert np.allclose(res.point_data["Temp"], data.node_data["Temp"])
+        assert np.allclose(res.cell_data["Stress"], data.element_data["Stress"].T)
+        assert np.allclose(res.field_data["Time"], 0.5)
+
+    # 2d mesh written in a vtk file and read back with fedoo
+    mesh = fd.mesh.rectangle_mesh(5, 4, elm_type="quad4")
+    data = fd.DataSet(mesh)
+    data.node_data["Disp"] = np.random.rand(2, mesh.n_nodes)
+    filename = os.path.join(tmp_path, "test2d.vtk")
+    data.save(filename)
+    res = fd.read_data(filename)
+    assert res.mesh.ndim == 2
+    assert np.allclose(res.mesh.nodes, mesh.nodes)
+    assert np.allclose(res["Disp"], data.node_data["Disp"])
+
+    filename = os.path.join(tmp_path, "test.msh")
+    write_msh(data, filename, binary=False)
+    res = fd.mesh.import_msh(filename)
+    assert np.array_equal(res.elements, mesh.elements)
+    assert np.allclose(res.nodes[:, :2], mesh.nodes)
+
+
+def test_import_mesh(tmp_path):
+    mesh = fd.mesh.box_mesh(4, 3, 3, elm_type="hex20")
+    data = fd.DataSet(mesh)
+    data.node_data["Disp"] = np.random.rand(3, mesh.n_nodes)
+
+    for binary in [False, True]:
+        filename = os.path.join(tmp_path, "test.msh")
+        data.to_msh(filename, binary=binary)
+        res = fd.mesh.import_msh(filename)
+        assert np.allclose(res.nodes, mesh.nodes)
+        assert np.array_equal(res.elements, mesh.elements)
+        assert np.array_equal(res.element_sets["Entity1"], np.arange(mesh.n_elements))
+
+        filename = os.path.join(tmp_path, "test.vtk")
+        data.to_vtk(filename, binary=binary)
+        res = fd.mesh.import_vtk(filename)
+        assert np.allclose(res.nodes, mesh.nodes)
+        assert np.array_equal(res.elements, mesh.elements)
+
+
+def test_fdmesh(tmp_path):
+    mesh = fd.mesh.box_mesh(4, 3, 3)
+    mesh.local_frame = np.random.rand(mesh.n_nodes, 3, 3)
+    mesh.element_sets["set"] = [1, 2, 3]
+    filename = os.path.join(tmp_path, "test.fdmesh")
+    mesh.save(filename)
+
+    res = fd.Mesh.read(filename)
+    assert isinstance(res.nodes, np.memmap)
+    assert np.array_equal(res.nodes, mesh.nodes)
+    assert np.array_equal(res.elements, mesh.elements)
+    assert res.elm_type == mesh.elm_type
+    assert np.array_equal(res.local_frame, mesh.local_frame)
+    assert np.array_equal(res.element_sets["set"], [1, 2, 3])
+    for key in mesh.node_sets:
+        assert np.array_equal(res.node_sets[key], mesh.node_sets[key])
+
+    # memory-mapped arrays are copy on write
+    res.nodes[0] = 10
+    assert np.array_equal(fd.Mesh.read(filename).nodes, mesh.nodes)
+
+
+def test_vtk_node_order(tmp_path):
+    # same vtk cells whatever the write path and same elements when read back
+    mesh = fd.mesh.box_mesh(3, 3, 3, elm_type="hex20")
+    data = fd.DataSet(mesh)
+    ref = mesh.to_pyvista()
+    assert np.isclose(ref.volume, 1)  # wrong node order gives a wrong volume
+    for filename, save in [
+        ("mesh.vtk", mesh.save),
+        ("data.vtk", data.save),
+        ("data.vtu", lambda filename: write_vtu(data, filename)),
+    ]:
+        filename = os.path.join(tmp_path, filename)
+        save(filename)
+        assert np.array_equal(pv.read(filename).cells, ref.cells)
+        res = fd.Mesh.read(filename)
+        assert np.array_equal(res.elements, mesh.elements)
+        if filename.endswith(".vtk"):
+            res = fd.mesh.import_vtk(filename)
+            assert np.array_equal(res.elements, mesh.elements)
+
+    # quadratic elements missing in the former vtk cell table
+    meshes = [fd.mesh.rectangle_mesh(4, 3, elm_type="quad9")]
+    for elm_type in ["wed15", "wed18"]:
+        xi_nd = fd.lib_elements.element_list.get_element(elm_type)().xi_nd
+        meshes.append(fd.Mesh(xi_nd, np.arange(len(xi_nd))[None], elm_type))
+    for mesh in meshes:
+        data = fd.DataSet(mesh)
+        data.node_data["Temp"] = np.random.default_rng(0).random(mesh.n_nodes)
+        filename = os.path.join(tmp_path, mesh.elm_type + ".vtk")
+        data.save(filename)
+        res = pv.read(filename)
+        assert np.array_equal(res.cells, mesh.to_pyvista().cells)
+        assert np.allclose(res.point_data["Temp"], data.node_data["Temp"])
+        if mesh.ndim == 3:  # wedge of volume 1 if the node order is right
+            assert np.isclose(res.volume, 1)
+        res = fd.mesh.import_vtk(filename)
+        assert res.elm_type == mesh.elm_type
+        assert np.array_equal(res.elements, mesh.elements)
@@ -0,0 +1,52 @@
+import numpy as np
+import pytest
+
+import fedoo as fd
+from fedoo.constraint.periodic_bc import _pair_periodic_nodes
+
+
+def test_periodic_pairing():
+    rng = np.random.default_rng(0)
+    mesh = fd.mesh.rectangle_mesh(7, 5, elm_type="quad4")
+    crd = mesh.nodes
+    left = np.nonzero(np.isclose(crd[:, 0], 0))[0]
+    right = rng.permutation(np.nonzero(np.isclose(crd[:, 0], 1))[0])
+
+    right = _pair_periodic_nodes(crd, right, left, [1])
+    assert np.array_equal(crd[right, 1], crd[left, 1])
+
+    # slightly non-conforming mesh: nearest partner fallback
+    crd = crd.copy()
+    crd[right[1:-1], 1] += 1e-6
+    with pytest.raises(ValueError, match="3 nodes have no periodic partner"):
+        _pair_periodic_nodes(crd, right, left, [1])
+    paired = _pair_periodic_nodes(crd, right, left, [1], pairing_tol=1e-5)
+    assert np.array_equal(paired, right)
+
+    with pytest.raises(ValueError, match="number of nodes on opposite faces"):
+        _pair_periodic_nodes(crd, right[1:], left, [1])
+
+
+def test_periodic_bc():
+    # homogeneous material: the strain is uniform and equal to the mean strain
+    fd.ModelingSpace("2Dstress")
+    mesh = fd.mesh.rectangle_mesh(7, 5, elm_type="quad4")
+    strain_nodes = mesh.add_virtual_nodes(2)
+    center = mesh.nearest_node(mesh.bounding_box.center)
+
+    material = fd.constitutivelaw.ElasticIsotrop(200e3, 0.3)
+    assemb = fd.Assembly.create(fd.weakform.StressEquilibrium(material), mesh)
+    pb = fd.problem.Linear(assemb)
+
+    node_cd = [strain_nodes[0], strain_nodes[0], strain_nodes[1]]
+    var_cd = ["DispX", "DispY", "DispX"]
+    pb.bc.add(fd.constraint.PeriodicBC(node_cd, var_cd, dim=2))
+    pb.bc.add("Dirichlet", center, "Disp", 0)
+    pb.bc.add("Dirichlet", strain_nodes[0], "Disp", [0.01, -0.002])
+    pb.bc.add("Dirichlet", strain_nodes[1], "Disp", [0.004, 0])
+    pb.solve()
+
+    strain = pb.get_results(assemb, ["Strain"]).gausspoint_data["Strain"]
+    assert np.allclose(strain[0], 0.01)
+    assert np.allclose(strain[1], -0.002)
+    assert np.allclose(strain[3], 0.004)
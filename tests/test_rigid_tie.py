@@ -0,0 +1,121 @@
+import numpy as np
+from scipy.spatial.transform import Rotation
+
+import fedoo as fd
+
+
+def build_problem(mesh, constraint=None):
+    material = fd.constitutivelaw.ElasticIsotrop(200e3, 0.3)
+    assemb = fd.Assembly.create(fd.weakform.StressEquilibrium(material), mesh)
+    pb = fd.problem.NonLinear(assemb)
+    pb.bc.add("Dirichlet", "left", "Disp", 0)
+    if constraint is not None:
+        pb.bc.add(constraint)
+    return pb
+
+
+def du_dangles(crd, angles, rotation):
+    # derivative of the rotated coordinates with respect to the angles
+    # (finite differences), shape = (n_angles, n_nodes, ndim)
+    eps = 1e-7
+    res = []
+    for i in range(len(angles)):
+        da = np.zeros(len(angles))
+        da[i] = eps
+        res.append(
+            (crd @ rotation(angles + da).T - crd @ rotation(angles - da).T) / (2 * eps)
+        )
+    return np.array(res)
+
+
+def test_rigid_tie():
+    fd.ModelingSpace("3D")
+    mesh = fd.mesh.box_mesh(3, 3, 3, elm_type="hex8")
+    virtual_nodes = mesh.add_virtual_nodes(2)
+    node_cd = np.repeat(virtual_nodes, 3)
+    var_cd = ["DispX", "DispY", "DispZ", "DispX", "DispY", "DispZ"]
+    right = mesh.node_sets["right"]
+    angles = np.array([0.1, 0.05, -0.02])
+
+    # scalar mpc equivalent to the linearized rigid tie
+    crd = mesh.nodes[right] - mesh.nodes[node_cd[0]]
+    du_dr = du_dangles(crd, angles, lambda a: Rotation.from_euler("XYZ", a).as_matrix())
+    list_mpc = fd.ListBC()
+    for i, var in enumerate(["DispX", "DispY", "DispZ"]):
+        list_mpc.append(
+            fd.MPC(
+                [right] + [np.full_like(right, node_cd[j]) for j in [i, 3, 4, 5]],
+                [var, var_cd[i], "DispX", "DispY", "DispZ"],
+                [np.ones(len(right)), -np.ones(len(right))]
+                + [-du_dr[j, :, i] for j in range(3)],
+            )
+        )
+
+    rigid_tie = fd.constraint.RigidTie(right, node_cd, var_cd, rotation_tol=1e-3)
+    res = []
+    for constraint in [rigid_tie, list_mpc]:
+        pb = build_problem(mesh, constraint)
+        pb.bc.add("Dirichlet", [virtual_nodes[0]], "Disp", [0.01, 0, 0])
+        pb.bc.add("Dirichlet", [virtual_nodes[1]], "Disp", angles)
+        pb.apply_boundary_conditions()
+        res.append((pb._Problem__MatCB.toarray(), pb._Xbc.copy()))
+
+    assert np.allclose(res[0][0], res[1][0], atol=1e-6)
+    assert np.allclose(res[0][1], res[1][1])
+
+    # rotation_tol: the linearized constraints are reused for small rotations
+    pb = build_problem(mesh, rigid_tie)
+    bc_rot = pb.bc.add("Dirichlet", [virtual_nodes[1]], "DispX", angles[0])
+    pb.bc.add("Dirichlet", [virtual_nodes[1]], ["DispY", "DispZ"], angles[1:])
+    pb.bc.add("Dirichlet", [virtual_nodes[0]], "Disp", 0)
+    pb.apply_boundary_conditions()
+    MatCB = pb._Problem__MatCB
+    bc_rot.change_value(angles[0] + 1e-4)
+    pb.apply_boundary_conditions()
+    assert pb._Problem__MatCB is MatCB
+    bc_rot.change_value(angles[0] + 1e-2)
+    pb.apply_boundary_conditions()
+    assert pb._Problem__MatCB is not MatCB
+
+
+def test_rigid_tie_2d():
+    fd.ModelingSpace("2D")
+    mesh = fd.mesh.rectangle_mesh(4, 4, elm_type="quad4")
+    virtual_nodes = mesh.add_virtual_nodes(2)
+    node_cd = [virtual_nodes[0], virtual_nodes[0], virtual_nodes[1]]
+    var_cd = ["DispX", "DispY", "DispX"]
+    right = mesh.node_sets["right"]
+    angle = 0.1
+
+    crd = mesh.nodes[right] - mesh.nodes[node_cd[0]]
+    du_dr = du_dangles(
+        crd,
+        np.array([angle]),
+        lambda a: np.array(
+            [[np.cos(a[0]), -np.sin(a[0])], [np.sin(a[0]), np.cos(a[0])]]
+        ),
+    )[0]
+    list_mpc = fd.ListBC()
+    for i, var in enumerate(["DispX", "DispY"]):
+        list_mpc.append(
+            fd.MPC(
+                [
+                    right,
+                    np.full_like(right, node_cd[0]),
+                    np.full_like(right, node_cd[2]),
+                ],
+                [var, var_cd[i], var_cd[2]],
+                [np.ones(len(right)), -np.ones(len(right)), -du_dr[:, i]],
+            )
+        )
+
+    res = []
+    for constraint in [fd.constraint.RigidTie2D(right, node_cd, var_cd), list_mpc]:
+        pb = build_problem(mesh, constraint)
+        pb.bc.add("Dirichlet", [virtual_nodes[0]], "Disp", [0.01, 0.02])
+        pb.bc.add("Dirichlet", [virtual_nodes[1]], "Disp", [angle, 0])
+        pb.apply_boundary_conditions()
+        res.append((pb._Problem__MatCB.toarray(), pb._Xbc.copy()))
+
+    assert np.allclose(res[0][0], res[1][0], atol=1e-6)
+    assert np.allclose(res[0][1], res[1][1])
@@ -0,0 +1,63 @@
+import numpy as np
+
+import fedoo as fd
+
+
+def test_simcoon_umat():
+    # same results with the gauss points splitted in chunks run on threads
+    fd.ModelingSpace("3D")
+    mesh = fd.mesh.box_mesh(4, 3, 3, elm_type="hex8")
+    props = np.array([1e5, 0.3, 1e-5, 300, 1000, 0.25])
+    res = []
+    for n_threads in [None, 3]:
+        material = fd.constitutivelaw.Simcoon("EPICP", props)
+        material.n_threads = n_threads
+        material._umat.min_chunk_size = 10
+        material._umat._native_threads = False  # force the python thread pool
+        assemb = fd.Assembly.create(fd.weakform.StressEquilibrium(material), mesh)
+        pb = fd.problem.NonLinear(assemb)
+        pb.bc.add("Dirichlet", "left", "Disp", 0)
+        pb.bc.add("Dirichlet", "right", "DispX", 0.05)
+        pb.nlsolve(dt=0.25, tmax=1, update_dt=False, print_info=0)
+
+        assert material.umat_timing["n_calls"] > 0
+        assert material.umat_timing["total"] >= material.umat_timing["last"]
+        res.append((np.array(assemb.sv["Stress"]), np.array(assemb.sv["Statev"])))
+
+    assert np.allclose(res[0][0], res[1][0])
+    assert np.allclose(res[0][1], res[1][1])
+    assert res[0][1][1].max() > 0  # plastic strain
+
+    umat = material._umat
+    assert umat._n_workers == 3
+    umat.shutdown()
+    assert umat._pool is None
+
+
+def test_simcoon_umat_local_frame():
+    # the umat rewrites the same tangent matrix buffer at each iteration of a
+    # time step: its rotation in the global frame should follow
+    fd.ModelingSpace("3D")
+    mesh = fd.mesh.box_mesh(4, 3, 3, elm_type="hex8")
+    props = np.array([1e5, 0.3, 1e-5, 300, 1000, 0.25])
+    material = fd.constitutivelaw.Simcoon("EPICP", props)
+    material.use_elastic_lt = False
+    assemb = fd.Assembly.create(fd.weakform.StressEquilibrium(material), mesh)
+    pb = fd.problem.NonLinear(assemb)
+    pb.bc.add("Dirichlet", "left", "Disp", 0)
+    pb.bc.add("Dirichlet", "right", "DispX", 0.05)
+    pb.nlsolve(dt=0.5, tmax=1, update_dt=False, print_info=0)
+
+    theta = np.random.default_rng(0).random(assemb.n_gauss_points)
+    c, s, zero = np.cos(theta), np.sin(theta), 0 * theta
+    local_frame = np.array([[c, s, zero], [-s, c, zero], [zero, zero, zero + 1]])
+    material.local_frame = local_frame.transpose(2, 0, 1)
+    R = material._get_strain_rotation()
+
+    strain = assemb.sv_start["Strain"].array
+    for scale in [1.01, 1.2]:
+        assemb.sv["Strain"] = fd.util.voigt_tensors.StrainTensorList(scale * strain)
+        material.update(assemb, pb)
+        H = assemb.sv["TangentMatrix"]
+        H_ref = np.einsum("nji,jkn,nkl->iln", R, H, R)
+        assert np.allclose(material.get_tangent_matrix(assemb), H_ref)
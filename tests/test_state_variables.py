@@ -0,0 +1,37 @@
+import numpy as np
+
+import fedoo as fd
+
+
+def test_state_variables():
+    fd.ModelingSpace("2Dstress")
+    mesh = fd.mesh.rectangle_mesh(6, 5, elm_type="quad4")
+    material = fd.constitutivelaw.ElasticIsotrop(200e3, 0.3)
+    assemb = fd.Assembly.create(fd.weakform.StressEquilibrium(material), mesh)
+    pb = fd.problem.NonLinear(assemb)
+    pb.bc.add("Dirichlet", "left", "Disp", 0)
+    bc = pb.bc.add("Dirichlet", "right", "DispX", 0.1)
+    sv, sv_start = assemb.sv, assemb.sv_start
+
+    list_arrays = []
+    list_res = []
+    for i in range(4):
+        bc.value = 0.1 * (i + 1)
+        pb.nlsolve(dt=0.25, tmax=0.25 * (i + 1), update_dt=False, print_info=0)
+        stress = assemb.sv["Stress"].asarray()
+        list_arrays.append(stress)
+        list_res.append((pb.get_results(assemb, "Stress", "GaussPoint"), stress.copy()))
+        assert assemb.sv_start["Stress"].asarray() is stress
+
+    # the stress is always written in the same 2 preallocated arrays
+    assert assemb.sv is sv and assemb.sv_start is sv_start
+    assert len(set(id(stress) for stress in list_arrays)) == 2
+    # results are not modified by the next increments
+    for res, stress in list_res:
+        assert np.array_equal(res["Stress"], stress)
+
+    # restart the increment
+    stress_start = assemb.sv_start["Stress"]
+    assemb.sv["Stress"] = 0
+    assemb.to_start(pb)
+    assert assemb.sv["Stress"] is stress_start